@@ -9,6 +9,8 @@ import argparse
 import json
 import sys
 import socket
+import multiprocessing
+import uuid
 from pathlib import Path
 from typing import Tuple, Optional, Dict, Any, List
 from datetime import datetime
@@ -29,7 +31,12 @@ else:
 
 from brain import Brain
 from state_manager import CharacterState
-from comfy_client import ComfyClient
+from comfy_client import ComfyClient, JobProgress
+from image_result import ImageResult
+from background_plates import get_background_plates
+from image_gate import ImageGate, SKIP, DOWNGRADE, RENDER
+from image_writer import get_image_writer
+from image_scheduler import get_image_scheduler, priority_for_triggers, PRIORITY_FIRST, PRIORITY_TRANSITION, PRIORITY_REFINE
 from memory_manager import MemoryManager
 from PIL import Image, ImageDraw, ImageFont
 import io
@@ -59,6 +66,20 @@ class GameApp:
         self.previous_relationship: Optional[str] = None  # 이전 관계 상태 (모달용)
         self.previous_badges: set = set()  # 이전 턴의 뱃지 목록 (알림용)
         self.last_image_generation_info: Optional[Dict[str, str]] = None  # 마지막 이미지 생성 정보 (visual_prompt, appearance)
+        self.image_variants: List[bytes] = []  # 마지막 이미지와 같은 프롬프트로 미리 생성된 변형 (재시도용)
+        self.refined_image: Optional[Image.Image] = None  # 백그라운드에서 완성된 고품질 이미지 (UI 표시 대기)
+        self._image_generation_id = 0  # 이미지 요청 번호 (이전 요청의 고품질 이미지가 늦게 도착하면 무시)
+        self.image_progress: Optional[JobProgress] = None  # 생성 중인 이미지의 진행률/저해상도 미리보기
+        self._image_progress_version: Optional[int] = None  # UI에 마지막으로 보낸 진행 상황 버전
+        self._image_progress_preview: Optional[bytes] = None
+        # img2img 연속 모드 상태 (마지막 이미지의 장면 키와 바이트, 연속 img2img 횟수)
+        self._last_scene_key: Optional[Tuple] = None
+        self._last_image_bytes: Optional[bytes] = None
+        self._continuity_chain = 0
+        # 이미지 필요성 판단 (세션별 비교 기준, 예산, 지표)
+        self.image_gate = ImageGate()
+        # 이미지 스케줄러에서 이 세션을 구분하는 ID (새 게임마다 새로 발급)
+        self.session_id = uuid.uuid4().hex[:8]
         # 최근 턴 정보 (순간 저장용)
         self.last_speech: str = ""
         self.last_thought: str = ""
@@ -66,6 +87,8 @@ class GameApp:
         self.last_relationship: str = ""
         self.last_mood: str = ""
         self.last_badges: list = []
+        # 카세트 녹화기 (--record-cassette 지정 시 설정, 성능 재현용)
+        self.cassette_recorder = None
         
         # 분리된 모듈 초기화
         self.encryption_manager = EncryptionManager()
@@ -332,37 +355,24 @@ class GameApp:
 
         return "\n".join(lines).strip()
 
-    def _save_generated_image(self, image: Image.Image, turn_number: Optional[int] = None) -> Optional[str]:
+    def _save_generated_image(self, image: Image.Image, turn_number: Optional[int] = None, wait: bool = False) -> Optional[str]:
         """
-        생성된 이미지를 파일로 저장
+        생성된 이미지를 파일로 저장 (리사이즈/인코딩은 백그라운드 워커에서 처리)
         Args:
             image: PIL Image 객체
             turn_number: 턴 번호 (None이면 재생성 이미지)
+            wait: True면 파일이 실제로 써질 때까지 대기 (저장 버튼처럼 결과를 보여줄 때)
         Returns:
-            저장된 파일 경로 (실패 시 None)
+            저장 파일 경로 (내용 해시 이름, 실패 시 None - wait=False면 예약된 경로)
         """
         try:
-            # 이미지 폴더가 없으면 생성
-            config.IMAGE_DIR.mkdir(exist_ok=True)
-            
-            # 파일명 생성 (타임스탬프 + 턴 번호)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            if turn_number is not None:
-                filename = f"image_turn{turn_number:04d}_{timestamp}.png"
-            else:
-                filename = f"image_retry_{timestamp}.png"
-            
-            file_path = config.IMAGE_DIR / filename
+            # 파일명: 턴 번호 + 내용 해시 (같은 이미지를 다시 저장하면 같은 파일)
+            prefix = f"image_turn{turn_number:04d}" if turn_number is not None else "image_retry"
             
             # 스타일에 따라 리사이즈 비율 결정 (SDXL: 1.2배, 그 외: 1.5배)
             scale = 1.2 if self._is_sdxl_style() else 1.5
-            width, height = image.size
-            resized_image = image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
             
-            # 이미지 저장
-            resized_image.save(file_path, "PNG")
-            logger.info(f"Generated image saved to: {file_path}")
-            return str(file_path)
+            return get_image_writer().save(image, prefix, scale=scale, wait=wait)
         except Exception as e:
             logger.error(f"Failed to save generated image: {e}")
             return None
@@ -440,37 +450,28 @@ class GameApp:
 
         return "\n".join([line for line in lines if line]).strip()
 
-    def _save_moment_image_file(self, image: Image.Image) -> Optional[str]:
+    def _save_moment_image_file(self, image: Image.Image, wait: bool = False) -> Optional[str]:
         """
         순간 캡처 이미지를 파일로 저장 (turn 번호를 파일명에 포함)
-        이미지는 이미 리사이즈되어 전달되므로 그대로 저장
+        이미지는 이미 리사이즈되어 전달되므로 그대로 저장 (인코딩은 백그라운드 워커에서 처리, wait=True면 완료까지 대기)
         """
         try:
-            config.IMAGE_DIR.mkdir(exist_ok=True)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             turn_number = None
             if self.brain is not None and getattr(self.brain, "state", None) is not None:
                 turn_number = getattr(self.brain.state, "total_turns", None)
 
-            if turn_number is not None:
-                filename = f"moment_turn{turn_number:04d}_{timestamp}.png"
-            else:
-                filename = f"moment_{timestamp}.png"
-
-            file_path = config.IMAGE_DIR / filename
+            prefix = f"moment_turn{turn_number:04d}" if turn_number is not None else "moment"
             
             # 이미 리사이즈된 이미지를 그대로 저장 (중복 리사이즈 방지)
-            image.save(file_path, "PNG")
-            logger.info(f"Moment image saved to: {file_path}")
-            return str(file_path)
+            return get_image_writer().save(image, prefix, wait=wait)
         except Exception as e:
             logger.error(f"Failed to save moment image: {e}")
             return None
 
-    def save_moment_image(self) -> Optional[str]:
+    def save_moment_image(self, wait: bool = False) -> Optional[str]:
         """
         현재 이미지를 2배(Lanczos)로 확대한 뒤 대사/속마음/행동/관계/기분/뱃지 오버레이를 얹어 저장
+        wait: True면 파일이 실제로 써질 때까지 대기
         """
         if self.current_image is None:
             return None
@@ -499,7 +500,7 @@ class GameApp:
             if overlay_text:
                 target_image = self._overlay_text_on_image(target_image, overlay_text)
 
-            return self._save_moment_image_file(target_image)
+            return self._save_moment_image_file(target_image, wait=wait)
         except Exception as e:
             logger.error(f"Failed to save moment image with overlay: {e}")
             import traceback
@@ -591,6 +592,7 @@ class GameApp:
                     model_name=model_name,
                     api_key=api_key
                 )
+            self.brain.set_prompt_mode(llm_settings.get("prompt_mode"))
             
             logger.info(f"Brain initialized with {provider.upper()}, loading model...")
             
@@ -661,6 +663,9 @@ class GameApp:
         thought_label = i18n.get_text("thought_label", category="ui")
         action_label = i18n.get_text("action_label", category="ui")
         
+        if self.cassette_recorder is not None:
+            self.cassette_recorder.begin_turn(self, user_input)
+        
         try:
             response = self.brain.generate_response(user_input)
         except Exception as e:
@@ -922,6 +927,9 @@ class GameApp:
         image = None
         visual_change_detected = response.get("visual_change_detected", False)
         image_generation_reasons = response.get("image_generation_reasons", [])
+        comfyui_time = 0.0  # 이번 턴 이미지의 ComfyUI 응답 시간 (이미지 생성이 있었을 때만)
+        # 스케줄러 우선순위: 첫 이미지 > 관계 전환 > 일반 트리거 > 주기적 갱신
+        image_priority = priority_for_triggers(response.get("image_generation_triggers", []))
         new_image_generated = False  # 새 이미지가 생성되었는지 추적
 
         # 첫 턴 또는 아직 한 번도 이미지가 생성되지 않은 경우, 강제로 한 번은 이미지 생성 시도
@@ -930,12 +938,25 @@ class GameApp:
             if image_generation_reasons is None:
                 image_generation_reasons = []
             image_generation_reasons.append("첫 턴 또는 초기 상태: 아직 이미지가 없어 강제로 한 번 생성합니다.")
+        if self.current_image is None:
+            image_priority = PRIORITY_FIRST
+        
+        # 이미지 필요성 판단: 마지막 이미지와 거의 같으면 생략, 비슷하면 이전 이미지에서 img2img로 가볍게 생성
+        image_downgrade = False
+        gate_turn = self.brain.state.total_turns if self.brain and self.brain.state else 0
+        if config.IMAGE_MODE_ENABLED and visual_change_detected and self.current_image is not None:
+            decision = self.image_gate.decide(response.get("visual_prompt", ""), emotion, response.get("background", ""), gate_turn)
+            if decision == SKIP:
+                visual_change_detected = False
+                logger.info(f"이미지 생성 생략 (이전 이미지와 거의 같음, 트리거: {image_generation_reasons})")
+            image_downgrade = decision == DOWNGRADE
         
         if visual_change_detected and config.IMAGE_MODE_ENABLED:
             # LLM Provider에 따라 모델 offload 대기 여부 결정
+            # settings.json의 provider가 아니라 실제 사용 중인 provider 기준 (OpenRouter 연결 실패로 Ollama 폴백한 경우도 대기,
+            # 카세트 재생 중에는 provider가 "replay"라 대기하지 않음)
             env_config = self.load_env_config()
-            llm_settings = env_config.get("llm_settings", {})
-            provider = llm_settings.get("provider", "ollama")
+            provider = self.brain.memory_manager.provider
 
             if provider == "ollama":
                 # 로컬 Ollama 모델을 VRAM에서 내리기 위한 대기
@@ -1020,8 +1041,10 @@ class GameApp:
                         negative_prompt=negative_prompt,
                         upscale_model_name=upscale_model_name,
                         lora_name=lora_name,
-                        lora_strength_model=lora_strength_model
+                        lora_strength_model=lora_strength_model,
+                        extra_servers=comfyui_settings.get("extra_servers", [])
                     )
+                    self.comfy_client.recorder = self.cassette_recorder
                     # LoRA 사용 여부에 따라 로그 메시지 분리
                     if lora_name is not None:
                         logger.info(
@@ -1069,11 +1092,41 @@ class GameApp:
                 # 현재 턴 번호 가져오기
                 turn_number = self.brain.state.total_turns if self.brain and self.brain.state else None
                 
-                image_bytes = self.comfy_client.generate_image(
+                # img2img 연속 모드: 배경/외모/의상이 그대로면 이전 이미지에서 시작 (표정/포즈만 변경)
+                # 이미지 판단이 켜져 있으면 DOWNGRADE일 때만 사용 (RENDER는 프롬프트가 많이 바뀐 것이므로 txt2img로 새로 생성)
+                scene_key = self._scene_key(background, appearance, visual_prompt)
+                init_image = None
+                if image_downgrade or not config.IMAGE_GATE_CONFIG["enabled"]:
+                    init_image = self._continuity_init_image(scene_key)
+                if image_downgrade and init_image is None:
+                    # 장면(배경/외모/의상)이 바뀌었거나 연속 횟수 초과 → 이전 이미지에서 그리지 않고 그대로 생성
+                    self.image_gate.reclassify(DOWNGRADE, RENDER)
+                    logger.info("img2img 조건 불충족 - txt2img로 생성")
+                continuity = init_image is not None
+                
+                # 배경 플레이트: 같은 장소면 인물 없는 배경 플레이트에서 시작 (처음 보는 배경은 턴 이미지 생성 후 백그라운드에서 렌더링)
+                init_denoise = None
+                plate_missing = False
+                if init_image is None:
+                    plate = get_background_plates().get(self.comfy_client, background)
+                    if plate is not None:
+                        init_image, init_denoise = plate, config.BACKGROUND_PLATE_CONFIG["denoise"]
+                        logger.info("배경 플레이트에서 생성")
+                    else:
+                        plate_missing = True
+                
+                image_result = self._generate_turn_image(
                     visual_prompt=visual_prompt,
                     appearance=appearance,
-                    seed=-1
+                    rng=self.brain.rng if self.brain else None,  # 세션 RNG에서 시드 추출 (재현 가능)
+                    init_image=init_image,
+                    init_denoise=init_denoise,
+                    priority=image_priority
                 )
+                image_bytes = image_result.image
+                comfyui_time = image_result.elapsed
+                if plate_missing:
+                    get_background_plates().prefetch(self.comfy_client, background)
                 
                 if image_bytes:
                     # PIL Image로 변환 (오버레이 없이 원본 그대로 저장)
@@ -1083,8 +1136,15 @@ class GameApp:
                     # 마지막 이미지 생성 정보 저장 (재시도용)
                     self.last_image_generation_info = {
                         "visual_prompt": visual_prompt,
-                        "appearance": appearance
+                        "appearance": appearance,
+                        "seed": image_result.seed,
+                        "init_image": init_image,
+                        "init_denoise": init_denoise
                     }
+                    self._last_scene_key = scene_key
+                    self._last_image_bytes = image_bytes
+                    self._continuity_chain = self._continuity_chain + 1 if continuity else 0
+                    self.image_gate.record(response.get("visual_prompt", ""), emotion, response.get("background", ""), gate_turn)
                     new_image_generated = True  # 새 이미지 생성됨
                     logger.info("Image generated successfully")
                 else:
@@ -1105,11 +1165,6 @@ class GameApp:
         # LLM 응답 시간 가져오기
         llm_time = getattr(self.brain, '_last_llm_time', 0.0)
         
-        # ComfyUI 응답 시간 가져오기 (이미지 생성이 있었을 때만)
-        comfyui_time = 0.0
-        if self.comfy_client is not None:
-            comfyui_time = getattr(self.comfy_client, '_last_comfyui_time', 0.0)
-        
         # 마지막 로그에 모든 시간 정보 표시
         logger.info("=" * 80)
         logger.info("⏱️ [전체 완료 시간 요약]")
@@ -1120,14 +1175,158 @@ class GameApp:
         else:
             logger.info(f"  ComfyUI 응답 시간: (이미지 생성 없음)")
         logger.info(f"  전체 완료 시간: {total_elapsed_time:.2f}s")
+        gate_stats = self.image_gate.stats()
+        if gate_stats["decisions"]:
+            logger.info(f"  이미지 판단: 생성 {gate_stats['rendered']}, img2img {gate_stats['downgraded']}, 생략 {gate_stats['avoided']} (예산 초과 {gate_stats['budget_skips']})")
+        scheduler_stats = get_image_scheduler().stats()
+        if scheduler_stats["completed"] or scheduler_stats["dropped"]:
+            logger.info(f"  이미지 스케줄러: 평균 대기 {scheduler_stats['avg_wait_seconds']:.2f}s, 대기 {scheduler_stats['queued']}, 실행 {scheduler_stats['running']}, 거절 {scheduler_stats['dropped']}")
         logger.info("=" * 80)
         
+        if self.cassette_recorder is not None:
+            self.cassette_recorder.end_turn(self.brain)
+        
         choices_text = "다음 대사를 입력하세요."
         thought_text = f"**{thought_label}**: {thought}" if thought else ""
         action_text = f"**{action_label}**: {action_speech}" if action_speech else ""
         
         return history, output_text, stats_text, image, choices_text, thought_text, action_text, radar_chart, event_notification
     
+    def reset_image_state(self):
+        """
+        게임별 이미지 상태 초기화 (새 게임, 시나리오 불러오기)
+        이전 게임의 변형 버퍼/고품질 이미지/img2img 기준 이미지/이미지 판단 기준이 다음 게임에 섞이지 않도록
+        """
+        self.last_image_generation_info = None
+        self.image_variants = []
+        self.refined_image = None
+        # 이전 게임에서 아직 생성 중인 고품질 이미지는 도착해도 무시
+        self._image_generation_id += 1
+        self.image_progress = None
+        self._last_scene_key = None
+        self._last_image_bytes = None
+        self._continuity_chain = 0
+        self.image_gate = ImageGate()
+        self.session_id = uuid.uuid4().hex[:8]
+    
+    def _scene_key(self, background: str, appearance: str, visual_prompt: str) -> Tuple[str, str, Tuple[str, ...]]:
+        """img2img 연속 모드 판단용 장면 키 (배경, 외모, 의상 태그)"""
+        keywords = config.IMAGE_CONTINUITY_CONFIG["outfit_keywords"]
+        tags = [tag.strip().lower() for tag in (visual_prompt or "").split(",")]
+        outfit = tuple(sorted(tag for tag in tags if any(keyword in tag for keyword in keywords)))
+        return (background or "").strip().lower(), (appearance or "").strip().lower(), outfit
+    
+    def _continuity_init_image(self, scene_key: Tuple) -> Optional[bytes]:
+        """이전 이미지와 장면이 같으면 img2img 시작 이미지 반환 (아니면 None → txt2img)"""
+        settings = config.IMAGE_CONTINUITY_CONFIG
+        if not settings["enabled"] or self._last_image_bytes is None or not scene_key[0]:
+            return None
+        if scene_key != self._last_scene_key:
+            logger.info("장면 변경 (배경/외모/의상) - txt2img로 새로 생성")
+            return None
+        if self._continuity_chain >= settings["max_chain"]:
+            logger.info(f"연속 img2img {self._continuity_chain}회 - txt2img로 새로 생성")
+            return None
+        return self._last_image_bytes
+    
+    def _generate_turn_image(self, visual_prompt: str, appearance: str, rng=None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None, priority: int = PRIORITY_TRANSITION) -> ImageResult:
+        """
+        이미지 생성 (이미지 스케줄러에서 차례를 기다린 뒤 실행, 낮은 우선순위 작업은 GPU가 밀려 있으면 거절되어 빈 결과)
+        Returns: 이미지 + 시드 + ComfyUI 응답 시간 (변형 배치면 첫 장이 result.image)
+        - 변형 미리 생성이 켜져 있으면 한 배치로 여러 장 생성 후 첫 장 반환, 나머지는 재시도용 버퍼에 보관
+        - 미리보기 모드면 미리보기를 반환하고, 고품질 이미지는 완성되면 refined_image에 저장
+        - init_image가 있으면 img2img (연속 모드 또는 배경 플레이트, init_denoise가 None이면 연속 모드 설정값)
+        """
+        result = get_image_scheduler().run(
+            self.session_id,
+            priority,
+            lambda: self._run_turn_image(visual_prompt, appearance, rng, init_image, init_denoise)
+        )
+        return result if result is not None else ImageResult()
+    
+    def _run_turn_image(self, visual_prompt: str, appearance: str, rng=None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None) -> ImageResult:
+        """_generate_turn_image의 실제 생성 (스케줄러 슬롯을 잡은 상태에서 호출)"""
+        # 이전 프롬프트의 변형과 진행 중인 고품질 이미지는 더 이상 유효하지 않음
+        self.image_variants = []
+        self.refined_image = None
+        self._image_generation_id += 1
+        # 생성 중 진행률/미리보기 스트림 (UI 타이머가 poll_image_progress로 읽음)
+        progress = JobProgress() if config.IMAGE_PROGRESS_CONFIG["enabled"] else None
+        self.image_progress = progress
+        try:
+            settings = config.IMAGE_VARIANTS_CONFIG
+            batch_size = settings["batch_size"] if settings["enabled"] else 1
+            if batch_size <= 1:
+                if config.IMAGE_PREVIEW_CONFIG["enabled"]:
+                    generation_id = self._image_generation_id
+                    
+                    def on_final(image_bytes: Optional[bytes]):
+                        if image_bytes and generation_id == self._image_generation_id:
+                            self.refined_image = Image.open(io.BytesIO(image_bytes))
+                            # 다음 턴 img2img는 미리보기가 아니라 고품질 이미지에서 시작
+                            self._last_image_bytes = image_bytes
+                            logger.info("✅ 고품질 이미지 완성 (미리보기 교체 대기)")
+                    
+                    # 고품질 패스도 이 세션의 작업으로 스케줄러를 거침 (턴 이미지보다 낮은 우선순위)
+                    session_id = self.session_id
+                    
+                    def schedule_refine(job):
+                        return get_image_scheduler().run(session_id, PRIORITY_REFINE, job)
+                    
+                    return self.comfy_client.generate_image_staged(visual_prompt=visual_prompt, appearance=appearance, seed=-1, rng=rng, on_final=on_final, progress=progress, init_image=init_image, init_denoise=init_denoise, schedule_refine=schedule_refine)
+                return self.comfy_client.generate_image(visual_prompt=visual_prompt, appearance=appearance, seed=-1, rng=rng, progress=progress, init_image=init_image, init_denoise=init_denoise)
+            
+            result = self.comfy_client.generate_images(visual_prompt=visual_prompt, appearance=appearance, seed=-1, rng=rng, batch_size=batch_size, progress=progress, init_image=init_image, init_denoise=init_denoise)
+            if result:
+                self.image_variants = result.images[1:]
+                logger.info(f"Image variants buffered: {len(self.image_variants)}")
+            return result
+        finally:
+            if self.image_progress is progress:
+                self.image_progress = None
+    
+    def poll_image_progress(self) -> Optional[Tuple[Optional[Image.Image], str]]:
+        """
+        생성 중인 이미지의 진행 상황 (UI 타이머용)
+        Returns: (새 저해상도 미리보기 또는 None, 진행률 텍스트 - 작업이 끝났으면 빈 문자열), 마지막 확인 이후 바뀐 게 없으면 None
+        """
+        progress = self.image_progress
+        if progress is None:
+            if self._image_progress_version is None:
+                return None
+            self._image_progress_version = None
+            self._image_progress_preview = None
+            return None, ""
+        
+        snapshot = progress.snapshot()
+        if snapshot["version"] == self._image_progress_version:
+            return None
+        self._image_progress_version = snapshot["version"]
+        
+        preview = None
+        if snapshot["preview"] is not None and snapshot["preview"] is not self._image_progress_preview:
+            self._image_progress_preview = snapshot["preview"]
+            try:
+                preview = Image.open(io.BytesIO(snapshot["preview"]))
+            except Exception as e:
+                logger.debug(f"Progress preview decode failed: {e}")
+        
+        if snapshot["max"]:
+            filled = int(10 * snapshot["value"] / snapshot["max"])
+            text = f"🎨 {'▓' * filled}{'░' * (10 - filled)} {snapshot['value']}/{snapshot['max']}"
+        else:
+            text = "🎨 ░░░░░░░░░░"
+        return preview, text
+    
+    def take_refined_image(self) -> Optional[Image.Image]:
+        """완성된 고품질 이미지를 꺼내 현재 이미지로 교체 (없으면 None)"""
+        image = self.refined_image
+        if image is None:
+            return None
+        self.refined_image = None
+        self.current_image = image
+        return image
+    
     def retry_image_generation(self) -> Tuple[Optional[Image.Image], str]:
         """마지막 이미지 생성 정보를 재사용하여 이미지 재생성"""
         i18n = get_i18n()
@@ -1148,18 +1347,27 @@ class GameApp:
             logger.info(f"  appearance: {appearance[:50] if appearance else 'None'}...")
             logger.info(f"  visual_prompt: {visual_prompt[:100]}...")
             
-            # ComfyUI에 이미지 생성 요청 (seed는 랜덤으로)
-            image_bytes = self.comfy_client.generate_image(
-                visual_prompt=visual_prompt,
-                appearance=appearance,
-                seed=-1  # 랜덤 시드
-            )
+            # 미리 생성된 변형이 있으면 바로 사용 (GPU 대기 없음)
+            if self.image_variants:
+                image_bytes = self.image_variants.pop(0)
+                logger.info(f"✅ 미리 생성된 변형 사용 (남은 변형: {len(self.image_variants)})")
+            else:
+                # ComfyUI에 이미지 생성 요청 (seed는 세션 RNG 스트림에서 새로 추출)
+                # img2img로 생성된 이미지였으면 같은 시작 이미지에서 다시 생성
+                image_bytes = self._generate_turn_image(
+                    visual_prompt=visual_prompt,
+                    appearance=appearance,
+                    rng=self.brain.rng if self.brain else None,
+                    init_image=self.last_image_generation_info.get("init_image"),
+                    init_denoise=self.last_image_generation_info.get("init_denoise")
+                ).image
             
             if image_bytes:
                 # PIL Image로 변환 (오버레이 없이 원본 그대로)
                 image = Image.open(io.BytesIO(image_bytes))
                 # 현재 이미지로 업데이트
                 self.current_image = image
+                self._last_image_bytes = image_bytes
                 logger.info("✅ 이미지 재생성 완료")
                 return image, i18n.get_text("msg_retry_success", category="ui")
             else:
@@ -1180,6 +1388,7 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Zeniji Emotion Simul")
     parser.add_argument("--dev-mode", action="store_true", help="개발자 모드 활성화")
     parser.add_argument("--log-level", default="INFO", help="로깅 레벨 설정")
+    parser.add_argument("--record-cassette", type=Path, default=None, help="LLM/ComfyUI 응답을 카세트 파일로 녹화 (replay.py로 재생)")
     return parser.parse_args()
 
 
@@ -1254,6 +1463,10 @@ def main():
     logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.INFO))
 
     app = GameApp(dev_mode=args.dev_mode)
+    if args.record_cassette:
+        from replay import CassetteRecorder
+        app.cassette_recorder = CassetteRecorder(args.record_cassette)
+        logger.info(f"🎬 Recording cassette: {args.record_cassette}")
     demo = app.create_ui()
     
     # 사용 가능한 포트 찾기
@@ -1288,4 +1501,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 빌드된 실행 파일에서 이미지 저장 프로세스 풀이 main()을 다시 실행하지 않도록
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,118 @@
+"""
+Zeniji Emotion Simul - Background Plates
+배경(current_background)별 인물 없는 배경 플레이트 캐시
+- 처음 보는 배경은 한 번만 백그라운드에서 렌더링해 이미지 캐시(디스크)에 저장 (스타일/모델/워크플로우별)
+  렌더링은 그 턴의 이미지가 끝난 뒤 시작 (스케줄러는 실행 중인 작업을 선점하지 않으므로 턴 이미지보다 먼저 GPU를 잡지 않도록)
+- 같은 장소의 이후 턴은 플레이트를 시작 이미지로 인물만 그림 (img2img) → 배경이 턴마다 바뀌지 않고 스텝 감소
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import config
+from image_cache import get_image_cache
+from image_scheduler import get_image_scheduler, PRIORITY_REFRESH
+
+logger = logging.getLogger("BackgroundPlates")
+
+
+def normalize_background(background: str) -> str:
+    """대소문자/공백 차이는 같은 배경으로 취급"""
+    return " ".join((background or "").lower().split())
+
+
+class BackgroundPlateCache:
+    """배경 플레이트 조회 및 백그라운드 렌더링 (모든 세션 공유)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.BACKGROUND_PLATE_CONFIG
+        self._lock = threading.Lock()
+        self._rendering: set = set()
+        # key -> 마지막 렌더링 실패 시각 (retry_after 동안 다시 시도하지 않음)
+        self._failed: Dict[str, float] = {}
+        self.hits = 0
+        self.rendered = 0
+    
+    def plate_key(self, comfy_client, background: str) -> str:
+        """배경 + 스타일/모델/워크플로우/LoRA → 이미지 캐시 키"""
+        identity = "|".join([
+            normalize_background(background),
+            str(comfy_client.style),
+            str(comfy_client.model_name),
+            str(comfy_client.workflow_path),
+            str(comfy_client.lora_name or ""),
+        ])
+        return "plate-" + hashlib.sha256(identity.encode("utf-8")).hexdigest()
+    
+    def get(self, comfy_client, background: str) -> Optional[bytes]:
+        """플레이트가 있으면 반환, 없으면 None (렌더링은 prefetch로 따로 시작)"""
+        if not self.settings["enabled"] or comfy_client is None or not normalize_background(background):
+            return None
+        plate = get_image_cache().get(self.plate_key(comfy_client, background))
+        if plate is not None:
+            with self._lock:
+                self.hits += 1
+        return plate
+    
+    def prefetch(self, comfy_client, background: str):
+        """플레이트가 없으면 백그라운드 렌더링 시작 (블로킹하지 않음, 턴 이미지 생성이 끝난 뒤 호출)"""
+        if not self.settings["enabled"] or comfy_client is None or not normalize_background(background):
+            return
+        key = self.plate_key(comfy_client, background)
+        if get_image_cache().get(key) is None:
+            self._render_async(comfy_client, background, key)
+    
+    def _render_async(self, comfy_client, background: str, key: str):
+        with self._lock:
+            if key in self._rendering:
+                return
+            if time.time() - self._failed.get(key, 0.0) < self.settings["retry_after"]:
+                return
+            self._rendering.add(key)
+        
+        def run():
+            start = time.perf_counter()
+            try:
+                # 플레이트는 가장 낮은 우선순위 (GPU가 밀려 있으면 스케줄러가 거절 → retry_after 후 재시도)
+                result = get_image_scheduler().run("background_plates", PRIORITY_REFRESH, lambda: comfy_client.generate_plate(background))
+                plate = result.image if result else None
+                if plate:
+                    get_image_cache().put(key, plate)
+                    with self._lock:
+                        self.rendered += 1
+                        self._failed.pop(key, None)
+                    logger.info(f"✅ 배경 플레이트 렌더링 완료: {background[:50]} ({time.perf_counter() - start:.2f}s)")
+                else:
+                    with self._lock:
+                        self._failed[key] = time.time()
+                    logger.warning(f"⚠️ 배경 플레이트 렌더링 실패: {background[:50]}")
+            except Exception as e:
+                with self._lock:
+                    self._failed[key] = time.time()
+                logger.error(f"❌ 배경 플레이트 렌더링 중 오류: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+            finally:
+                with self._lock:
+                    self._rendering.discard(key)
+        
+        threading.Thread(target=run, name="BackgroundPlate", daemon=True).start()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "rendered": self.rendered, "rendering": len(self._rendering), "failed": len(self._failed)}
+
+
+# 전역 인스턴스
+_global_background_plates: Optional[BackgroundPlateCache] = None
+
+
+def get_background_plates() -> BackgroundPlateCache:
+    """전역 BackgroundPlateCache 인스턴스 가져오기"""
+    global _global_background_plates
+    if _global_background_plates is None:
+        _global_background_plates = BackgroundPlateCache()
+    return _global_background_plates
@@ -0,0 +1,302 @@
+"""
+Zeniji Emotion Simul - Balance Simulator
+헤드리스 몬테카를로 밸런스 시뮬레이터 (numpy 배치)
+- 세션 배치를 (N, 6) 수치 배열 + 트라우마 + 상태 코드로 표현
+- 턴마다 proposed_delta 샘플링 → 가챠 → 트라우마 페널티 → clamp → 뱃지/관계 전환
+- Badge 도달률, 관계 상태 도달 시간, 트라우마 분포 보고
+
+사용법: python balance_simulator.py --sessions 1000000 --turns 100 --profile affectionate
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+import config
+from rules_engine import AXES, STATUS_CODES, STATUS_NAMES, get_rules
+
+logger = logging.getLogger("BalanceSimulator")
+
+
+def roll_gacha_batch(rng: np.random.Generator, n: int):
+    """
+    roll_gacha_v3의 배치 버전 (1000분위 주사위)
+    Returns: (tier_index (N,), multiplier (N,)), tier_index == len(GACHA_TIERS)이면 폴백 normal
+    """
+    tiers = list(config.GACHA_TIERS.values())
+    cumulative = np.cumsum([int(tier["prob"] * 1000) for tier in tiers])
+    multipliers = np.array([tier["multiplier"] for tier in tiers] + [1.0])
+    roll = rng.integers(1, 1001, size=n)
+    tier_index = np.searchsorted(cumulative, roll, side="left")
+    return tier_index, multipliers[tier_index]
+
+
+def apply_trauma_on_breakup_batch(stats: np.ndarray, trauma: np.ndarray, status: np.ndarray, mask: np.ndarray):
+    """apply_trauma_on_breakup의 배치 버전 (mask: Breakup/Divorce에 진입한 세션)"""
+    if not mask.any():
+        return
+    i_idx, t_idx = AXES.index("I"), AXES.index("T")
+    trauma[mask] = np.minimum(1.0, trauma[mask] + 0.25)
+    
+    breakup = mask & (status == STATUS_CODES["Breakup"])
+    divorce = mask & (status == STATUS_CODES["Divorce"])
+    status[breakup & (stats[:, i_idx] < 40)] = STATUS_CODES["Stranger"]
+    status[breakup & (stats[:, i_idx] >= 40)] = STATUS_CODES["Acquaintance"]
+    status[divorce] = STATUS_CODES["Stranger"]
+    
+    keep = (1.0 - trauma[mask])
+    stats[mask, i_idx] = np.maximum(0.0, stats[mask, i_idx] * keep)
+    stats[mask, t_idx] = np.maximum(0.0, stats[mask, t_idx] * keep)
+    np.clip(stats, 0.0, 100.0, out=stats)
+
+
+class BalanceSimulator:
+    """CharacterState 배치 시뮬레이터"""
+    
+    def __init__(self, profile: str = "neutral", seed: Optional[int] = None, sim_config: Dict = None):
+        self.sim_config = dict(config.BALANCE_SIM_CONFIG)
+        if sim_config:
+            self.sim_config.update(sim_config)
+        profiles = self.sim_config["delta_profiles"]
+        if profile not in profiles:
+            raise ValueError(f"Unknown delta profile '{profile}' (available: {', '.join(profiles)})")
+        self.profile = profile
+        self.delta_mean = np.array([profiles[profile]["mean"][axis] for axis in AXES], dtype=np.float32)
+        self.delta_std = np.array([profiles[profile]["std"][axis] for axis in AXES], dtype=np.float32)
+        self.rng = np.random.default_rng(seed)
+        self.rules = get_rules()
+        
+        # LLM 보고 전환 후보: 상태 코드별 (목적지 상태 목록)
+        self.llm_targets = {}
+        for name, data in self.rules.status_transitions.items():
+            targets = [t for t in data.get("to", []) if t in self.rules.llm_reported_statuses]
+            if targets and name in STATUS_CODES:
+                self.llm_targets[STATUS_CODES[name]] = targets
+    
+    def _sample_delta(self, n: int) -> np.ndarray:
+        """LLM proposed_delta 분포 샘플링 (_validate_response와 같이 정수화 후 -10~10 제한)"""
+        delta = self.rng.standard_normal((n, len(AXES)), dtype=np.float32)
+        delta *= self.delta_std
+        delta += self.delta_mean
+        np.rint(delta, out=delta)
+        return np.clip(delta, -10, 10, out=delta)
+    
+    def _run_chunk(self, n: int, turns: int, acc: Dict):
+        """세션 n개를 turns 턴 동안 시뮬레이션하고 결과를 acc에 누적"""
+        rules = self.rules
+        initial = self.sim_config["initial_stats"]
+        stats = np.tile(np.array([initial[axis] for axis in AXES], dtype=np.float32), (n, 1))
+        trauma = np.zeros(n, dtype=np.float32)
+        status = np.full(n, STATUS_CODES["Stranger"], dtype=np.int16)
+        
+        n_badges = len(rules.badges.names)
+        n_status = len(STATUS_NAMES)
+        badge_first = np.full((n, n_badges), -1, dtype=np.int32)
+        status_first = np.full((n, n_status), -1, dtype=np.int32)
+        status_first[:, STATUS_CODES["Stranger"]] = 0
+        breakups = np.zeros(n, dtype=np.int32)
+        rows = np.arange(n)
+        
+        i_idx, t_idx = AXES.index("I"), AXES.index("T")
+        exit_codes = [STATUS_CODES["Breakup"], STATUS_CODES["Divorce"]]
+        report_prob = self.sim_config["llm_report_prob"]
+        trauma_on_breakup = self.sim_config["trauma_on_breakup"]
+        
+        def enter(mask: np.ndarray, new_codes: np.ndarray, turn: int):
+            """상태 전환 반영 + 최초 도달 턴 기록 + 이탈 시 트라우마"""
+            if not mask.any():
+                return
+            status[mask] = new_codes[mask] if new_codes.shape else new_codes
+            entered = rows[mask]
+            first_col = status_first[entered, status[mask]]
+            status_first[entered, status[mask]] = np.where(first_col < 0, turn, first_col)
+            exited = mask & np.isin(status, exit_codes)
+            breakups[exited] += 1
+            if trauma_on_breakup:
+                apply_trauma_on_breakup_batch(stats, trauma, status, exited)
+        
+        for turn in range(1, turns + 1):
+            # 1. Python 기반 자동 관계 전환 (델타 적용 전 상태 기준)
+            auto_idx = rules.auto_transitions.evaluate_batch(stats, status)
+            moved = auto_idx >= 0
+            if moved.any():
+                targets = np.array([STATUS_CODES[t] for t in rules.auto_targets], dtype=np.int16)
+                enter(moved, targets[np.where(moved, auto_idx, 0)], turn)
+            
+            # 2. 델타 샘플링 + 가챠
+            delta = self._sample_delta(n)
+            tier_index, multiplier = roll_gacha_batch(self.rng, n)
+            acc["gacha_counts"] += np.bincount(tier_index, minlength=len(acc["gacha_counts"]))
+            delta *= multiplier[:, None]
+            
+            # 3. 트라우마 페널티 (I, T의 긍정 델타) + clamp
+            if trauma.any():
+                penalty = 1.0 - trauma
+                for axis in (i_idx, t_idx):
+                    delta[:, axis] *= np.where(delta[:, axis] > 0, penalty, 1.0)
+            stats += delta
+            np.clip(stats, 0.0, 100.0, out=stats)
+            
+            # 4. 뱃지 검사 (첫 번째로 일치한 뱃지만 획득)
+            badge_idx = rules.badges.evaluate_batch(stats)
+            got = badge_idx >= 0
+            if got.any():
+                hit_rows = rows[got]
+                hit_cols = badge_idx[got]
+                prev = badge_first[hit_rows, hit_cols]
+                badge_first[hit_rows, hit_cols] = np.where(prev < 0, turn, prev)
+            
+            # 5. LLM 보고 관계 전환 (수치 조건 검증 후 적용, 조건을 만족하는 후보 중 무작위 선택)
+            reports = self.rng.random(n) < report_prob
+            current = status.copy()
+            for code, targets in self.llm_targets.items():
+                candidates = reports & (current == code)
+                if not candidates.any():
+                    continue
+                eligible = np.stack([rules.status_entry.evaluate_mask(t, stats) for t in targets]) & candidates
+                scores = np.where(eligible, self.rng.random(eligible.shape), -1.0)
+                choice = scores.argmax(axis=0)
+                chosen = eligible.any(axis=0)
+                target_codes = np.array([STATUS_CODES[t] for t in targets], dtype=np.int16)
+                enter(chosen, target_codes[choice], turn)
+        
+        acc["sessions"] += n
+        acc["badge_first"].append(badge_first)
+        acc["status_first"].append(status_first)
+        acc["final_trauma"].append(trauma)
+        acc["breakups"].append(breakups)
+        acc["final_stats"].append(stats)
+    
+    def run(self, sessions: int = None, turns: int = None) -> Dict:
+        """시뮬레이션 실행 후 요약 리포트 반환"""
+        sessions = sessions or self.sim_config["sessions"]
+        turns = turns or self.sim_config["turns"]
+        chunk_size = self.sim_config["chunk_size"]
+        
+        acc = {
+            "sessions": 0,
+            "gacha_counts": np.zeros(len(config.GACHA_TIERS) + 1, dtype=np.int64),
+            "badge_first": [], "status_first": [], "final_trauma": [], "breakups": [], "final_stats": []
+        }
+        start = time.time()
+        remaining = sessions
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            self._run_chunk(n, turns, acc)
+            remaining -= n
+        elapsed = time.time() - start
+        logger.info(f"⏱️ Simulated {sessions:,} sessions x {turns} turns in {elapsed:.2f} s")
+        return self._summarize(acc, turns, elapsed)
+    
+    @staticmethod
+    def _first_turn_summary(first: np.ndarray, names) -> Dict:
+        """최초 도달 턴 배열 (N, K) → 이름별 도달률/턴 통계"""
+        summary = {}
+        for col, name in enumerate(names):
+            reached = first[:, col]
+            reached = reached[reached >= 0]
+            entry = {"reach_rate": float(len(reached) / max(1, first.shape[0]))}
+            if len(reached):
+                entry.update({
+                    "mean_turn": float(reached.mean()),
+                    "median_turn": float(np.median(reached)),
+                    "p90_turn": float(np.percentile(reached, 90)),
+                })
+            summary[name] = entry
+        return summary
+    
+    def _summarize(self, acc: Dict, turns: int, elapsed: float) -> Dict:
+        """누적 결과 요약"""
+        badge_first = np.concatenate(acc["badge_first"])
+        status_first = np.concatenate(acc["status_first"])
+        trauma = np.concatenate(acc["final_trauma"])
+        breakups = np.concatenate(acc["breakups"])
+        final_stats = np.concatenate(acc["final_stats"])
+        
+        tier_names = list(config.GACHA_TIERS.keys()) + ["normal(fallback)"]
+        total_rolls = max(1, int(acc["gacha_counts"].sum()))
+        levels, counts = np.unique(np.round(trauma, 2), return_counts=True)
+        
+        return {
+            "profile": self.profile,
+            "sessions": acc["sessions"],
+            "turns": turns,
+            "elapsed_sec": round(elapsed, 3),
+            "gacha": {name: float(count / total_rolls) for name, count in zip(tier_names, acc["gacha_counts"]) if count},
+            "badges": self._first_turn_summary(badge_first, self.rules.badges.names),
+            "statuses": self._first_turn_summary(status_first, STATUS_NAMES),
+            "trauma": {
+                "distribution": {f"{level:.2f}": float(count / len(trauma)) for level, count in zip(levels, counts)},
+                "mean": float(trauma.mean()),
+                "mean_breakups": float(breakups.mean()),
+            },
+            "final_stats_mean": {axis: float(final_stats[:, idx].mean()) for idx, axis in enumerate(AXES)},
+        }
+
+
+def format_report(report: Dict) -> str:
+    """리포트를 터미널용 텍스트로 변환"""
+    lines = [
+        "=" * 60,
+        f"📊 Balance Simulation [{report['profile']}] "
+        f"{report['sessions']:,} sessions x {report['turns']} turns ({report['elapsed_sec']} s)",
+        "=" * 60,
+        "🎰 Gacha tiers:",
+    ]
+    for name, rate in report["gacha"].items():
+        lines.append(f"  {name:<20} {rate * 100:6.2f}%")
+    
+    def add_reach_table(title, table):
+        lines.append(title)
+        for name, entry in table.items():
+            if entry["reach_rate"] > 0:
+                lines.append(
+                    f"  {name:<20} {entry['reach_rate'] * 100:6.2f}%  "
+                    f"median {entry['median_turn']:5.1f}  p90 {entry['p90_turn']:5.1f}"
+                )
+            else:
+                lines.append(f"  {name:<20}   0.00%  (unreachable)")
+    
+    add_reach_table("🏅 Badge reachability (first turn):", report["badges"])
+    add_reach_table("💞 Time to status (first turn):", report["statuses"])
+    
+    lines.append("💔 Trauma distribution (final):")
+    for level, rate in report["trauma"]["distribution"].items():
+        lines.append(f"  trauma {level}  {rate * 100:6.2f}%")
+    lines.append(f"  mean breakups/session: {report['trauma']['mean_breakups']:.3f}")
+    lines.append("📈 Final stats mean: " + ", ".join(f"{k}={v:.1f}" for k, v in report["final_stats_mean"].items()))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Zeniji Emotion Simul - Balance Simulator")
+    parser.add_argument("--sessions", type=int, default=config.BALANCE_SIM_CONFIG["sessions"], help="시뮬레이션 세션 수")
+    parser.add_argument("--turns", type=int, default=config.BALANCE_SIM_CONFIG["turns"], help="세션당 턴 수")
+    parser.add_argument("--profile", default="neutral", choices=list(config.BALANCE_SIM_CONFIG["delta_profiles"].keys()), help="proposed_delta 분포 프로필")
+    parser.add_argument("--seed", type=int, default=None, help="난수 시드 (재현용)")
+    parser.add_argument("--report-prob", type=float, default=None, help="LLM 관계 전환 보고 확률")
+    parser.add_argument("--json", action="store_true", help="JSON으로 출력")
+    return parser.parse_args()
+
+
+def main():
+    """CLI 실행"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    args = parse_args()
+    overrides = {}
+    if args.report_prob is not None:
+        overrides["llm_report_prob"] = args.report_prob
+    simulator = BalanceSimulator(profile=args.profile, seed=args.seed, sim_config=overrides)
+    report = simulator.run(sessions=args.sessions, turns=args.turns)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
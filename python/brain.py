@@ -3,10 +3,15 @@ Zeniji Emotion Simul - Brain (The Director)
 최상위 통제 모듈: 프롬프트 조립, LLM 호출, JSON 파싱, VRAM 교대 결정
 """
 
+import copy
 import json
 import re
+import random
 import logging
-from typing import Dict, Optional, Any
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Any
 from state_manager import CharacterState, DialogueHistory, DialogueTurn
 import config
 from logic_engine import (
@@ -15,6 +20,8 @@ from logic_engine import (
     get_intimacy_level, get_trust_level, get_dependency_level,
     apply_trauma_on_breakup, validate_status_transition_condition
 )
+from rules_engine import get_rules
+from json_repair import repair_json, get_recovery_metrics
 from memory_manager import MemoryManager
 from i18n import get_i18n
 from config_manager import ConfigManager
@@ -39,8 +46,54 @@ class Brain:
         self.turns_since_image = 0
         # 초기 설정 정보
         self.initial_config: Optional[Dict] = None
+        # 프롬프트 모드 (settings.json의 llm_settings.prompt_mode, set_prompt_mode로 갱신)
+        self.set_prompt_mode(config.LLM_CHAT_CONFIG["prompt_mode"])
         # 시간 측정용 변수
         self._last_llm_time = 0.0
+        # 세션 전용 RNG (가챠, 이미지 시드) - 시드를 기록해 세션을 그대로 재현 가능
+        self.rng_seed: int = 0
+        self.rng = random.Random()
+        self.reset_rng(config.RNG_SEED)
+        # 턴 처리 잠금 (예열과 턴 처리가 동시에 상태를 읽지 않도록) 및 예열 상태
+        self._turn_lock = threading.Lock()
+        self._prewarm_thread: Optional[threading.Thread] = None
+        self._prewarm_key: Optional[str] = None
+        self._prewarm_at = 0.0
+    
+    def reset_rng(self, seed: Optional[int] = None) -> int:
+        """세션 RNG 초기화 (seed가 None이면 새 무작위 시드 생성). 사용한 시드 반환"""
+        if seed is None:
+            seed = random.SystemRandom().randint(0, 2**32 - 1)
+        self.rng_seed = int(seed)
+        self.rng.seed(self.rng_seed)
+        logger.info(f"Session RNG seeded: {self.rng_seed}")
+        return self.rng_seed
+    
+    def get_rng_state(self) -> Dict[str, Any]:
+        """시나리오 저장용 RNG 정보 (시드 + 현재 스트림 위치)"""
+        version, internal_state, gauss_next = self.rng.getstate()
+        return {
+            "rng_seed": self.rng_seed,
+            "rng_state": [version, list(internal_state), gauss_next]
+        }
+    
+    def set_rng_state(self, data: Dict[str, Any]):
+        """시나리오 불러오기 시 RNG 복원 (스트림 위치가 없으면 시드로 재시작)"""
+        seed = data.get("rng_seed")
+        if seed is None:
+            self.reset_rng()
+            return
+        self.rng_seed = int(seed)
+        rng_state = data.get("rng_state")
+        try:
+            if rng_state:
+                version, internal_state, gauss_next = rng_state
+                self.rng.setstate((version, tuple(internal_state), gauss_next))
+                logger.info(f"Session RNG restored: seed={self.rng_seed}")
+                return
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Invalid RNG state in scenario, reseeding: {e}")
+        self.rng.seed(self.rng_seed)
     
     def set_initial_config(self, config: Dict[str, Any]):
         """초기 설정 정보 설정"""
@@ -51,6 +104,61 @@ class Brain:
         """
         플레이어 입력에 대한 응답 생성
         """
+        with self._turn_lock:
+            try:
+                return self._generate_response(player_input)
+            finally:
+                # 턴 밖의 호출(예열 등)이 지난 턴의 마감 시각에 걸리지 않도록 해제
+                self.memory_manager.turn_deadline = None
+    
+    def prewarm(self) -> bool:
+        """
+        플레이어가 입력하는 동안 다음 턴 프롬프트 접두부(플레이어 입력 앞까지)를 미리 전송해 KV 캐시 예열
+        textbox change/focus 이벤트에서 호출되므로 간격 제한 + 같은 접두부 중복 전송 방지
+        Returns: 예열 요청을 시작했으면 True
+        """
+        settings = config.PREWARM_CONFIG
+        if not settings["enabled"] or self.memory_manager.provider not in settings["providers"]:
+            return False
+        now = time.monotonic()
+        if now - self._prewarm_at < settings["min_interval"]:
+            return False
+        if self._prewarm_thread is not None and self._prewarm_thread.is_alive():
+            return False
+        # 턴 처리 중이면 상태가 바뀌는 중이므로 건너뜀
+        if not self._turn_lock.acquire(blocking=False):
+            return False
+        try:
+            self._prewarm_at = now
+            sentinel = "\u0000PREWARM\u0000"
+            if self.prompt_mode == "chat":
+                messages = self._build_chat_messages(sentinel)
+                content = messages[-1]["content"]
+                messages[-1] = {"role": "user", "content": content[:content.rfind("\n", 0, content.find(sentinel)) + 1]}
+                prompt = None
+                key = json.dumps(messages, ensure_ascii=False)
+            else:
+                full_prompt = self._build_prompt(sentinel)
+                prompt = full_prompt[:full_prompt.rfind("\n", 0, full_prompt.find(sentinel)) + 1]
+                messages = None
+                key = prompt
+        except Exception as e:
+            logger.warning(f"Failed to build prewarm prefix: {e}")
+            return False
+        finally:
+            self._turn_lock.release()
+        
+        if key == self._prewarm_key:
+            return False
+        self._prewarm_key = key
+        self._prewarm_thread = threading.Thread(target=self.memory_manager.prefill, args=(prompt, messages), daemon=True)
+        self._prewarm_thread.start()
+        return True
+    
+    def _generate_response(self, player_input: str) -> Dict:
+        """generate_response 본체 (턴 잠금 보유 상태에서 호출)"""
+        # 이번 턴의 모든 LLM 호출(재시도/복구 포함)이 공유하는 마감 시각
+        self.memory_manager.turn_deadline = time.monotonic() + config.RATE_LIMIT_CONFIG["turn_deadline"]
         # 1. Python 기반 관계 전환 검사 (우선순위 1)
         transition_occurred, new_status = check_status_transition(self.state)
         if transition_occurred and new_status:
@@ -68,33 +176,24 @@ class Brain:
             logger.info(llm_response)
             logger.info("=" * 80)
         
-        # 3. JSON 파싱 및 검증
-        try:
-            logger.debug(f"Starting JSON parsing. LLM response length: {len(llm_response)}")
-            data = self._parse_json(llm_response)
-            logger.debug(f"JSON parsing successful. Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
-            self._validate_response(data)
-            logger.debug("JSON validation successful")
-            
-            # 파싱 및 검증된 JSON 로그 출력 (dev_mode일 때만)
-            if self.dev_mode:
-                logger.info("=" * 80)
-                logger.info("✅ [PARSED JSON]")
-                logger.info("=" * 80)
-                import json as json_module
-                logger.info(json_module.dumps(data, ensure_ascii=False, indent=2))
-                logger.info("=" * 80)
-        except Exception as e:
-            import traceback
-            logger.error(f"JSON parsing failed: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"LLM response (first 500 chars): {llm_response[:500]}")
-            logger.error(f"Full traceback:\n{traceback.format_exc()}")
+        # 3. JSON 파싱 및 검증 (실패 시 로컬 복구 → LLM 복구 → 재생성 순으로 시도)
+        data, parse_tier = self._parse_with_recovery(llm_response, player_input)
+        if data is None:
             return self._fallback_response(player_input)
+        # 히스토리용 원본 응답 (이후 단계에서 data가 바뀌어도 모델이 출력한 형태 유지)
+        model_response = copy.deepcopy(data)
+        
+        # 파싱 및 검증된 JSON 로그 출력 (dev_mode일 때만)
+        if self.dev_mode:
+            logger.info("=" * 80)
+            logger.info(f"✅ [PARSED JSON] (tier={parse_tier})")
+            logger.info("=" * 80)
+            logger.info(json.dumps(data, ensure_ascii=False, indent=2))
+            logger.info("=" * 80)
         
         # 4. 가챠 적용
         proposed_delta = data.get("proposed_delta", {})
-        final_delta, gacha_tier, multiplier = apply_gacha_to_delta(proposed_delta)
+        final_delta, gacha_tier, multiplier = apply_gacha_to_delta(proposed_delta, rng=self.rng)
         
         # 5. 델타 적용 (트라우마 페널티 포함)
         self.state.apply_delta(final_delta, trauma_penalty=True)
@@ -127,13 +226,15 @@ class Brain:
         visual_change = data.get("visual_change_detected", False)
         self.turns_since_image += 1
         
-        # 이미지 생성 이유 추적
+        # 이미지 생성 이유 추적 (reasons: 로그용 설명, triggers: 스케줄러 우선순위용 종류)
         image_generation_reasons = []
+        image_generation_triggers = []
         
         # 배경 변경 체크 (한 글자라도 바뀌면 강제로 이미지 생성)
         if background_changed:
             visual_change = True
             image_generation_reasons.append(f"배경 변경: {previous_background} → {background}")
+            image_generation_triggers.append("background")
             logger.info(f"Background changed, forcing image generation")
         
         # LLM이 직접 요청한 경우
@@ -143,22 +244,26 @@ class Brain:
                 image_generation_reasons.append(f"LLM 요청: {reason}")
             else:
                 image_generation_reasons.append("LLM 요청: visual_change_detected=true")
+            image_generation_triggers.append("llm")
         
         # 강제 갱신 체크 (5턴 경과)
         if self.turns_since_image >= config.IMAGE_GENERATION_TRIGGERS["force_refresh_turns"]:
             visual_change = True
             image_generation_reasons.append(f"강제 갱신: {self.turns_since_image}턴 경과 (최대 {config.IMAGE_GENERATION_TRIGGERS['force_refresh_turns']}턴)")
+            image_generation_triggers.append("refresh")
         
         # 가챠 티어 체크
         if gacha_tier in config.IMAGE_GENERATION_TRIGGERS["critical_gacha_tiers"]:
             visual_change = True
             tier_name = {"jackpot": "극진한 반응", "surprise": "놀라운 반응", "critical": "강렬한 반응"}.get(gacha_tier, gacha_tier)
             image_generation_reasons.append(f"특수 반응: {tier_name} (가챠 티어: {gacha_tier})")
+            image_generation_triggers.append("gacha")
         
         # 관계 전환 체크
         if transition_occurred and new_status in config.IMAGE_GENERATION_TRIGGERS["status_transitions"]:
             visual_change = True
             image_generation_reasons.append(f"관계 전환: {self.state.relationship_status} → {new_status}")
+            image_generation_triggers.append("transition")
         
         # 9. 히스토리 추가 (visual_prompt와 background 포함)
         self.state.total_turns += 1
@@ -171,7 +276,8 @@ class Brain:
                 character_thought=data.get("thought", ""),
                 emotion=data.get("emotion", "neutral"),
                 visual_prompt=data.get("visual_prompt", ""),
-                background=background
+                background=background,
+                response=model_response
             )
             logger.debug(f"DialogueTurn created. Adding to history...")
             self.history.add(turn)
@@ -199,11 +305,13 @@ class Brain:
             "speech": data.get("speech", ""),
             "action_speech": data.get("action_speech", ""),  
             "emotion": data.get("emotion", "neutral"),
+            "parse_tier": parse_tier,  # JSON 복구 단계 (direct, local_repair, llm_repair, regenerated)
             "visual_change_detected": visual_change,
             "visual_prompt": data.get("visual_prompt", ""),
             "background": background,
             "reason": data.get("reason", ""),
             "image_generation_reasons": image_generation_reasons,  # 이미지 생성 이유 목록
+            "image_generation_triggers": image_generation_triggers,  # 이미지 생성 트리거 종류 (background, llm, refresh, gacha, transition)
             "final_delta": final_delta,
             "gacha_tier": gacha_tier,
             "multiplier": multiplier,
@@ -218,7 +326,7 @@ class Brain:
         if data.get("relationship_status_change", False):
             new_status_name = data.get("new_status_name", "")
             # 모든 LLM 판단 상태에 대해 수치 조건 검증
-            if new_status_name in ["Lover", "Fiancée", "Partner", "Master", "Slave"]:
+            if new_status_name in get_rules().llm_reported_statuses:
                 current_status = self.state.relationship_status
                 if validate_status_transition_condition(self.state, current_status, new_status_name):
                     self.state.relationship_status = new_status_name
@@ -247,14 +355,24 @@ class Brain:
             raise RuntimeError(error_msg)
         
         # 프롬프트 조립 (메인 응답용)
-        prompt = self._build_prompt(player_input)
+        prompt_mode = self.prompt_mode
+        if prompt_mode == "chat":
+            messages = self._build_chat_messages(player_input)
+            prompt = None
+        else:
+            messages = None
+            prompt = self._build_prompt(player_input)
         
         # 시스템 프롬프트 로그 출력 (dev_mode일 때만)
         if self.dev_mode:
             logger.info("=" * 80)
-            logger.info("📝 [SYSTEM PROMPT]")
+            logger.info(f"📝 [SYSTEM PROMPT] (mode={prompt_mode})")
             logger.info("=" * 80)
-            logger.info(prompt)
+            if messages is not None:
+                for message in messages:
+                    logger.info(f"[{message['role']}]\n{message['content']}")
+            else:
+                logger.info(prompt)
             logger.info("=" * 80)
         
         logger.info("Calling LLM API...")
@@ -263,13 +381,16 @@ class Brain:
             import time
             llm_start_time = time.time()
             
-            # Ollama API 호출 (메인 응답)
-            response_text = self.memory_manager.generate(
-                prompt,
-                temperature=config.LLM_CONFIG["temperature"],
-                top_p=config.LLM_CONFIG["top_p"],
-                max_tokens=config.LLM_CONFIG["max_tokens"]
-            )
+            # LLM API 호출 (메인 응답)
+            llm_params = {
+                "temperature": config.LLM_CONFIG["temperature"],
+                "top_p": config.LLM_CONFIG["top_p"],
+                "max_tokens": config.LLM_CONFIG["max_tokens"],
+            }
+            if messages is not None:
+                response_text = self.memory_manager.chat(messages, **llm_params)
+            else:
+                response_text = self.memory_manager.generate(prompt, **llm_params)
             
             # LLM 응답 시간 측정 완료
             llm_elapsed_time = time.time() - llm_start_time
@@ -352,12 +473,8 @@ Based on the above, please summarize only important memories in 500 characters o
         logger.info(f"🔁 Updating long-term memory (turn={self.state.total_turns})")
 
         try:
-            response_text = self.memory_manager.generate(
-                prompt,
-                temperature=config.LLM_CONFIG["temperature"],
-                top_p=config.LLM_CONFIG["top_p"],
-                max_tokens=config.LLM_CONFIG["max_tokens"]
-            )
+            # 요약은 보조 모델(summarizer 역할)로 처리해 메인 모델을 플레이어 턴에 양보
+            response_text = self.memory_manager.generate(prompt, role="summarizer")
 
             if not response_text or not response_text.strip():
                 logger.warning("long_memory 업데이트 LLM 응답이 비어 있습니다. (건너뜀)")
@@ -389,8 +506,8 @@ Based on the above, please summarize only important memories in 500 characters o
             import traceback
             logger.error(traceback.format_exc())
     
-    def _build_prompt(self, player_input: str) -> str:
-        """시스템 프롬프트 조립 (다국어 지원)"""
+    def _prompt_context(self, player_input: str) -> SimpleNamespace:
+        """프롬프트 조립에 필요한 값 계산 (generate/chat 모드 공용)"""
         # I18n 인스턴스 가져오기
         i18n = get_i18n()
         i18n.set_language(self.language)
@@ -554,13 +671,145 @@ Based on the above, please summarize only important memories in 500 characters o
         # 트라우마 레벨 이름
         trauma_level_name = config.TRAUMA_LEVELS.get(round(self.state.trauma_level * 4) / 4, "Unknown")
         
+        return SimpleNamespace(
+            i18n=i18n,
+            visual_prompt_key=visual_prompt_key,
+            mood=mood,
+            intimacy_level=intimacy_level,
+            trust_level=trust_level,
+            dependency_level=dependency_level,
+            status_check=status_check,
+            history_text=history_text,
+            long_memory_section=long_memory_section,
+            current_background=current_background,
+            player_name=player_name,
+            player_gender=player_gender,
+            initial_context=initial_context,
+            character_profile_section=character_profile_section,
+            trauma_section=trauma_section,
+            special_commands_text=special_commands_text,
+            trauma_level_name=trauma_level_name,
+            player_input=player_input,
+        )
+    
+    def _build_prompt(self, player_input: str) -> str:
+        """
+        시스템 프롬프트 조립 (다국어 지원, /api/generate용 단일 문자열)
+        플레이어 입력이 들어가는 줄은 모두 끝부분에 모아 그 앞까지(규칙/수치/대화 기록/출력 형식)를 예열 가능한 접두부로 유지
+        """
+        ctx = self._prompt_context(player_input)
+        
         # 프롬프트 조립
-        prompt = f"""{i18n.get_prompt("system_intro")}
+        prompt = f"""{ctx.i18n.get_prompt("system_intro")}
+{ctx.i18n.get_prompt("system_json_only")}
+{ctx.i18n.get_prompt("system_no_censorship")}
+{ctx.i18n.get_prompt("system_language")}
+
+{ctx.character_profile_section}
+
+
+{ctx.i18n.get_prompt("state_definition_title")}
+
+{ctx.i18n.get_prompt("state_pleasure")}
+{ctx.i18n.get_prompt("state_arousal")}
+{ctx.i18n.get_prompt("state_dominance")}
+{ctx.i18n.get_prompt("state_intimacy")}
+{ctx.i18n.get_prompt("state_trust", player_name=ctx.player_name)}
+{ctx.i18n.get_prompt("state_dependency", player_name=ctx.player_name)}
+{ctx.i18n.get_prompt("state_delta_instruction")}
+{ctx.i18n.get_prompt("state_delta_range")}
+{ctx.i18n.get_prompt("state_dominance_guidance")}
+
+{ctx.i18n.get_prompt("behavior_priority_title")}
+
+{ctx.i18n.get_prompt("behavior_priority_2")}
+{ctx.i18n.get_prompt("behavior_quality_1")}
+{ctx.i18n.get_prompt("behavior_quality_3")}
+{ctx.i18n.get_prompt("behavior_quality_4", player_name=ctx.player_name)}
+{ctx.i18n.get_prompt("background_consistency_1")}
+{ctx.i18n.get_prompt("background_consistency_2", current_background=ctx.current_background)}
+{ctx.i18n.get_prompt("background_consistency_3", player_name=ctx.player_name)}
+{ctx.i18n.get_prompt("background_consistency_4")}
+{ctx.i18n.get_prompt("background_consistency_5")}
+{ctx.i18n.get_prompt("visual_change_1")}
+{ctx.i18n.get_prompt("visual_change_2")}
+{ctx.i18n.get_prompt("visual_change_3")}
+{ctx.i18n.get_prompt("visual_change_4")}
+{ctx.trauma_section}{ctx.i18n.get_prompt("data_context_title")}
+{ctx.i18n.get_prompt("data_context_psychology", mood=ctx.mood, relationship_status=self.state.relationship_status)}
+{ctx.i18n.get_prompt("data_context_stats", P=self.state.P, A=self.state.A, D=self.state.D, I=self.state.I, T=self.state.T, Dep=self.state.Dep)}
+{ctx.i18n.get_prompt("data_context_accumulated", intimacy_level=ctx.intimacy_level, trust_level=ctx.trust_level, dependency_level=ctx.dependency_level)}
+{ctx.i18n.get_prompt("data_context_trauma", trauma_level=self.state.trauma_level, trauma_level_name=ctx.trauma_level_name)}
+{ctx.i18n.get_prompt("data_context_special", special_commands_text=ctx.special_commands_text)}
+{ctx.i18n.get_prompt("data_context_history")}
+{ctx.history_text}
+
+{ctx.i18n.get_prompt("output_format_title")}
+
+{ctx.i18n.get_prompt("output_format_json")}
+
+```
+{{
+{ctx.i18n.get_prompt("output_thought")},
+{ctx.i18n.get_prompt("output_speech")},
+{ctx.i18n.get_prompt("output_action_speech")},
+{ctx.i18n.get_prompt("output_emotion")},
+{ctx.i18n.get_prompt("output_visual_change")},
+{ctx.i18n.get_prompt(ctx.visual_prompt_key)},
+{ctx.i18n.get_prompt("output_background")},
+{ctx.i18n.get_prompt("output_reason")},
+{ctx.i18n.get_prompt("output_delta")},
+{ctx.i18n.get_prompt("output_relationship_change")},
+{ctx.i18n.get_prompt("output_new_status")}
+}}
+``` 
+{ctx.long_memory_section}
+{self._get_initial_context_before_input(ctx.player_name, ctx.initial_context, ctx.i18n)}
+{ctx.i18n.get_prompt("behavior_priority_1", player_name=ctx.player_name, player_input=ctx.player_input)}
+{ctx.i18n.get_prompt("behavior_quality_2", player_input=ctx.player_input)}
+{ctx.i18n.get_prompt("player_input_label", player_name=ctx.player_name, player_input=ctx.player_input)}
+{ctx.i18n.get_prompt("player_input_instruction")}
+{ctx.i18n.get_prompt("player_input_json")}
+"""
+        
+        # 디버깅: long_memory_section이 실제로 포함되었는지 확인
+        if self.state.long_memory and not ctx.long_memory_section:
+            logger.error(f"⚠️ Warning: long_memory exists but long_memory_section is empty! (total_turns: {self.state.total_turns})")
+        elif ctx.long_memory_section:
+            logger.debug(f"✅ long_memory_section included in prompt (length: {len(ctx.long_memory_section)})")
+        
+        return prompt
+    
+    def _chat_history_turns(self) -> List[DialogueTurn]:
+        """
+        chat 모드에 넣을 과거 턴 (블록 단위로 오래된 턴 제거)
+        매 턴 한 개씩 밀어내면 메시지 앞부분이 계속 바뀌므로, history_block 턴마다 한 번에 잘라
+        그 사이에는 system + 과거 턴 접두부가 그대로 유지되어 서버 프롬프트 캐시가 재사용됨
+        """
+        turns = self.history.turns
+        if not turns:
+            return []
+        block = max(1, int(config.LLM_CHAT_CONFIG["history_block"]))
+        overflow = turns[-1].turn_number - self.history.max_turns
+        base = -(-overflow // block) * block if overflow > 0 else 0
+        return [turn for turn in turns if turn.turn_number > base]
+    
+    def _build_chat_messages(self, player_input: str) -> List[Dict[str, str]]:
+        """
+        chat 모드 메시지 조립 (/api/chat, OpenRouter messages)
+        - system: 규칙/페르소나/출력 형식 (세션 내 불변)
+        - 과거 턴: 실제 user/assistant 메시지
+        - 마지막 user: 수치·기분·특수 명령 등 매 턴 바뀌는 상태 블록 + 플레이어 입력
+        """
+        ctx = self._prompt_context(player_input)
+        i18n = ctx.i18n
+        
+        system_prompt = f"""{i18n.get_prompt("system_intro")}
 {i18n.get_prompt("system_json_only")}
 {i18n.get_prompt("system_no_censorship")}
 {i18n.get_prompt("system_language")}
 
-{character_profile_section}
+{ctx.character_profile_section}
 
 
 {i18n.get_prompt("state_definition_title")}
@@ -569,37 +818,26 @@ Based on the above, please summarize only important memories in 500 characters o
 {i18n.get_prompt("state_arousal")}
 {i18n.get_prompt("state_dominance")}
 {i18n.get_prompt("state_intimacy")}
-{i18n.get_prompt("state_trust", player_name=player_name)}
-{i18n.get_prompt("state_dependency", player_name=player_name)}
+{i18n.get_prompt("state_trust", player_name=ctx.player_name)}
+{i18n.get_prompt("state_dependency", player_name=ctx.player_name)}
 {i18n.get_prompt("state_delta_instruction")}
 {i18n.get_prompt("state_delta_range")}
 {i18n.get_prompt("state_dominance_guidance")}
 
 {i18n.get_prompt("behavior_priority_title")}
 
-{i18n.get_prompt("behavior_priority_1", player_name=player_name, player_input=player_input)}
 {i18n.get_prompt("behavior_priority_2")}
 {i18n.get_prompt("behavior_quality_1")}
-{i18n.get_prompt("behavior_quality_2", player_input=player_input)}
 {i18n.get_prompt("behavior_quality_3")}
-{i18n.get_prompt("behavior_quality_4", player_name=player_name)}
+{i18n.get_prompt("behavior_quality_4", player_name=ctx.player_name)}
 {i18n.get_prompt("background_consistency_1")}
-{i18n.get_prompt("background_consistency_2", current_background=current_background)}
-{i18n.get_prompt("background_consistency_3", player_name=player_name)}
+{i18n.get_prompt("background_consistency_3", player_name=ctx.player_name)}
 {i18n.get_prompt("background_consistency_4")}
 {i18n.get_prompt("background_consistency_5")}
 {i18n.get_prompt("visual_change_1")}
 {i18n.get_prompt("visual_change_2")}
 {i18n.get_prompt("visual_change_3")}
 {i18n.get_prompt("visual_change_4")}
-{trauma_section}{i18n.get_prompt("data_context_title")}
-{i18n.get_prompt("data_context_psychology", mood=mood, relationship_status=self.state.relationship_status)}
-{i18n.get_prompt("data_context_stats", P=self.state.P, A=self.state.A, D=self.state.D, I=self.state.I, T=self.state.T, Dep=self.state.Dep)}
-{i18n.get_prompt("data_context_accumulated", intimacy_level=intimacy_level, trust_level=trust_level, dependency_level=dependency_level)}
-{i18n.get_prompt("data_context_trauma", trauma_level=self.state.trauma_level, trauma_level_name=trauma_level_name)}
-{i18n.get_prompt("data_context_special", special_commands_text=special_commands_text)}
-{i18n.get_prompt("data_context_history")}
-{history_text}
 
 {i18n.get_prompt("output_format_title")}
 
@@ -612,28 +850,67 @@ Based on the above, please summarize only important memories in 500 characters o
 {i18n.get_prompt("output_action_speech")},
 {i18n.get_prompt("output_emotion")},
 {i18n.get_prompt("output_visual_change")},
-{i18n.get_prompt(visual_prompt_key)},
+{i18n.get_prompt(ctx.visual_prompt_key)},
 {i18n.get_prompt("output_background")},
 {i18n.get_prompt("output_reason")},
 {i18n.get_prompt("output_delta")},
 {i18n.get_prompt("output_relationship_change")},
 {i18n.get_prompt("output_new_status")}
 }}
-``` 
-{long_memory_section}
-{self._get_initial_context_before_input(player_name, initial_context, i18n)}
-{i18n.get_prompt("player_input_label", player_name=player_name, player_input=player_input)}
+```"""
+        
+        messages = [{"role": "system", "content": system_prompt}]
+        for turn in self._chat_history_turns():
+            messages.append({"role": "user", "content": turn.player_input})
+            messages.append({"role": "assistant", "content": json.dumps(self._history_response(turn), ensure_ascii=False)})
+        
+        state_block = f"""{ctx.trauma_section}{i18n.get_prompt("data_context_title")}
+{i18n.get_prompt("data_context_psychology", mood=ctx.mood, relationship_status=self.state.relationship_status)}
+{i18n.get_prompt("data_context_stats", P=self.state.P, A=self.state.A, D=self.state.D, I=self.state.I, T=self.state.T, Dep=self.state.Dep)}
+{i18n.get_prompt("data_context_accumulated", intimacy_level=ctx.intimacy_level, trust_level=ctx.trust_level, dependency_level=ctx.dependency_level)}
+{i18n.get_prompt("data_context_trauma", trauma_level=self.state.trauma_level, trauma_level_name=ctx.trauma_level_name)}
+{i18n.get_prompt("data_context_special", special_commands_text=ctx.special_commands_text)}
+{i18n.get_prompt("background_consistency_2", current_background=ctx.current_background)}
+{ctx.long_memory_section}
+{self._get_initial_context_before_input(ctx.player_name, ctx.initial_context, i18n)}
+{i18n.get_prompt("behavior_priority_1", player_name=ctx.player_name, player_input=player_input)}
+{i18n.get_prompt("behavior_quality_2", player_input=player_input)}
+{i18n.get_prompt("player_input_label", player_name=ctx.player_name, player_input=player_input)}
 {i18n.get_prompt("player_input_instruction")}
 {i18n.get_prompt("player_input_json")}
 """
-        
-        # 디버깅: long_memory_section이 실제로 포함되었는지 확인
-        if self.state.long_memory and not long_memory_section:
-            logger.error(f"⚠️ Warning: long_memory exists but long_memory_section is empty! (total_turns: {self.state.total_turns})")
-        elif long_memory_section:
-            logger.debug(f"✅ long_memory_section included in prompt (length: {len(long_memory_section)})")
-        
-        return prompt
+        messages.append({"role": "user", "content": state_block})
+        return messages
+    
+    def _history_response(self, turn: DialogueTurn) -> Dict[str, Any]:
+        """
+        chat 모드 과거 assistant 메시지 (모델은 자기 이전 출력의 형태를 따라 하므로 필수 키를 모두 포함)
+        응답 원본이 없는 턴(이전 버전 시나리오 등)은 저장된 값으로 같은 형태를 재구성
+        """
+        if turn.response:
+            return turn.response
+        return {
+            "thought": turn.character_thought,
+            "speech": turn.character_speech,
+            "action_speech": "",
+            "emotion": turn.emotion,
+            "visual_change_detected": False,
+            "visual_prompt": turn.visual_prompt,
+            "background": turn.background,
+            "reason": "",
+            "proposed_delta": {"P": 0, "A": 0, "D": 0, "I": 0, "T": 0, "Dep": 0},
+            "relationship_status_change": False,
+            "new_status_name": "",
+        }
+    
+    def set_prompt_mode(self, mode: Optional[str]):
+        """프롬프트 모드 설정 ("chat" 또는 "generate", 설정을 불러오거나 저장할 때 호출)"""
+        mode = mode or config.LLM_CHAT_CONFIG["prompt_mode"]
+        if mode not in ("chat", "generate"):
+            logger.warning(f"Unknown prompt mode '{mode}', using generate")
+            mode = "generate"
+        self.prompt_mode = mode
+        logger.info(f"Prompt mode: {self.prompt_mode}")
     
     def _get_first_dialogue_emphasis(self, i18n) -> str:
         """처음 10턴 동안 초기 상황 설명의 중요성을 강조하는 지시사항"""
@@ -658,15 +935,16 @@ Based on the above, please summarize only important memories in 500 characters o
     
     def _get_status_transition_instruction(self) -> str:
         """현재 상태에서 가능한 다음 상태 전환 지침"""
+        rules = get_rules()
         current = self.state.relationship_status
-        transitions = config.STATUS_TRANSITIONS.get(current, {})
+        transitions = rules.status_transitions.get(current, {})
         possible_next = transitions.get("to", [])
         
         if not possible_next:
             return ""
         
         # LLM 보고가 필요한 상태만 필터링: Lover, Fiancée, Partner, Master, Slave
-        llm_states = [s for s in possible_next if s in ["Lover", "Fiancée", "Partner", "Master", "Slave"]]
+        llm_states = [s for s in possible_next if s in rules.llm_reported_statuses]
         
         if not llm_states:
             return ""
@@ -767,6 +1045,89 @@ Based on the above, please summarize only important memories in 500 characters o
         logger.error(f"원본 텍스트 (처음 500자): {text[:500]}")
         raise ValueError("No valid JSON found")
 
+    def _try_parse(self, text: str, allow_repair: bool) -> Optional[Dict]:
+        """파싱 + 검증 (allow_repair면 엄격한 파서 실패 시 관대한 로컬 복구 파서 사용)"""
+        if not text:
+            return None
+        try:
+            data = self._parse_json(text)
+            self._validate_response(data)
+            return data
+        except Exception as e:
+            logger.warning(f"JSON parse/validation failed: {e}")
+        return self._try_repair(text) if allow_repair else None
+    
+    def _try_repair(self, text: str) -> Optional[Dict]:
+        """관대한 로컬 복구 파서 + 검증 (엄격한 파서는 이미 실패한 경우)"""
+        data = repair_json(text)
+        if data is None:
+            return None
+        try:
+            self._validate_response(data)
+            return data
+        except Exception as e:
+            logger.warning(f"Repaired JSON failed validation: {e}")
+            return None
+    
+    def _request_json_repair(self, broken_text: str) -> Optional[str]:
+        """보조 모델(repair 역할)에 JSON 형식 강제 모드로 수정 요청"""
+        prompt = (
+            "The following text was supposed to be a single JSON object with the keys "
+            "\"thought\", \"speech\", \"emotion\" and \"proposed_delta\" "
+            "(an object with integer P, A, D, I, T, Dep values between -10 and 10), plus any other keys it already has.\n"
+            "Fix the syntax and fill in missing required keys without changing the existing text values. "
+            "Output only the corrected JSON object.\n\n"
+            f"{broken_text[:config.JSON_RECOVERY_CONFIG['max_repair_input_chars']]}"
+        )
+        return self.memory_manager.generate(prompt, role="repair", json_mode=True)
+    
+    def _parse_with_recovery(self, llm_response: str, player_input: str):
+        """
+        단계별 JSON 복구 파이프라인
+        Returns: (data 또는 None, 복구 단계 이름)
+        """
+        metrics = get_recovery_metrics()
+        recovery = config.JSON_RECOVERY_CONFIG
+        tier = "fallback"
+        data = self._try_parse(llm_response, allow_repair=False)
+        if data is not None:
+            tier = "direct"
+        
+        if data is None and llm_response:
+            try:
+                data = self._try_repair(llm_response)
+                if data is not None:
+                    tier = "local_repair"
+            except Exception as e:
+                logger.warning(f"Local JSON repair failed: {e}")
+                data = None
+        
+        if data is None and recovery["llm_repair"]:
+            try:
+                repaired_text = self._request_json_repair(llm_response)
+                data = self._try_parse(repaired_text, allow_repair=True)
+                if data is not None:
+                    tier = "llm_repair"
+            except Exception as e:
+                logger.warning(f"LLM JSON repair failed: {e}")
+        
+        for _ in range(recovery["max_regenerations"] if data is None else 0):
+            try:
+                data = self._try_parse(self._call_llm(player_input), allow_repair=True)
+            except Exception as e:
+                logger.warning(f"Regeneration failed: {e}")
+                data = None
+            if data is not None:
+                tier = "regenerated"
+                break
+        
+        metrics.record(tier)
+        if tier != "direct":
+            if data is None:
+                logger.error(f"JSON parsing failed after all recovery tiers. LLM response (first 500 chars): {llm_response[:500]}")
+            logger.info(f"🩹 JSON recovery tier: {tier} | {metrics.summary()}")
+        return data, tier
+    
     def _validate_response(self, data: Dict):
         """응답 유효성 검증"""
         required = ["thought", "speech", "emotion", "proposed_delta"]
@@ -820,6 +1181,7 @@ Based on the above, please summarize only important memories in 500 characters o
             "thought": i18n.get_prompt("fallback_thought"),
             "speech": i18n.get_prompt("fallback_speech"),
             "emotion": "nervous",
+            "parse_tier": "fallback",
             "visual_change_detected": False,
             "visual_prompt": "",
             "background": self.state.current_background,
@@ -13,19 +13,57 @@ import logging
 import time
 import threading
 import random
+import copy
+import struct
+import hashlib
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from PIL import Image
 import io
 import config
+from health_monitor import get_health_monitor
+from object_info import get_object_info_catalog, CHOICE_FIELDS
+from comfy_pool import get_comfy_pool, parse_servers
+from image_cache import get_image_cache, workflow_key
+from job_table import JobTable
+from image_result import ImageResult
 
 logger = logging.getLogger("ComfyClient")
 
+# ComfyUI 웹소켓 바이너리 프레임 종류 (앞 4바이트, big-endian)
+BINARY_PREVIEW_IMAGE = 1                  # [이미지 형식 4바이트][이미지]
+BINARY_PREVIEW_IMAGE_WITH_METADATA = 4    # [메타데이터 길이 4바이트][메타데이터 JSON][이미지]
+
+
+class JobProgress:
+    """이미지 작업 하나의 진행 상황 (웹소켓 스레드가 갱신, UI가 주기적으로 읽음)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+        self.max = 0
+        self.preview: Optional[bytes] = None  # 마지막 저해상도 미리보기 (JPEG/PNG)
+        self.version = 0                      # 갱신될 때마다 증가 (UI가 바뀐 경우만 다시 그림)
+    
+    def update(self, value: Optional[int] = None, max_value: Optional[int] = None, preview: Optional[bytes] = None):
+        with self._lock:
+            if value is not None:
+                self.value = value
+            if max_value is not None:
+                self.max = max_value
+            if preview is not None:
+                self.preview = preview
+            self.version += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"value": self.value, "max": self.max, "preview": self.preview, "version": self.version}
+
 
 class ComfyClient:
     """ComfyUI API 클라이언트"""
     
-    def __init__(self, server_address: str = None, workflow_path: str = None, model_name: str = None, steps: int = None, cfg: float = None, sampler_name: str = None, scheduler: str = None, vae_name: str = None, clip_name: str = None, style: str = "QWEN/Z-image", quality_tag: str = "", negative_prompt: str = "", upscale_model_name: str = None, lora_name: str = None, lora_strength_model: float = None):
+    def __init__(self, server_address: str = None, workflow_path: str = None, model_name: str = None, steps: int = None, cfg: float = None, sampler_name: str = None, scheduler: str = None, vae_name: str = None, clip_name: str = None, style: str = "QWEN/Z-image", quality_tag: str = "", negative_prompt: str = "", upscale_model_name: str = None, lora_name: str = None, lora_strength_model: float = None, extra_servers=None):
         self.server_address = server_address or config.COMFYUI_CONFIG["server_address"]
         self.workflow_path = workflow_path or config.COMFYUI_CONFIG["workflow_path"]
         self.model_name = model_name or config.COMFYUI_CONFIG.get("model_name", "Zeniji_mix_ZiT_v1.safetensors")
@@ -42,17 +80,87 @@ class ComfyClient:
         self.lora_name = lora_name
         self.lora_strength_model = lora_strength_model
         self.client_id = str(uuid.uuid4())
-        self.ws: Optional[websocket.WebSocketApp] = None
-        self.ws_connected = False
-        self.pending_images: Dict[str, Dict[str, Any]] = {}  # prompt_id -> {filename, subfolder, type}
-        self.execution_completed: Dict[str, bool] = {}  # prompt_id -> execution completed flag
-        self.execution_errors: Dict[str, str] = {}  # prompt_id -> error message
-        # 시간 측정용 변수
-        self._last_comfyui_time = 0.0
+        # 작업을 분배할 서버 목록 (첫 번째가 기본 서버, 나머지는 COMFYUI_POOL_CONFIG/환경설정의 추가 서버)
+        self.servers = [self.server_address]
+        for server in parse_servers(config.COMFYUI_POOL_CONFIG["servers"]) + parse_servers(extra_servers):
+            if server not in self.servers:
+                self.servers.append(server)
+        # 서버별 웹소켓 (prompt_id는 서버와 무관하게 고유하므로 작업 테이블은 공유)
+        self._sockets: Dict[str, websocket.WebSocketApp] = {}
+        self._socket_ready: Dict[str, bool] = {}
+        # prompt_id -> 완료 여부, 오류, 출력 이미지 정보, 진행 상황 (락 보호, TTL/최대 개수 제한)
+        self.jobs = JobTable()
+        self._executing: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # 서버 -> (실행 중 prompt_id, 노드 ID)
+        self._uploaded_images: set = set()  # (서버, 파일 이름) - img2img 시작 이미지 업로드 기록
+        # 세션 RNG가 전달되지 않은 경우 사용할 클라이언트 전용 RNG (전역 random과 분리)
+        self.rng = random.Random()
+        # 카세트 녹화기 (replay.CassetteRecorder, 녹화 중일 때만 설정)
+        self.recorder = None
+        # 백그라운드 상태 확인 대상 등록, object_info 카탈로그 미리 받아두기 (백그라운드)
+        for server in self.servers:
+            get_health_monitor().watch_comfyui(server)
+            get_object_info_catalog().get(server, block=False)
+    
+    def check_settings(self) -> list:
+        """
+        현재 설정된 모델/VAE/CLIP/LoRA/업스케일/샘플러 이름을 캐시된 카탈로그와 비교
+        Returns: 경고 메시지 목록 (카탈로그가 아직 없으면 빈 목록, 블로킹하지 않음)
+        """
+        choices = get_object_info_catalog().choices(self.server_address)
+        configured = {
+            "model": self.model_name,
+            "vae": self.vae_name,
+            "clip": self.clip_name,
+            "lora": self.lora_name,
+            "upscale": self.upscale_model_name,
+            "sampler": self.sampler_name,
+            "scheduler": self.scheduler,
+        }
+        # 스타일별 워크플로우에 없는 노드는 제외 (SDXL: CLIPLoader 없음, QWEN/Z-image: 업스케일 없음)
+        if self.style == "SDXL":
+            configured.pop("clip")
+        else:
+            configured.pop("upscale")
+        warnings = []
+        for field in CHOICE_FIELDS:
+            value = configured.get(field)
+            if value and choices.get(field) and value not in choices[field]:
+                warnings.append(f"{field}: '{value}'")
+        return warnings
+    
+    def _on_binary(self, ws, message: bytes):
+        """바이너리 프레임 핸들러 (KSampler 실행 중 미리보기 이미지)
+        ComfyUI 서버가 --preview-method auto 등으로 미리보기를 켜고 있어야 전송됨
+        """
+        if len(message) < 8:
+            return
+        event_type = struct.unpack(">I", message[:4])[0]
+        if event_type == BINARY_PREVIEW_IMAGE:
+            prompt_id, node = self._executing.get(self._server_of(ws), (None, None))
+            image_data = message[8:]
+            # 웹소켓 저장 노드 실행 중에 온 프레임은 미리보기가 아니라 최종 이미지 (PNG)
+            if prompt_id and self.jobs.add_ws_image(prompt_id, node, image_data):
+                logger.info(f"Image received over websocket (node {node}): {len(image_data)} bytes")
+                return
+        elif event_type == BINARY_PREVIEW_IMAGE_WITH_METADATA:
+            metadata_length = struct.unpack(">I", message[4:8])[0]
+            try:
+                metadata = json.loads(message[8:8 + metadata_length])
+            except ValueError:
+                return
+            prompt_id = metadata.get("prompt_id")
+            image_data = message[8 + metadata_length:]
+        else:
+            return
+        progress = self.jobs.progress(prompt_id)
+        if progress is not None and image_data:
+            progress.update(preview=image_data)
     
     def _on_message(self, ws, message):
         """웹소켓 메시지 핸들러"""
-        if isinstance(message, str):
+        if isinstance(message, bytes):
+            self._on_binary(ws, message)
+        elif isinstance(message, str):
             data = json.loads(message)
             
             if data.get("type") == "execution_cached":
@@ -60,14 +168,21 @@ class ComfyClient:
             elif data.get("type") == "executing":
                 node = data.get("data", {}).get("node")
                 prompt_id = data.get("data", {}).get("prompt_id")
+                # 바이너리 미리보기 프레임에는 prompt_id가 없으므로 실행 중인 작업 기록
+                self._executing[self._server_of(ws)] = (prompt_id, node)
                 if node is None:
                     # 실행 완료
                     logger.info("Execution completed")
                     if prompt_id:
-                        self.execution_completed[prompt_id] = True
+                        self.jobs.mark_completed(prompt_id)
             elif data.get("type") == "progress":
-                progress = data.get("data", {}).get("value", 0)
-                logger.debug(f"Progress: {progress}%")
+                progress_data = data.get("data", {})
+                progress = progress_data.get("value", 0)
+                logger.debug(f"Progress: {progress}/{progress_data.get('max', '?')}")
+                prompt_id = progress_data.get("prompt_id") or self._executing.get(self._server_of(ws), (None, None))[0]
+                stream = self.jobs.progress(prompt_id)
+                if stream is not None:
+                    stream.update(value=progress, max_value=progress_data.get("max"))
             elif data.get("type") == "executed":
                 node_id = data.get("data", {}).get("node")
                 output = data.get("data", {}).get("output", {})
@@ -78,13 +193,15 @@ class ComfyClient:
                     images = output["images"]
                     if images:
                         image_info = images[0]
-                        if prompt_id and prompt_id in self.pending_images:
-                            self.pending_images[prompt_id].update({
+                        if prompt_id:
+                            self.jobs.set_output(prompt_id, {
                                 "filename": image_info.get("filename"),
                                 "subfolder": image_info.get("subfolder", ""),
-                                "type": image_info.get("type", "output")
+                                "type": image_info.get("type", "output"),
+                                # batch_size > 1이면 여러 장
+                                "images": images
                             })
-                            logger.info(f"Image saved (node {node_id}): {image_info.get('filename')}")
+                            logger.info(f"Image saved (node {node_id}): {image_info.get('filename')}" + (f" (+{len(images) - 1})" if len(images) > 1 else ""))
             elif data.get("type") == "execution_error":
                 # 실행 에러 처리
                 error_data = data.get("data", {})
@@ -104,98 +221,114 @@ class ComfyClient:
                     full_error = f"{error_type}: {error_message}" if error_type else error_message
                     if error_details:
                         full_error += f" ({error_details})"
-                    self.execution_errors[prompt_id] = full_error
+                    self.jobs.set_error(prompt_id, full_error)
                     logger.error(f"Execution error for prompt {prompt_id}: {full_error}")
     
+    def _server_of(self, ws) -> str:
+        """웹소켓 객체 → 서버 주소"""
+        for server, socket in self._sockets.items():
+            if socket is ws:
+                return server
+        return self.server_address
+    
     def _on_error(self, ws, error):
         """웹소켓 에러 핸들러"""
         error_msg = str(error)
+        server_address = self._server_of(ws)
         if "10061" in error_msg or "connection refused" in error_msg.lower():
             logger.error(f"WebSocket 연결 실패: ComfyUI 서버에 연결할 수 없습니다.")
-            logger.error(f"  - 서버 주소: {self.server_address}")
+            logger.error(f"  - 서버 주소: {server_address}")
             logger.error(f"  - 확인 사항:")
             logger.error(f"    1. ComfyUI 서버가 실행 중인지 확인하세요")
             logger.error(f"    2. 포트 번호가 올바른지 확인하세요 (환경설정 탭에서 확인)")
-            logger.error(f"    3. ComfyUI 서버 주소가 {self.server_address}인지 확인하세요")
+            logger.error(f"    3. ComfyUI 서버 주소가 {server_address}인지 확인하세요")
         else:
-            logger.error(f"WebSocket error: {error}")
+            logger.error(f"WebSocket error ({server_address}): {error}")
     
     def _on_close(self, ws, close_status_code, close_msg):
         """웹소켓 종료 핸들러"""
-        logger.info("WebSocket closed")
-        self.ws_connected = False
+        server_address = self._server_of(ws)
+        logger.info(f"WebSocket closed: {server_address}")
+        self._socket_ready[server_address] = False
     
     def _on_open(self, ws):
         """웹소켓 연결 핸들러"""
-        logger.info("WebSocket connected")
-        self.ws_connected = True
+        server_address = self._server_of(ws)
+        logger.info(f"WebSocket connected: {server_address}")
+        self._socket_ready[server_address] = True
     
-    def _check_server_connection(self) -> bool:
+    def _check_server_connection(self, server_address: str = None) -> bool:
         """HTTP 서버 연결 가능 여부 확인"""
+        server_address = server_address or self.server_address
         try:
-            http_url = f"http://{self.server_address}/system_stats"
-            req = urllib.request.Request(http_url)
-            req.add_header('Content-Type', 'application/json')
-            response = urllib.request.urlopen(req, timeout=3)
-            logger.debug(f"ComfyUI 서버 연결 확인 성공: {self.server_address}")
-            return True
-        except urllib.error.URLError as e:
-            logger.error(f"ComfyUI 서버 연결 실패: {self.server_address}")
-            logger.error(f"  - 에러: {e}")
+            # 헬스 모니터의 캐시된 상태 사용 (비어 있거나 오래됐을 때만 직접 확인)
+            monitor = get_health_monitor()
+            status = monitor.comfyui_status(server_address) or monitor.check_now("comfyui", server_address=server_address)
+            if status["up"]:
+                logger.debug(f"ComfyUI 서버 연결 확인 성공: {server_address}")
+                return True
+            logger.error(f"ComfyUI 서버 연결 실패: {server_address}")
+            logger.error(f"  - 에러: {status['error']}")
             logger.error(f"  - 확인 사항:")
             logger.error(f"    1. ComfyUI 서버가 실행 중인지 확인하세요")
-            logger.error(f"    2. 포트 번호가 올바른지 확인하세요 (현재: {self.server_address})")
+            logger.error(f"    2. 포트 번호가 올바른지 확인하세요 (현재: {server_address})")
             logger.error(f"    3. 방화벽이 포트를 차단하지 않는지 확인하세요")
             return False
         except Exception as e:
             logger.error(f"서버 연결 확인 중 예상치 못한 오류: {e}")
             return False
     
-    def _connect_websocket(self):
-        """웹소켓 연결"""
-        if self.ws_connected and self.ws:
-            return
+    def _connect_websocket(self, server_address: str = None) -> bool:
+        """웹소켓 연결 (서버별로 하나씩 유지)
+        Returns: 연결되어 있으면 True
+        """
+        server_address = server_address or self.server_address
+        if self._socket_ready.get(server_address) and self._sockets.get(server_address):
+            return True
         
         # 먼저 HTTP 서버 연결 확인
-        if not self._check_server_connection():
+        if not self._check_server_connection(server_address):
             logger.error("ComfyUI HTTP 서버에 연결할 수 없습니다. WebSocket 연결을 시도하지 않습니다.")
-            return
+            return False
         
-        ws_url = f"ws://{self.server_address}/ws?clientId={self.client_id}"
+        ws_url = f"ws://{server_address}/ws?clientId={self.client_id}"
         logger.info(f"WebSocket 연결 시도: {ws_url}")
         
         # 기존 연결이 있으면 정리
-        if self.ws:
+        if self._sockets.get(server_address):
             try:
-                self.ws.close()
+                self._sockets[server_address].close()
             except:
                 pass
-            self.ws = None
-            self.ws_connected = False
+            self._sockets.pop(server_address, None)
+            self._socket_ready[server_address] = False
         
-        self.ws = websocket.WebSocketApp(
+        ws = websocket.WebSocketApp(
             ws_url,
             on_message=self._on_message,
             on_error=self._on_error,
             on_close=self._on_close,
             on_open=self._on_open
         )
+        self._sockets[server_address] = ws
         
         # 별도 스레드에서 웹소켓 실행
-        ws_thread = threading.Thread(target=self.ws.run_forever, daemon=True)
+        ws_thread = threading.Thread(target=ws.run_forever, daemon=True)
         ws_thread.start()
         
         # 연결 대기 (최대 5초)
         for _ in range(50):
-            if self.ws_connected:
+            if self._socket_ready.get(server_address):
                 break
             time.sleep(0.1)
         
-        if not self.ws_connected:
+        if not self._socket_ready.get(server_address):
             logger.error(f"WebSocket connection timeout: {ws_url}")
             logger.error("ComfyUI 서버가 실행 중인지 확인하세요.")
-            logger.error(f"  - 서버 주소: {self.server_address}")
+            logger.error(f"  - 서버 주소: {server_address}")
             logger.error(f"  - WebSocket URL: {ws_url}")
+            return False
+        return True
     
     def _find_workflow_nodes(self, workflow: dict) -> Dict[str, Any]:
         """워크플로우에서 모든 노드 ID를 찾아서 반환 (fallback 포함)
@@ -213,6 +346,7 @@ class ComfyClient:
                 'upscale': node_id or None,
                 'ksampler_1': node_id or None,
                 'ksampler_2': node_id or None,
+                'latent': node_id or None,
             }
         """
         nodes = {
@@ -226,6 +360,7 @@ class ComfyClient:
             'upscale': None,
             'ksampler_1': None,
             'ksampler_2': None,
+            'latent': None,
         }
         
         # Positive Prompt (노드 "6")
@@ -333,26 +468,41 @@ class ComfyClient:
                         logger.warning(f"두 번째 KSampler를 고정 노드(31)에서 찾지 못해 순회로 찾음: 노드 {node_id}")
                     break
         
+        # 빈 latent (노드 "13", batch_size로 한 번에 여러 장 생성)
+        latent_types = ("EmptySD3LatentImage", "EmptyLatentImage")
+        if "13" in workflow and isinstance(workflow["13"], dict) and workflow["13"].get("class_type") in latent_types:
+            nodes['latent'] = "13"
+        else:
+            for node_id, node_data in workflow.items():
+                if isinstance(node_data, dict) and node_data.get("class_type") in latent_types:
+                    nodes['latent'] = node_id
+                    break
+        
         return nodes
     
-    def queue_prompt(self, prompt: dict, nodes: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    def queue_prompt(self, prompt: dict, nodes: Optional[Dict[str, Any]] = None, server_address: str = None, front: bool = False) -> Optional[str]:
         """프롬프트를 큐에 추가하고 실행
         
         Args:
             prompt: 워크플로우 딕셔너리
             nodes: 노드 ID 딕셔너리 (없으면 자동으로 찾음)
+            server_address: 보낼 서버 (없으면 기본 서버)
+            front: True면 대기열 맨 앞에 추가
         """
+        server_address = server_address or self.server_address
         # 노드 정보가 없으면 다시 찾기 (queue_prompt가 직접 호출된 경우)
         if nodes is None:
             nodes = self._find_workflow_nodes(prompt)
         
         p = {"prompt": prompt, "client_id": self.client_id}
+        if front:
+            p["front"] = True
         data = json.dumps(p).encode('utf-8')
-        req = urllib.request.Request(f"http://{self.server_address}/prompt", data=data)
+        req = urllib.request.Request(f"http://{server_address}/prompt", data=data)
         req.add_header('Content-Type', 'application/json')
         
         # 디버깅: 전송되는 워크플로우 정보 로깅 (값을 주입하는 모든 노드, 찾은 노드 ID 사용)
-        logger.debug(f"Queueing prompt to: http://{self.server_address}/prompt")
+        logger.debug(f"Queueing prompt to: http://{server_address}/prompt")
         logger.debug(f"Client ID: {self.client_id}")
         logger.debug(f"Workflow nodes: {list(prompt.keys())}")
         
@@ -419,7 +569,7 @@ class ComfyClient:
                 error_body = "Could not read error response body"
             
             logger.error(f"❌ 프롬프트 큐 추가 실패: HTTP {e.code} {e.reason}")
-            logger.error(f"  - 서버 주소: http://{self.server_address}/prompt")
+            logger.error(f"  - 서버 주소: http://{server_address}/prompt")
             logger.error(f"  - 에러 응답: {error_body[:500]}")  # 처음 500자만 표시
             logger.error(f"  - 요청 데이터 크기: {len(data)} bytes")
             
@@ -444,7 +594,7 @@ class ComfyClient:
             return None
         except urllib.error.URLError as e:
             logger.error(f"❌ 서버 연결 실패: {e}")
-            logger.error(f"  - 서버 주소: http://{self.server_address}/prompt")
+            logger.error(f"  - 서버 주소: http://{server_address}/prompt")
             logger.error(f"  - ComfyUI 서버가 실행 중인지 확인하세요")
             return None
         except Exception as e:
@@ -453,11 +603,11 @@ class ComfyClient:
             logger.error(traceback.format_exc())
             return None
     
-    def get_image(self, filename: str, subfolder: str = "", folder_type: str = "output") -> Optional[bytes]:
+    def get_image(self, filename: str, subfolder: str = "", folder_type: str = "output", server_address: str = None) -> Optional[bytes]:
         """생성된 이미지 다운로드"""
         data = {"filename": filename, "subfolder": subfolder, "type": folder_type}
         url_values = urllib.parse.urlencode(data)
-        image_url = f"http://{self.server_address}/view?{url_values}"
+        image_url = f"http://{server_address or self.server_address}/view?{url_values}"
         try:
             req = urllib.request.Request(image_url)
             response = urllib.request.urlopen(req, timeout=10)
@@ -484,16 +634,195 @@ class ComfyClient:
             logger.error(traceback.format_exc())
             return None
     
-    def generate_image(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1) -> Optional[bytes]:
+    def generate_image(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng: Optional[random.Random] = None, progress: Optional[JobProgress] = None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None) -> ImageResult:
+        """이미지 1장 생성 (progress를 주면 생성 중 진행률/미리보기를 갱신, init_image를 주면 img2img)"""
+        return self.generate_images(visual_prompt, appearance, negative_prompt, seed, rng, progress=progress, init_image=init_image, init_denoise=init_denoise)
+    
+    def generate_images(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng: Optional[random.Random] = None, batch_size: int = 1, progress: Optional[JobProgress] = None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None) -> ImageResult:
+        """이미지 batch_size장을 한 번의 프롬프트로 생성 (같은 시드의 latent 배치, 카세트 녹화 중이면 첫 장과 시드를 기록)"""
+        start = time.perf_counter()
+        result = self._generate_images(visual_prompt, appearance, negative_prompt, seed, rng, batch_size, progress, init_image, init_denoise)
+        if self.recorder is not None:
+            self.recorder.record_image(visual_prompt, appearance, result.seed, result.refine_seed, result.image, time.perf_counter() - start)
+        return result
+    
+    def generate_image_staged(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng: Optional[random.Random] = None, on_final: Optional[Callable[[Optional[bytes]], None]] = None, progress: Optional[JobProgress] = None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None, schedule_refine: Optional[Callable[[Callable[[], Any]], Any]] = None) -> ImageResult:
+        """
+        미리보기를 먼저 생성해 반환하고 고품질 이미지는 백그라운드에서 생성
+        - 미리보기: 적은 스텝, 업스케일/리파인 생략, 서버 대기열 맨 앞에 추가
+        - 고품질: 같은 시드로 일반 순서 실행, 끝나면 on_final(이미지 바이트, 실패 시 None) 호출
+        - schedule_refine: 고품질 패스를 감싸 실행할 함수 (예: 이미지 스케줄러에 낮은 우선순위로 제출, 거절되면 None 반환)
+        progress는 미리보기(또는 바로 생성하는 고품질 이미지) 진행 상황만 갱신
+        미리보기가 의미 없거나(고품질과 같은 워크플로우, 캐시에 이미 있음) 실패하면 고품질 이미지를 바로 생성해 반환 (on_final 호출 안 함)
+        """
+        start = time.perf_counter()
+        result = self._generate_image_staged(visual_prompt, appearance, negative_prompt, seed, rng, on_final, progress, init_image, init_denoise, schedule_refine)
+        if self.recorder is not None:
+            self.recorder.record_image(visual_prompt, appearance, result.seed, result.refine_seed, result.image, time.perf_counter() - start)
+        return result
+    
+    def _generate_image_staged(self, visual_prompt: str, appearance: str, negative_prompt: str, seed: int, rng: Optional[random.Random], on_final: Optional[Callable[[Optional[bytes]], None]], progress: Optional[JobProgress], init_image: Optional[bytes], init_denoise: Optional[float], schedule_refine: Optional[Callable[[Callable[[], Any]], Any]] = None) -> ImageResult:
+        comfyui_start_time = time.time()
+        # 시드는 요청 스레드에서 한 번만 추출 (백그라운드 스레드는 세션 RNG를 건드리지 않음)
+        prepared = self._prepare_workflow(visual_prompt, appearance, negative_prompt, seed, rng, init_image=init_image, init_denoise=init_denoise)
+        if prepared is None:
+            return ImageResult()
+        workflow, nodes = prepared
+        
+        preview = self._make_preview_workflow(workflow, nodes)
+        already_cached = config.IMAGE_CACHE_CONFIG["enabled"] and workflow_key(workflow) in get_image_cache()
+        if preview is not None and not already_cached:
+            previews = self._run_workflow(preview, nodes, comfyui_start_time, front=True, progress=progress)
+            if previews:
+                logger.info(f"✅ 미리보기 생성 완료 ({time.time() - comfyui_start_time:.2f}s), 고품질 이미지는 백그라운드에서 생성")
+                
+                def run_final() -> ImageResult:
+                    return self._run_workflow(workflow, nodes, time.time())
+                
+                def refine():
+                    try:
+                        final = schedule_refine(run_final) if schedule_refine is not None else run_final()
+                        if on_final is not None:
+                            on_final(final.image if final else None)
+                    except Exception as e:
+                        logger.error(f"❌ 고품질 이미지 생성 실패: {e}")
+                        import traceback
+                        logger.error(traceback.format_exc())
+                
+                threading.Thread(target=refine, name="ComfyRefine", daemon=True).start()
+                return previews
+            logger.warning("⚠️ 미리보기 생성 실패 - 고품질 이미지를 바로 생성합니다")
+        
+        return self._run_workflow(workflow, nodes, comfyui_start_time, progress=progress)
+    
+    def _make_preview_workflow(self, workflow: dict, nodes: Dict[str, Any]) -> Optional[dict]:
+        """
+        미리보기용 워크플로우 (첫 KSampler 스텝 축소, 두 번째 KSampler/업스케일 단계 생략)
+        Returns: 미리보기 워크플로우 (고품질 워크플로우와 다를 게 없으면 None)
+        """
+        if not nodes['ksampler_1']:
+            return None
+        preview = copy.deepcopy(workflow)
+        changed = False
+        
+        preview_steps = config.IMAGE_PREVIEW_CONFIG["steps"]
+        sampler_inputs = preview[nodes['ksampler_1']]["inputs"]
+        if sampler_inputs.get("steps", 0) > preview_steps:
+            sampler_inputs["steps"] = preview_steps
+            changed = True
+        
+        # 저장 노드 입력을 첫 KSampler 출력의 VAEDecode로 바꾸면 ComfyUI는 업스케일/리파인 노드를 실행하지 않음
+        if nodes['ksampler_2']:
+            decode_id = None
+            for node_id, node_data in preview.items():
+                if isinstance(node_data, dict) and node_data.get("class_type") == "VAEDecode" and node_data.get("inputs", {}).get("samples") == [nodes['ksampler_1'], 0]:
+                    decode_id = node_id
+                    break
+            if decode_id:
+                for node_id, node_data in preview.items():
+                    if isinstance(node_data, dict) and node_data.get("class_type") == "SaveImage":
+                        node_data["inputs"]["images"] = [decode_id, 0]
+                        changed = True
+        
+        return preview if changed else None
+    
+    def generate_plate(self, background: str) -> ImageResult:
         """
-        이미지 생성
+        배경 플레이트 생성 (인물 없는 배경만)
+        시드는 배경 문자열에서 고정으로 만들고 세션 RNG를 쓰지 않으므로 백그라운드 스레드에서 호출 가능
+        카세트 녹화 중이면 턴 이미지와 별도로 세션의 플레이트 목록에 기록
+        """
+        start = time.perf_counter()
+        seed = int(hashlib.sha256(background.encode('utf-8')).hexdigest()[:8], 16) or 1
+        visual_prompt = config.BACKGROUND_PLATE_CONFIG["prompt"].format(background=background)
+        result = self._generate_images(visual_prompt, None, "", seed, random.Random(seed))
+        if self.recorder is not None:
+            self.recorder.record_plate(background, result.image, time.perf_counter() - start)
+        return result
+    
+    def _apply_init_image(self, workflow: dict, nodes: Dict[str, Any], init_image: bytes, batch_size: int = 1, denoise: Optional[float] = None) -> bool:
+        """
+        시작 이미지 → LoadImage → ImageScale(빈 latent 크기) → VAEEncode → 첫 KSampler latent_image
+        업로드할 이미지는 nodes['init_image']에 기록 (실행할 서버가 정해진 뒤 _execute에서 업로드)
+        """
+        sampler_inputs = workflow[nodes['ksampler_1']]["inputs"]
+        vae_source = None
+        for node_data in workflow.values():
+            if isinstance(node_data, dict) and node_data.get("class_type") == "VAEDecode" and node_data.get("inputs", {}).get("samples") == [nodes['ksampler_1'], 0]:
+                vae_source = node_data["inputs"].get("vae")
+                break
+        if vae_source is None:
+            logger.warning("⚠️ img2img: 첫 KSampler의 VAEDecode를 찾지 못해 txt2img로 생성합니다")
+            return False
+        
+        # 내용 기반 파일 이름 (같은 이미지는 서버별로 한 번만 업로드, 이미지 캐시 키도 안정적)
+        image_name = f"zems_{hashlib.sha256(init_image).hexdigest()[:16]}.png"
+        workflow["img2img_load"] = {"class_type": "LoadImage", "inputs": {"image": image_name}}
+        pixels = ["img2img_load", 0]
+        if nodes['latent']:
+            latent_inputs = workflow[nodes['latent']]["inputs"]
+            workflow["img2img_scale"] = {"class_type": "ImageScale", "inputs": {"upscale_method": "lanczos", "width": latent_inputs["width"], "height": latent_inputs["height"], "crop": "center", "image": pixels}}
+            pixels = ["img2img_scale", 0]
+        workflow["img2img_encode"] = {"class_type": "VAEEncode", "inputs": {"pixels": pixels, "vae": vae_source}}
+        latent = ["img2img_encode", 0]
+        if batch_size > 1:
+            workflow["img2img_repeat"] = {"class_type": "RepeatLatentBatch", "inputs": {"samples": latent, "amount": batch_size}}
+            latent = ["img2img_repeat", 0]
+        
+        if denoise is None:
+            denoise = config.IMAGE_CONTINUITY_CONFIG["denoise"]
+        sampler_inputs["latent_image"] = latent
+        sampler_inputs["denoise"] = denoise
+        # denoise < 1이면 KSampler는 (steps / denoise) 길이 스케줄의 뒤쪽 steps만 실행하므로 스텝 수를 줄여 같은 스케줄 유지
+        sampler_inputs["steps"] = max(1, round(sampler_inputs["steps"] * denoise))
+        nodes['init_image'] = {"name": image_name, "data": init_image}
+        logger.info(f"img2img 연속 모드: denoise={denoise}, steps={sampler_inputs['steps']}, image={image_name}")
+        return True
+    
+    def _upload_image(self, server_address: str, image_name: str, image_data: bytes) -> bool:
+        """이미지를 서버 input 폴더에 업로드 (같은 이름은 서버별로 한 번만)"""
+        if (server_address, image_name) in self._uploaded_images:
+            return True
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="{image_name}"\r\nContent-Type: image/png\r\n\r\n'.encode('utf-8')
+            + image_data
+            + f'\r\n--{boundary}\r\nContent-Disposition: form-data; name="overwrite"\r\n\r\ntrue\r\n--{boundary}--\r\n'.encode('utf-8')
+        )
+        req = urllib.request.Request(f"http://{server_address}/upload/image", data=body)
+        req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as e:
+            logger.error(f"❌ 시작 이미지 업로드 실패 ({server_address}): {e}")
+            return False
+        self._uploaded_images.add((server_address, image_name))
+        return True
+    
+    def _generate_images(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng: Optional[random.Random] = None, batch_size: int = 1, progress: Optional[JobProgress] = None, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None) -> ImageResult:
+        """이미지 생성 (워크플로우 준비 후 실행)"""
+        # ComfyUI 응답 시간 측정 시작
+        comfyui_start_time = time.time()
+        prepared = self._prepare_workflow(visual_prompt, appearance, negative_prompt, seed, rng, batch_size, init_image, init_denoise)
+        if prepared is None:
+            return ImageResult()
+        workflow, nodes = prepared
+        return self._run_workflow(workflow, nodes, comfyui_start_time, batch_size, progress=progress)
+    
+    def _prepare_workflow(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng: Optional[random.Random] = None, batch_size: int = 1, init_image: Optional[bytes] = None, init_denoise: Optional[float] = None) -> Optional[Tuple[dict, Dict[str, Any]]]:
+        """
+        워크플로우 로드 및 프롬프트/모델/시드 주입 (시드는 호출한 스레드에서 세션 RNG로 추출)
         visual_prompt: LLM이 생성한 상황 묘사
         appearance: 초기 설정에서 받은 외모 묘사 (영어 태그 형식)
         negative_prompt: 네거티브 프롬프트
-        seed: 시드값 (-1이면 랜덤)
+        seed: 시드값 (-1이면 rng에서 추출)
+        rng: 세션 전용 난수 생성기 (None이면 클라이언트 전용 RNG 사용)
+        batch_size: 한 번에 생성할 장 수 (빈 latent의 batch_size)
+        init_image: 시작 이미지 (PNG 바이트, 있으면 img2img - 연속 모드 또는 배경 플레이트)
+        init_denoise: img2img denoise (None이면 연속 모드 설정값)
+        Returns: (워크플로우, 노드 ID 딕셔너리 - 사용한 시드는 nodes['seed'], nodes['refine_seed']) (실패 시 None)
         """
-        # ComfyUI 응답 시간 측정 시작
-        comfyui_start_time = time.time()
         # 워크플로우 로드
         workflow_path_str = self.workflow_path
         
@@ -612,8 +941,13 @@ class ComfyClient:
                 logger.debug(f"UpscaleModelLoader (node {nodes['upscale']}) using workflow default: {current_model_name}")
         
         # KSampler 노드 설정: 시드 및 생성 파라미터 설정
+        # 시드 지정 시 그대로 사용, 아니면 세션 RNG 스트림에서 추출 (같은 시드의 세션은 같은 이미지 시드 재현)
         max_seed = 4294967295
-        random_seed = random.randint(1, max_seed)
+        rng = rng or self.rng
+        random_seed = seed if seed is not None and seed >= 0 else rng.randint(1, max_seed)
+        refine_seed = rng.randint(1, max_seed) if nodes['ksampler_2'] else None
+        nodes['seed'] = random_seed
+        nodes['refine_seed'] = refine_seed
         
         # 첫 번째 KSampler: 메인 생성 파라미터 사용
         if nodes['ksampler_1']:
@@ -624,9 +958,18 @@ class ComfyClient:
             workflow[nodes['ksampler_1']]["inputs"]["scheduler"] = self.scheduler
             logger.info(f"KSampler (node {nodes['ksampler_1']}) 설정: seed={random_seed}, steps={self.steps}, cfg={self.cfg}, sampler={self.sampler_name}, scheduler={self.scheduler}")
         
+        # 여러 장 생성: 빈 latent의 batch_size (GPU 배치로 한 번에 생성)
+        if batch_size > 1 and nodes['latent']:
+            workflow[nodes['latent']]["inputs"]["batch_size"] = batch_size
+            logger.info(f"Latent (node {nodes['latent']}) batch_size set to: {batch_size}")
+        
+        # img2img 연속 모드: 이전 이미지를 시작 latent로 사용 (낮은 denoise, 적은 스텝)
+        if init_image and nodes['ksampler_1']:
+            self._apply_init_image(workflow, nodes, init_image, batch_size, init_denoise)
+        
         # 두 번째 KSampler (2d만): 시드만 랜덤으로 설정 (리파인용이므로 기존 파라미터 유지)
         if nodes['ksampler_2']:
-            workflow[nodes['ksampler_2']]["inputs"]["seed"] = random.randint(1, max_seed)
+            workflow[nodes['ksampler_2']]["inputs"]["seed"] = refine_seed
             logger.info(f"KSampler (node {nodes['ksampler_2']}) 시드 설정: {workflow[nodes['ksampler_2']]['inputs']['seed']}")
         
         # 워크플로우 최종 검증 및 로깅
@@ -659,22 +1002,105 @@ class ComfyClient:
         
         logger.debug("=" * 50)
         
+        return workflow, nodes
+    
+    def _run_workflow(self, workflow: dict, nodes: Dict[str, Any], comfyui_start_time: float, batch_size: int = 1, front: bool = False, progress: Optional[JobProgress] = None) -> ImageResult:
+        """
+        완성된 워크플로우 실행 (캐시 확인 → 서버 선택 → 실행, 서버 장애 시 다른 서버로 재시도)
+        Returns: 이미지 + 시드 + ComfyUI 응답 시간 (실패 시 이미지 없음)
+        front: True면 서버 큐의 맨 앞에 추가 (미리보기처럼 빨리 보여줘야 하는 작업)
+        """
+        # 같은 워크플로우(프롬프트, 시드, 모델, 샘플러 설정)를 이미 생성했으면 캐시에서 바로 반환
+        cache_key = workflow_key(workflow) if config.IMAGE_CACHE_CONFIG["enabled"] else None
+        cache_keys = ([cache_key] if batch_size <= 1 else [f"{cache_key}-{i}" for i in range(batch_size)]) if cache_key else []
+        if cache_keys:
+            cached = [get_image_cache().get(key) for key in cache_keys]
+            if all(image is not None for image in cached):
+                logger.info(f"✅ Image cache hit: {cache_key[:12]} ({len(cached)} images)")
+                return self._result(cached, nodes, comfyui_start_time)
+        
+        # 서버 선택 (부하가 가장 작은 서버, 같은 체크포인트를 마지막으로 실행한 서버 우선)
+        # 작업 중 서버가 죽거나 서버에 모델이 없으면 다른 서버로 재시도
+        pool = get_comfy_pool()
+        tried = []
+        for _ in range(1 + config.COMFYUI_POOL_CONFIG["max_failover"]):
+            server_address = pool.select(self.servers, self.model_name, exclude=tried)
+            if server_address is None:
+                break
+            tried.append(server_address)
+            if len(self.servers) > 1:
+                logger.info(f"ComfyUI 서버 선택: {server_address}")
+            with pool.job(server_address, self.model_name):
+                images, retry_elsewhere = self._execute(workflow, nodes, server_address, comfyui_start_time, front, progress)
+            if not retry_elsewhere:
+                if len(images) == len(cache_keys):
+                    for key, image_data in zip(cache_keys, images):
+                        get_image_cache().put(key, image_data)
+                return self._result(images, nodes, comfyui_start_time)
+            logger.warning(f"⚠️ ComfyUI 서버에서 실행 실패: {server_address}")
+        logger.error(f"❌ 이미지를 생성할 수 있는 ComfyUI 서버가 없습니다 (시도: {tried})")
+        return self._result([], nodes, comfyui_start_time)
+    
+    def _result(self, images: List[bytes], nodes: Dict[str, Any], comfyui_start_time: float) -> ImageResult:
+        return ImageResult(images, nodes.get('seed'), nodes.get('refine_seed'), time.time() - comfyui_start_time)
+    
+    def _use_websocket_output(self, workflow: dict, server_address: str) -> Tuple[dict, Optional[str]]:
+        """
+        SaveImage 노드를 웹소켓 저장 노드로 교체 (서버 카탈로그에 노드가 있을 때만, 원본 워크플로우는 그대로 둠)
+        Returns: (실행할 워크플로우, 웹소켓 저장 노드 ID 또는 None)
+        """
+        settings = config.COMFYUI_WS_OUTPUT_CONFIG
+        if not settings["enabled"]:
+            return workflow, None
+        catalog = get_object_info_catalog().get(server_address, block=False) or {}
+        if settings["node_type"] not in catalog:
+            return workflow, None
+        save_ids = [node_id for node_id, node_data in workflow.items() if isinstance(node_data, dict) and node_data.get("class_type") == "SaveImage"]
+        # 저장 노드가 여러 개면 어느 프레임이 어느 이미지인지 구분할 수 없으므로 그대로 사용
+        if len(save_ids) != 1:
+            return workflow, None
+        save_id = save_ids[0]
+        workflow = dict(workflow)
+        workflow[save_id] = {"class_type": settings["node_type"], "inputs": {"images": workflow[save_id]["inputs"]["images"]}}
+        return workflow, save_id
+    
+    def _execute(self, workflow: dict, nodes: Dict[str, Any], server_address: str, comfyui_start_time: float, front: bool = False, progress: Optional[JobProgress] = None) -> Tuple[List[bytes], bool]:
+        """
+        서버 하나에서 워크플로우 실행 후 결과 이미지 대기
+        Returns: (이미지 바이트 목록, 다른 서버 재시도 여부) - 서버 장애 또는 서버에 모델이 없을 때만 재시도
+        """
+        # object_info 카탈로그로 로컬 검증 (잘못된 모델/샘플러 이름은 GPU 큐에 넣기 전에 바로 실패)
+        validation_errors = get_object_info_catalog().validate_workflow(server_address, workflow)
+        if validation_errors:
+            logger.error("❌ 워크플로우 검증 실패 (큐에 추가하지 않음):")
+            for error in validation_errors:
+                logger.error(f"  - {error}")
+            return [], True
+        
+        # img2img 시작 이미지 업로드 (실패하면 다른 서버로 재시도)
+        init_image = nodes.get('init_image')
+        if init_image and not self._upload_image(server_address, init_image["name"], init_image["data"]):
+            return [], True
+        
+        # 서버에 웹소켓 저장 노드가 있으면 최종 이미지를 소켓으로 직접 받음
+        workflow, ws_node = self._use_websocket_output(workflow, server_address)
+        
         # 웹소켓 연결
-        self._connect_websocket()
-        if not self.ws_connected:
+        if not self._connect_websocket(server_address):
             logger.error("Failed to connect WebSocket to ComfyUI server")
-            logger.error("이미지 생성을 중단합니다. ComfyUI 서버 상태를 확인하세요.")
-            return None
+            logger.error(f"  - 서버 주소: {server_address}")
+            return [], True
         
+        prompt_id = None
         try:
             # 프롬프트 큐에 추가 (찾은 노드 ID 전달)
-            prompt_id = self.queue_prompt(workflow, nodes)
+            prompt_id = self.queue_prompt(workflow, nodes, server_address, front)
             if not prompt_id:
-                return None
-            
-            # 이미지 정보 대기용 딕셔너리 초기화
-            self.pending_images[prompt_id] = {}
-            self.execution_completed[prompt_id] = False
+                # 서버가 죽었으면 다른 서버로 재시도 (HTTP 오류는 다른 서버에서도 같으므로 재시도하지 않음)
+                status = get_health_monitor().check_now("comfyui", server_address=server_address)
+                return [], not status["up"]
+            # 작업 등록 (웹소켓 저장 노드면 바이너리 프레임으로 받을 노드 ID 기록, 정리는 finally에서)
+            self.jobs.register(prompt_id, server_address, ws_node=ws_node, progress=progress)
             
             # 이미지 생성 완료 대기 (최대 180초)
             max_wait = 180
@@ -684,9 +1110,20 @@ class ComfyClient:
             post_completion_timeout = 10  # 실행 완료 후 10초 내에 이미지가 없으면 실패
             
             while waited < max_wait:
+                # 작업 중 서버 연결이 끊기면 다른 서버로 재시도
+                if not self._socket_ready.get(server_address):
+                    logger.error(f"❌ 이미지 생성 중 ComfyUI 서버 연결 끊김: {server_address}")
+                    logger.error(f"  - 프롬프트 ID: {prompt_id}")
+                    return [], True
+                
+                job = self.jobs.get(prompt_id)
+                if job is None:
+                    logger.error(f"❌ 작업 기록이 만료되거나 제거됨: {prompt_id}")
+                    return [], False
+                
                 # 에러 체크
-                if prompt_id in self.execution_errors:
-                    error_msg = self.execution_errors[prompt_id]
+                if job["error"]:
+                    error_msg = job["error"]
                     # ComfyUI 응답 시간 측정 완료 (에러)
                     comfyui_elapsed_time = time.time() - comfyui_start_time
                     logger.error(f"❌ 이미지 생성 실패 (ComfyUI 실행 오류): {error_msg}")
@@ -697,18 +1134,10 @@ class ComfyClient:
                     logger.error(f"    2. VAE/CLIP 파일을 찾을 수 없음 (파일 이름 확인)")
                     logger.error(f"    3. 워크플로우 노드 연결 오류")
                     logger.error(f"    4. 메모리 부족 또는 하드웨어 오류")
-                    # 정리
-                    if prompt_id in self.pending_images:
-                        del self.pending_images[prompt_id]
-                    if prompt_id in self.execution_completed:
-                        del self.execution_completed[prompt_id]
-                    del self.execution_errors[prompt_id]
-                    # 시간 정보 저장
-                    self._last_comfyui_time = comfyui_elapsed_time
-                    return None
+                    return [], False
                 
                 # 실행 완료 플래그 확인
-                if prompt_id in self.execution_completed and self.execution_completed[prompt_id]:
+                if job["completed"]:
                     if execution_completed_time is None:
                         execution_completed_time = waited
                         logger.info("Execution completed, waiting for image...")
@@ -721,36 +1150,38 @@ class ComfyClient:
                         logger.error(f"    1. SaveImage 노드가 워크플로우에 없음")
                         logger.error(f"    2. 이미지 저장 경로 문제")
                         logger.error(f"    3. ComfyUI 서버 내부 오류")
-                        # 정리
-                        if prompt_id in self.pending_images:
-                            del self.pending_images[prompt_id]
-                        if prompt_id in self.execution_completed:
-                            del self.execution_completed[prompt_id]
-                        return None
+                        return [], False
+                
+                # 웹소켓으로 받은 최종 이미지 (실행 완료 후 바로 반환, /view 다운로드 없음)
+                ws_images = job["ws_images"]
+                if ws_images and job["completed"]:
+                    comfyui_elapsed_time = time.time() - comfyui_start_time
+                    logger.info(f"Image generated successfully (websocket, {len(ws_images)} images)")
+                    logger.info(f"⏱️ ComfyUI 응답 시간: {comfyui_elapsed_time:.2f}s")
+                    return ws_images, False
                 
                 # 이미지 확인
-                if prompt_id in self.pending_images:
-                    image_info = self.pending_images[prompt_id]
-                    if "filename" in image_info:
+                image_info = job["output"]
+                if image_info:
+                    if image_info.get("filename"):
                         # 이미지 다운로드
                         filename = image_info["filename"]
                         subfolder = image_info.get("subfolder", "")
                         folder_type = image_info.get("type", "output")
                         
-                        image_data = self.get_image(filename, subfolder, folder_type)
+                        image_data = self.get_image(filename, subfolder, folder_type, server_address)
+                        # batch_size > 1이면 나머지 이미지도 다운로드
+                        images = [image_data] if image_data else []
+                        for extra in image_info.get("images", [])[1:]:
+                            extra_data = self.get_image(extra.get("filename"), extra.get("subfolder", ""), extra.get("type", "output"), server_address)
+                            if extra_data:
+                                images.append(extra_data)
                         if image_data:
-                            # 정리
-                            if prompt_id in self.pending_images:
-                                del self.pending_images[prompt_id]
-                            if prompt_id in self.execution_completed:
-                                del self.execution_completed[prompt_id]
                             # ComfyUI 응답 시간 측정 완료
                             comfyui_elapsed_time = time.time() - comfyui_start_time
                             logger.info(f"Image generated successfully: {filename}")
                             logger.info(f"⏱️ ComfyUI 응답 시간: {comfyui_elapsed_time:.2f}s")
-                            # 시간 정보를 인스턴스 변수에 저장 (나중에 전체 완료 로그에서 사용)
-                            self._last_comfyui_time = comfyui_elapsed_time
-                            return image_data
+                            return images, False
                 
                 time.sleep(wait_interval)
                 waited += wait_interval
@@ -759,23 +1190,16 @@ class ComfyClient:
             comfyui_elapsed_time = time.time() - comfyui_start_time
             logger.error(f"❌ 이미지 생성 타임아웃 ({max_wait}초 초과)")
             logger.error(f"  - 프롬프트 ID: {prompt_id}")
-            logger.error(f"  - 실행 완료 여부: {prompt_id in self.execution_completed and self.execution_completed.get(prompt_id, False)}")
-            logger.error(f"  - 이미지 정보: {self.pending_images.get(prompt_id, '없음')}")
+            job = self.jobs.get(prompt_id) or {}
+            logger.error(f"  - 실행 완료 여부: {job.get('completed', False)}")
+            logger.error(f"  - 이미지 정보: {job.get('output') or '없음'}")
+            logger.error(f"  - 대기 중인 작업: {len(self.jobs.active())}개")
             logger.error(f"⏱️ ComfyUI 응답 시간 (타임아웃): {comfyui_elapsed_time:.2f}s")
             logger.error(f"  - 가능한 원인:")
             logger.error(f"    1. ComfyUI 서버가 응답하지 않음")
             logger.error(f"    2. 이미지 생성 시간이 너무 오래 걸림")
             logger.error(f"    3. 워크플로우 실행 중 오류 발생 (ComfyUI 콘솔 확인)")
-            # 정리
-            if prompt_id in self.pending_images:
-                del self.pending_images[prompt_id]
-            if prompt_id in self.execution_completed:
-                del self.execution_completed[prompt_id]
-            if prompt_id in self.execution_errors:
-                del self.execution_errors[prompt_id]
-            # 시간 정보 저장
-            self._last_comfyui_time = comfyui_elapsed_time
-            return None
+            return [], False
             
         except Exception as e:
             # ComfyUI 응답 시간 측정 완료 (에러)
@@ -784,7 +1208,9 @@ class ComfyClient:
             logger.error(f"⏱️ ComfyUI 응답 시간 (에러): {comfyui_elapsed_time:.2f}s")
             import traceback
             logger.error(traceback.format_exc())
-            # 시간 정보 저장
-            self._last_comfyui_time = comfyui_elapsed_time
-            return None
+            return [], False
+        finally:
+            # 어떤 경로로 끝나든 작업 기록 정리
+            if prompt_id:
+                self.jobs.remove(prompt_id)
 
@@ -0,0 +1,115 @@
+"""
+Zeniji Emotion Simul - ComfyUI Pool
+여러 ComfyUI 서버에 이미지 작업 분배 (모든 세션 공유)
+- 서버 부하 = max(/queue 대기열 길이, 이 프로세스가 보낸 진행 중 작업 수), 가장 작은 서버 선택
+- 같은 체크포인트를 마지막으로 실행한 서버를 우선 (모델 재로드 방지, 부하 차이가 sticky_slack 이하일 때만)
+- 다운된 서버는 제외 (헬스 모니터 상태 표 기준)
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import config
+from health_monitor import get_health_monitor
+
+logger = logging.getLogger("ComfyPool")
+
+
+def parse_servers(value) -> List[str]:
+    """설정값(리스트 또는 쉼표 구분 문자열) → 서버 주소 목록"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(server).strip() for server in value if str(server).strip()]
+
+
+class ComfyPool:
+    """ComfyUI 서버 선택 및 진행 중 작업 추적"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.COMFYUI_POOL_CONFIG
+        self._lock = threading.Lock()
+        self._outstanding: Dict[str, int] = {}
+        # 서버 -> 마지막으로 실행한 체크포인트
+        self._loaded: Dict[str, str] = {}
+        self.dispatched: Dict[str, int] = {}
+    
+    def _load(self, server: str) -> int:
+        status = get_health_monitor().comfyui_status(server)
+        queue_depth = status["queue_depth"] if status and status["queue_depth"] is not None else 0
+        return max(queue_depth, self._outstanding.get(server, 0))
+    
+    def select(self, servers: List[str], checkpoint: Optional[str] = None, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """
+        작업을 보낼 서버 선택
+        Returns: 서버 주소 (사용 가능한 서버가 없으면 None)
+        """
+        exclude = exclude or []
+        monitor = get_health_monitor()
+        candidates = []
+        for server in servers:
+            if server in exclude:
+                continue
+            status = monitor.comfyui_status(server)
+            # 확인 전(None)인 서버는 후보에 포함, 다운으로 확인된 서버만 제외
+            if status is not None and status["up"] is False:
+                continue
+            candidates.append(server)
+        if not candidates:
+            # 모두 다운으로 표시되어 있으면 상태가 오래됐을 수 있으므로 제외 목록 외 서버 중 첫 번째로 시도
+            remaining = [server for server in servers if server not in exclude]
+            return remaining[0] if remaining else None
+        if len(candidates) == 1:
+            return candidates[0]
+        
+        with self._lock:
+            loads = {server: self._load(server) for server in candidates}
+            best = min(candidates, key=lambda server: loads[server])
+            if self.settings["sticky"] and checkpoint:
+                sticky = [server for server in candidates if self._loaded.get(server) == checkpoint]
+                if sticky:
+                    preferred = min(sticky, key=lambda server: loads[server])
+                    if loads[preferred] - loads[best] <= self.settings["sticky_slack"]:
+                        return preferred
+            return best
+    
+    @contextmanager
+    def job(self, server: str, checkpoint: Optional[str] = None):
+        """진행 중 작업 수 추적 (with 블록 동안)"""
+        with self._lock:
+            self._outstanding[server] = self._outstanding.get(server, 0) + 1
+            self.dispatched[server] = self.dispatched.get(server, 0) + 1
+            if checkpoint:
+                self._loaded[server] = checkpoint
+        try:
+            yield server
+        finally:
+            with self._lock:
+                self._outstanding[server] = max(0, self._outstanding.get(server, 0) - 1)
+    
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            servers = set(self._outstanding) | set(self.dispatched)
+            return {
+                server: {
+                    "outstanding": self._outstanding.get(server, 0),
+                    "dispatched": self.dispatched.get(server, 0),
+                    "checkpoint": self._loaded.get(server),
+                }
+                for server in servers
+            }
+
+
+# 전역 인스턴스
+_global_comfy_pool: Optional[ComfyPool] = None
+
+
+def get_comfy_pool() -> ComfyPool:
+    """전역 ComfyPool 인스턴스 가져오기"""
+    global _global_comfy_pool
+    if _global_comfy_pool is None:
+        _global_comfy_pool = ComfyPool()
+    return _global_comfy_pool
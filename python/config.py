@@ -32,6 +32,8 @@ API_KEY_DIR = PROJECT_ROOT / "apikey"
 OPENROUTER_API_KEY_FILE = API_KEY_DIR / "openrouter_api_key.txt"
 SCENARIOS_DIR = PROJECT_ROOT / "scenarios"
 IMAGE_DIR = PROJECT_ROOT / "images"  # 생성된 이미지 저장 폴더
+SCENARIO_INDEX_FILE = SCENARIOS_DIR / ".scenario_index.db"  # 시나리오 전문 검색 인덱스 (SQLite FTS5)
+SCENARIO_SEARCH_LIMIT = 30  # 검색 결과 최대 개수
 
 # 프리셋 정의
 PRESETS = {
@@ -52,50 +54,110 @@ PRESETS = {
     }
 }
 
+# ============================================================
+# 규칙 테이블 (rules_engine에서 로드 시 컴파일)
+# 구간 조건 형식: {"축": {"gt"|"ge"|"lt"|"le": 값, ...}, ...}  (축: P, A, D, I, T, Dep)
+# 한 규칙 안의 조건은 모두 AND, 규칙 목록은 위에서부터 먼저 일치한 것이 적용됨
+# RULES_FILE(env_config/rules.json)이 있으면 같은 키로 덮어쓸 수 있음
+# ============================================================
+RULES_FILE = ENV_CONFIG_DIR / "rules.json"
+
 # 관계 상태 전환 조건 테이블
+# - to: 전환 가능한 다음 상태
+# - condition: 이 상태로 진입하기 위한 수치 조건
+# - llm_reported: LLM 보고(relationship_status_change)로 진입하는 상태
 STATUS_TRANSITIONS = {
     "Stranger": {
         "to": ["Acquaintance"],
-        "condition": {"I": 40}
+        "condition": {}
     },
     "Acquaintance": {
         "to": ["Tempted", "Lover"],
-        "condition": {"I": 60}
+        "condition": {"I": {"ge": 40}}
     },
     "Tempted": {
         "to": ["Lover", "Master", "Slave"],
-        "condition": {"P": 80, "A": 80, "D": 40}
+        "condition": {"P": {"ge": 80}, "A": {"ge": 80}, "D": {"le": 40}}
     },
     "Lover": {
         "to": ["Fiancée", "Partner", "Breakup", "Master", "Slave"],
-        "condition": {"I": 80, "T": 60}
+        "condition": {"I": {"ge": 80}, "T": {"ge": 60}},
+        "llm_reported": True
     },
     "Fiancée": {
         "to": ["Partner", "Divorce"],
-        "condition": {"I": 90, "T": 85}
+        "condition": {"I": {"ge": 90}, "T": {"ge": 85}},
+        "llm_reported": True
     },
     "Partner": {
         "to": ["Divorce", "Master", "Slave"],
-        "condition": {}
+        "condition": {},
+        "llm_reported": True
     },
     "Master": {
         "to": ["Slave", "Breakup"],
-        "condition": {"D": 95, "Dep": 90}
+        "condition": {"D": {"ge": 95}, "Dep": {"ge": 90}},
+        "llm_reported": True
     },
     "Slave": {
         "to": ["Breakup"],
-        "condition": {"D": 5, "Dep": 100}
+        "condition": {"D": {"le": 5}, "Dep": {"ge": 100}},
+        "llm_reported": True
     },
     "Breakup": {
         "to": ["Stranger", "Acquaintance"],
-        "condition": {"I": 30, "T": 30}
+        "condition": {}
     },
     "Divorce": {
         "to": ["Stranger", "Acquaintance"],
-        "condition": {"I": 30, "T": 30}
+        "condition": {}
     }
 }
 
+# Python이 직접 판정하는 자동 상태 전환 (우선순위 순)
+# 이탈(Breakup/Divorce)은 I <= 30 또는 T <= 30 이므로 축별로 규칙을 나눔
+AUTO_STATUS_TRANSITIONS = [
+    {"from": ["Partner", "Fiancée"], "to": "Divorce", "when": {"I": {"le": 30}}},
+    {"from": ["Partner", "Fiancée"], "to": "Divorce", "when": {"T": {"le": 30}}},
+    {"from": ["Lover"], "to": "Breakup", "when": {"I": {"le": 30}}},
+    {"from": ["Lover"], "to": "Breakup", "when": {"T": {"le": 30}}},
+    {"from": ["Acquaintance"], "to": "Tempted", "when": {"P": {"ge": 80}, "A": {"ge": 80}, "D": {"le": 40}}},
+    {"from": ["Stranger"], "to": "Acquaintance", "when": {"I": {"ge": 40}}},
+]
+
+# PAD 조합 Mood 규칙 (우선순위 순, 일치 없으면 MOOD_DEFAULT)
+MOOD_RULES = [
+    {"name": "Exuberant", "when": {"P": {"ge": 70}, "A": {"ge": 60}, "D": {"ge": 50}}},  # P+, A+, D+
+    {"name": "Relaxed", "when": {"P": {"ge": 60}, "A": {"lt": 40}, "D": {"ge": 60}}},    # P+, A-, D+
+    {"name": "Docile", "when": {"P": {"ge": 60}, "A": {"lt": 40}, "D": {"lt": 40}}},     # P+, A-, D-
+    {"name": "Amazed", "when": {"P": {"ge": 60}, "A": {"ge": 60}, "D": {"lt": 50}}},     # P+, A+, D-
+    {"name": "Hostile", "when": {"P": {"lt": 30}, "A": {"ge": 60}, "D": {"ge": 50}}},    # P-, A+, D+
+    {"name": "Anxious", "when": {"P": {"lt": 30}, "A": {"ge": 60}, "D": {"lt": 50}}},    # P-, A+, D-
+    {"name": "Bored", "when": {"P": {"lt": 30}, "A": {"lt": 40}, "D": {"ge": 60}}},      # P-, A-, D+
+    {"name": "Depressed", "when": {"P": {"lt": 30}, "A": {"lt": 40}, "D": {"lt": 40}}},  # P-, A-, D-
+]
+MOOD_DEFAULT = "Neutral"
+
+# Badge 획득 규칙 (우선순위 순, 첫 번째로 일치한 뱃지 획득)
+BADGE_RULES = [
+    # 카테고리 1: 지배와 소유
+    {"name": "The Warden", "when": {"D": {"gt": 80}, "I": {"gt": 70}, "T": {"lt": 30}}},
+    {"name": "Sadistic Ruler", "when": {"P": {"gt": 80}, "D": {"gt": 90}, "I": {"lt": 50}}},
+    {"name": "The Savior", "when": {"I": {"gt": 90}, "D": {"gt": 60}, "Dep": {"lt": 20}}},
+    # 카테고리 2: 의존과 복종
+    {"name": "Broken Doll", "when": {"D": {"le": 5}, "Dep": {"gt": 95}, "A": {"lt": 20}}},
+    {"name": "The Cultist", "when": {"T": {"ge": 100}, "I": {"gt": 80}}},
+    {"name": "Separation Anxiety", "when": {"Dep": {"gt": 90}, "A": {"gt": 80}, "P": {"lt": 30}}},
+    # 카테고리 3: 불안과 애증
+    {"name": "Classic Yandere", "when": {"I": {"gt": 95}, "Dep": {"gt": 95}, "T": {"lt": 20}}},
+    {"name": "The Avenger", "when": {"I": {"gt": 80}, "P": {"lt": 10}, "A": {"gt": 90}}},
+    {"name": "Ambivalence", "when": {"T": {"ge": 45, "le": 55}, "I": {"ge": 45, "le": 55}, "A": {"gt": 80}}},
+    # 카테고리 4: 왜곡된 특수 상태
+    {"name": "Stockholm", "when": {"P": {"lt": 30}, "I": {"gt": 80}, "D": {"lt": 10}}},
+    {"name": "Void", "when": {"P": {"ge": 45, "le": 55}, "A": {"lt": 5}, "D": {"ge": 45, "le": 55}, "I": {"lt": 5}, "T": {"lt": 5}}},
+    {"name": "Euphoric Ruin", "when": {"P": {"gt": 95}, "A": {"gt": 95}}},
+]
+
 # 가챠 시스템 설정
 GACHA_TIERS = {
     "jackpot": {"prob": 0.01, "multiplier": 5.0},  # 1.0%
@@ -104,6 +166,38 @@ GACHA_TIERS = {
     "normal": {"prob": 0.8, "multiplier": 1.0}     # 80.0%
 }
 
+# 밸런스 시뮬레이터 설정 (balance_simulator.py)
+# delta_profiles: 축별 proposed_delta 분포 (정규분포 평균/표준편차, 정수 반올림 후 -10~10 제한)
+BALANCE_SIM_CONFIG = {
+    "sessions": 100000,
+    "turns": 100,
+    "chunk_size": 200000,          # 한 번에 메모리에 올릴 세션 수
+    "llm_report_prob": 0.5,        # 조건 충족 시 LLM이 관계 전환을 보고할 확률
+    "trauma_on_breakup": True,     # Breakup/Divorce 진입 시 apply_trauma_on_breakup 적용
+    "initial_stats": {"P": 50.0, "A": 40.0, "D": 40.0, "I": 20.0, "T": 50.0, "Dep": 0.0},
+    "delta_profiles": {
+        "neutral": {
+            "mean": {"P": 0.0, "A": 0.0, "D": 0.0, "I": 0.0, "T": 0.0, "Dep": 0.0},
+            "std": {"P": 4.0, "A": 4.0, "D": 3.0, "I": 3.0, "T": 3.0, "Dep": 2.0}
+        },
+        "affectionate": {
+            "mean": {"P": 1.5, "A": 0.5, "D": 0.0, "I": 2.0, "T": 1.5, "Dep": 0.5},
+            "std": {"P": 3.0, "A": 3.0, "D": 2.0, "I": 2.5, "T": 2.5, "Dep": 1.5}
+        },
+        "hostile": {
+            "mean": {"P": -2.0, "A": 1.5, "D": 0.5, "I": -1.5, "T": -2.0, "Dep": 0.0},
+            "std": {"P": 3.0, "A": 3.0, "D": 3.0, "I": 2.5, "T": 2.5, "Dep": 1.5}
+        },
+        "obsessive": {
+            "mean": {"P": -0.5, "A": 1.0, "D": -1.0, "I": 1.5, "T": -0.5, "Dep": 2.0},
+            "std": {"P": 4.0, "A": 3.0, "D": 2.5, "I": 2.5, "T": 3.0, "Dep": 2.0}
+        }
+    }
+}
+
+# 세션 RNG 시드 (가챠/이미지 시드). None이면 세션마다 무작위 시드를 생성해 시나리오에 기록
+RNG_SEED = None
+
 # 이미지 생성 트리거 설정
 IMAGE_GENERATION_TRIGGERS = {
     "force_refresh_turns": 5,  # N턴마다 강제 갱신
@@ -111,6 +205,51 @@ IMAGE_GENERATION_TRIGGERS = {
     "status_transitions": ["Lover", "Partner", "Master", "Slave"]
 }
 
+# 이미지 필요성 판단 (트리거가 걸려도 새 visual_prompt/감정이 마지막 이미지와 거의 같으면 생략)
+# - 태그 Jaccard 유사도 >= skip_threshold 이고 감정이 같으면 생략 (이전 이미지 유지)
+# - 유사도 >= downgrade_threshold 이면 이전 이미지에서 img2img로 가볍게 생성 (감정만 바뀐 경우 포함)
+#   IMAGE_CONTINUITY_CONFIG가 켜져 있고 장면 키(배경/외모/의상)와 max_chain 조건을 통과할 때만, 아니면 그대로 생성
+# - 배경이 바뀌면 항상 생성
+# - budget_max_images: 최근 budget_window_turns턴 동안 생성할 수 있는 최대 이미지 수 (0이면 제한 없음, 배경 변경은 예외)
+IMAGE_GATE_CONFIG = {
+    "enabled": True,
+    "skip_threshold": 0.8,
+    "downgrade_threshold": 0.5,
+    "budget_window_turns": 10,
+    "budget_max_images": 0,
+}
+
+# 이미지 스케줄러 (모든 세션이 GPU를 나눠 씀)
+# - 세션별 가중 공정 큐 + 우선순위 (첫 이미지 0 > 관계 전환/재시도 1 > 일반 트리거 2 > 고품질 교체 3 > 주기적 갱신/배경 플레이트 4)
+# - max_concurrent: 동시에 ComfyUI로 보낼 작업 수 (ComfyUI 서버 풀 크기에 맞춰 조정)
+# - images_per_minute: 전체 분당 이미지 상한 (0이면 제한 없음)
+# - latency_slo: 예상 대기 시간(초)이 이 값을 넘으면 우선순위가 droppable_priority 이상인 작업은 거절
+# - initial_job_seconds: 작업 1개 소요 시간 초기 추정값 (이후 실측 EWMA로 갱신)
+IMAGE_SCHEDULER_CONFIG = {
+    "enabled": True,
+    "max_concurrent": 1,
+    "images_per_minute": 0,
+    "latency_slo": 60.0,
+    "droppable_priority": 4,
+    "initial_job_seconds": 15.0,
+}
+
+# 이미지 파일 저장 (이미지 저장/순간 저장 버튼, 리사이즈와 인코딩은 백그라운드 워커에서 처리)
+# - format: "png" / "webp" (무손실) / "jpeg" / "avif" (pillow-avif-plugin 필요, 없으면 webp)
+# - quality: jpeg/avif 품질
+# - use_processes: 프로세스 풀에서 인코딩 (False면 스레드 풀)
+# - max_pending: 대기 중인 저장 작업 최대 수 (가득 차면 submit_timeout초까지 기다린 뒤 실패)
+# - wait_timeout: 저장 버튼이 파일이 실제로 써질 때까지 기다리는 최대 시간 (초)
+IMAGE_SAVE_CONFIG = {
+    "format": "webp",
+    "quality": 95,
+    "workers": 2,
+    "use_processes": True,
+    "max_pending": 4,
+    "submit_timeout": 10.0,
+    "wait_timeout": 30.0,
+}
+
 # LLM Provider 설정
 LLM_PROVIDER = "ollama"  # "ollama" 또는 "openrouter"
 
@@ -131,6 +270,85 @@ LLM_CONFIG = {
     "frequency_penalty": 0.5     # 이미 사용된 단어의 재사용을 억제 (0.0 ~ 2.0)
 }
 
+# LLM 모델 역할 (dialogue: 플레이어 응답, 나머지는 보조 작업용 소형 모델)
+# - provider가 비어 있으면 dialogue와 같은 provider 사용
+# - 해당 provider의 모델이 비어 있거나 호출이 실패하면 dialogue 모델로 대체
+LLM_ROLES = ("dialogue", "summarizer", "repair")
+LLM_ROLE_DEFAULTS = {
+    "summarizer": {
+        "provider": "",
+        "ollama_model": "qwen2.5:3b",
+        "openrouter_model": "",
+        "temperature": 0.3,
+        "top_p": 0.9,
+        "max_tokens": 600,
+    },
+    "repair": {
+        "provider": "",
+        "ollama_model": "qwen2.5:3b",
+        "openrouter_model": "",
+        "temperature": 0.0,
+        "top_p": 1.0,
+        "max_tokens": 1600,
+    },
+}
+
+# Chat 프롬프트 모드 설정 (settings.json의 llm_settings.prompt_mode가 우선)
+# - chat: 불변 system 메시지 + 과거 턴 메시지 + 마지막에 변하는 상태 블록 (서버 프롬프트 캐시 재사용)
+# - generate: 기존 단일 프롬프트 (/api/generate)
+# 기본값은 generate, chat은 settings.json에서 prompt_mode를 "chat"으로 지정해 사용
+LLM_CHAT_CONFIG = {
+    "prompt_mode": "generate",
+    "keep_alive": "30m",              # Ollama 모델/KV 캐시 유지 시간
+    "history_block": 5,               # 과거 턴을 이 단위로 잘라 메시지 접두부 유지
+    "openrouter_cache_control": True, # OpenRouter system 메시지에 cache_control 표시
+}
+
+# KV 캐시 예열 설정 (플레이어 입력 중 다음 턴 프롬프트 접두부 미리 처리)
+# - providers: 예열할 provider (OpenRouter는 요청마다 과금되므로 기본 제외)
+# - min_interval: 입력 이벤트마다 호출되므로 최소 간격(초)
+PREWARM_CONFIG = {
+    "enabled": True,
+    "providers": ["ollama"],
+    "min_interval": 3.0,
+}
+
+# OpenRouter 클라이언트 측 속도 제한 (모델별, 모든 세션 공유)
+# - tokens_per_minute: 0이면 토큰 제한 없음
+# - turn_deadline: 한 턴의 LLM 호출(대기/재시도 포함)이 넘기지 않을 시간(초)
+RATE_LIMIT_CONFIG = {
+    "requests_per_minute": 60,
+    "free_requests_per_minute": 20,   # ":free" 모델
+    "tokens_per_minute": 0,
+    "model_overrides": {},        # {"모델 이름": {"requests_per_minute": ..., "tokens_per_minute": ...}}
+    "max_retries": 4,
+    "backoff_base": 1.0,
+    "backoff_max": 30.0,
+    "retry_status": [408, 429, 500, 502, 503, 504],
+    "turn_deadline": 180.0,
+}
+
+# 백엔드 상태 모니터 (백그라운드 스레드가 주기적으로 확인, 요청 경로는 캐시만 읽음)
+# - OpenRouter는 /key, /models 메타데이터로 확인 (과금되는 completion 요청 없음)
+# - Ollama는 /api/tags, /api/ps, ComfyUI는 /system_stats, /queue
+HEALTH_MONITOR_CONFIG = {
+    "interval": 10.0,             # 백그라운드 확인 주기 (초)
+    "probe_timeout": 5.0,
+    "stale_after": 30.0,          # Ollama/ComfyUI 상태 유효 시간 (지나면 요청 경로에서 직접 확인)
+    "latency_alpha": 0.3,         # 지연 EWMA 가중치
+    "ui_refresh": 5.0,            # 설정 탭 상태 패널 갱신 주기 (초)
+    "openrouter_ttl": 300.0,      # 키/모델 확인 결과 유효 시간 (모든 세션 공유)
+    "openrouter_models_ttl": 3600.0,
+}
+
+# JSON 파싱 실패 시 복구 단계 설정
+# - 로컬 복구 파서 → llm_repair (repair 역할 모델, JSON 강제 모드) → 재생성 → 기본 응답
+JSON_RECOVERY_CONFIG = {
+    "llm_repair": True,
+    "max_regenerations": 1,
+    "max_repair_input_chars": 6000,
+}
+
 # 에러 로그 디렉터리 (배포 환경에서도 공용으로 사용)
 ERROR_LOG_DIR = PROJECT_ROOT / "error_logs"
 
@@ -142,6 +360,96 @@ COMFYUI_CONFIG = {
     "model_name": "Zeniji_mix_ZiT_v1.safetensors"  # 기본 모델 이름
 }
 
+# 웹소켓으로 최종 이미지 받기 (SaveImage 노드를 SaveImageWebsocket으로 바꿔 실행, /view HTTP 다운로드 생략)
+# 서버의 /object_info 카탈로그에 해당 노드가 없으면 (custom_nodes/websocket_image_save.py 미설치) SaveImage 그대로 사용
+COMFYUI_WS_OUTPUT_CONFIG = {
+    "enabled": True,
+    "node_type": "SaveImageWebsocket",
+}
+
+# ComfyClient 작업 테이블 (prompt_id별 완료/오류/출력 상태)
+# - ttl: 이 시간(초)이 지난 항목은 만료 (이미지 대기 최대 180초보다 길어야 함)
+# - max_size: 최대 항목 수 (다른 클라이언트 작업의 이벤트 등 미등록 항목부터 제거)
+COMFYUI_JOB_TABLE_CONFIG = {
+    "ttl": 600.0,
+    "max_size": 256,
+}
+
+# ComfyUI 서버 풀 (여러 서버에 이미지 작업 분배)
+# - servers: 기본 서버(환경설정 포트) 외 추가 서버 ("host:port" 목록, 환경설정 comfyui_settings.extra_servers와 합쳐짐)
+# - sticky: 같은 체크포인트를 마지막으로 실행한 서버 우선 (부하 차이가 sticky_slack 작업 이하일 때)
+# - max_failover: 서버 장애 시 다른 서버로 재시도할 횟수
+COMFYUI_POOL_CONFIG = {
+    "servers": [],
+    "sticky": True,
+    "sticky_slack": 1,
+    "max_failover": 1,
+}
+
+# ComfyUI /object_info 카탈로그 캐시 (큐에 넣기 전 워크플로우 검증, 설정 탭 자동완성)
+# - ttl: 지나면 기존 값을 쓰면서 백그라운드에서 갱신
+# - min_refresh_interval: 검증 실패 시 캐시가 이보다 오래됐으면 다시 조회 후 재검증 (새로 추가된 모델 대비)
+COMFYUI_OBJECT_INFO_CONFIG = {
+    "enabled": True,
+    "ttl": 600.0,
+    "timeout": 10.0,
+    "min_refresh_interval": 30.0,
+}
+
+# 이미지 결과 캐시 (완성된 워크플로우 해시 → PNG, 고정 시드/재시도/리로드 시 디퓨전 생략)
+IMAGE_CACHE_CONFIG = {
+    "enabled": True,
+    "directory": PROJECT_ROOT / "image_cache",
+    "max_bytes": 512 * 1024 * 1024,
+}
+
+# 이미지 변형 미리 생성 (한 번의 프롬프트에서 latent batch_size로 여러 장 생성)
+# 첫 장만 표시하고 나머지는 세션 버퍼에 보관, "이미지 재생성" 시 버퍼에서 바로 꺼냄 (비면 새 배치 생성)
+IMAGE_VARIANTS_CONFIG = {
+    "enabled": False,
+    "batch_size": 4,
+}
+
+# 생성 중 진행률/저해상도 미리보기 표시 (ComfyUI 웹소켓 progress 이벤트 및 바이너리 미리보기 프레임)
+# 미리보기 이미지는 ComfyUI 서버를 --preview-method auto 등으로 실행해야 전송됨 (진행률은 항상 표시)
+IMAGE_PROGRESS_CONFIG = {
+    "enabled": True,
+    "poll_interval": 0.5,  # UI가 진행 상황을 확인하는 주기 (초)
+}
+
+# img2img 연속 모드 (배경/외모/의상 태그가 이전 이미지와 같으면 이전 이미지를 시작 latent로 사용)
+# - IMAGE_GATE_CONFIG가 켜져 있으면 이미지 판단이 DOWNGRADE(이전 이미지와 비슷함)인 턴에만 사용, RENDER는 항상 txt2img
+# - denoise: 낮을수록 이전 이미지 유지 (표정/포즈 변화 폭 감소), 스텝 수도 denoise 비율만큼 줄어듦
+# - max_chain: 연속 img2img 최대 횟수 (누적 열화 방지, 넘으면 txt2img로 새로 생성)
+# - outfit_keywords: visual_prompt 태그 중 이 단어를 포함하는 태그를 의상으로 보고 비교
+IMAGE_CONTINUITY_CONFIG = {
+    "enabled": False,
+    "denoise": 0.55,
+    "max_chain": 4,
+    "outfit_keywords": [
+        "dress", "shirt", "skirt", "uniform", "jacket", "coat", "hoodie", "sweater", "pants", "jeans", "shorts",
+        "bikini", "swimsuit", "pajamas", "lingerie", "underwear", "kimono", "hanbok", "apron", "naked", "nude", "outfit", "clothes",
+    ],
+}
+
+# 배경 플레이트 (배경별로 인물 없는 배경을 한 번만 렌더링해 이미지 캐시에 저장, 같은 장소의 이후 턴은 플레이트에서 img2img)
+# - 처음 보는 배경은 그 턴은 txt2img로 생성하고 플레이트는 백그라운드에서 렌더링
+# - 연속 모드(IMAGE_CONTINUITY_CONFIG)로 이전 이미지를 쓸 수 있으면 그쪽이 우선
+BACKGROUND_PLATE_CONFIG = {
+    "enabled": False,
+    "denoise": 0.8,        # 인물을 새로 그려야 하므로 연속 모드보다 높게
+    "prompt": "no humans, scenery, {background}, detailed background",
+    "retry_after": 300.0,  # 렌더링 실패한 배경을 다시 시도하기까지 대기 (초)
+}
+
+# 미리보기 후 고품질 교체 (적은 스텝, 업스케일 생략한 미리보기를 먼저 표시하고 같은 시드의 고품질 이미지를 백그라운드에서 생성)
+# 변형 미리 생성(IMAGE_VARIANTS_CONFIG)이 켜져 있으면 사용하지 않음
+IMAGE_PREVIEW_CONFIG = {
+    "enabled": False,
+    "steps": 12,           # 미리보기 첫 KSampler 스텝 수
+    "poll_interval": 1.0,  # UI가 고품질 이미지 완료를 확인하는 주기 (초)
+}
+
 # Trauma 레벨 분류
 TRAUMA_LEVELS = {
     0.0: "Clean Slate",
@@ -3,11 +3,13 @@ Zeniji Emotion Simul - Config Manager
 설정 파일 관리 (캐릭터, 시나리오, 환경설정 등)
 """
 
+import copy
 import json
 import logging
 from typing import Dict, Optional
 import config
 from i18n import get_i18n
+from scenario_index import get_scenario_index
 
 logger = logging.getLogger("ConfigManager")
 
@@ -126,9 +128,15 @@ class ConfigManager:
                 "max_tokens": config.LLM_CONFIG["max_tokens"],
                 "presence_penalty": config.LLM_CONFIG["presence_penalty"],
                 "frequency_penalty": config.LLM_CONFIG["frequency_penalty"],
+                # 프롬프트 모드 ("chat": /api/chat 메시지 구조, "generate": 단일 프롬프트)
+                "prompt_mode": config.LLM_CHAT_CONFIG["prompt_mode"],
+                # 보조 작업(장기 기억 요약, JSON 복구)용 모델 역할
+                "roles": copy.deepcopy(config.LLM_ROLE_DEFAULTS),
             },
             "comfyui_settings": {
                 "server_port": 8000,
+                # 추가 ComfyUI 서버 ("host:port" 목록, 부하가 작은 서버로 작업 분배)
+                "extra_servers": [],
                 # 스타일별 기본 워크플로우 경로 (LoRA 미사용 기준)
                 "workflow_path_qwen": "workflows/comfyui_real.json",
                 "workflow_path_sdxl": "workflows/comfyui_2d.json",
@@ -205,9 +213,15 @@ class ConfigManager:
                 "max_tokens": config.LLM_CONFIG["max_tokens"],
                 "presence_penalty": config.LLM_CONFIG["presence_penalty"],
                 "frequency_penalty": config.LLM_CONFIG["frequency_penalty"],
+                # 프롬프트 모드 ("chat": /api/chat 메시지 구조, "generate": 단일 프롬프트)
+                "prompt_mode": config.LLM_CHAT_CONFIG["prompt_mode"],
+                # 보조 작업(장기 기억 요약, JSON 복구)용 모델 역할
+                "roles": copy.deepcopy(config.LLM_ROLE_DEFAULTS),
             },
             "comfyui_settings": {
                 "server_port": 8000,
+                # 추가 ComfyUI 서버 ("host:port" 목록, 부하가 작은 서버로 작업 분배)
+                "extra_servers": [],
                 # 스타일별 기본 워크플로우 경로 (LoRA 미사용 기준)
                 "workflow_path_qwen": "workflows/comfyui_real.json",
                 "workflow_path_sdxl": "workflows/comfyui_2d.json",
@@ -364,6 +378,9 @@ class ConfigManager:
                 json.dump(scenario_data, f, ensure_ascii=False, indent=2)
             
             logger.info(f"Scenario saved to {file_path}")
+            
+            # 전문 검색 인덱스 증분 갱신 (실패해도 저장 자체는 성공으로 처리)
+            get_scenario_index().index_scenario(file_path.stem, scenario_data)
             return True
         except Exception as e:
             logger.error(f"Failed to save scenario: {e}")
@@ -134,13 +134,15 @@ class GameInitializer:
                 app_instance.brain.state = CharacterState()
                 app_instance.brain.history = DialogueHistory(max_turns=10)
                 app_instance.brain.turns_since_image = 0
+                app_instance.brain.reset_rng(config.RNG_SEED)
+            app_instance.brain.set_prompt_mode(llm_settings.get("prompt_mode"))
             
             # 기타 앱 인스턴스 상태 초기화
             app_instance.current_image = None
             app_instance.current_chart = None
             app_instance.previous_relationship = None
             app_instance.previous_badges = set()
-            app_instance.last_image_generation_info = None
+            app_instance.reset_image_state()
             
             # 초기 설정 정보 전달
             app_instance.brain.set_initial_config(config_data)
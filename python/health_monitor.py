@@ -0,0 +1,282 @@
+"""
+Zeniji Emotion Simul - Health Monitor
+백엔드 상태를 백그라운드 스레드에서 주기적으로 확인하고, 요청 경로는 캐시된 상태 표만 즉시 읽도록 하는 모니터
+- OpenRouter: /key, /models 메타데이터 엔드포인트로 키/모델 확인 (과금되는 completion 요청 없음)
+- Ollama: /api/tags (설치된 모델), /api/ps (메모리에 올라간 모델)
+- ComfyUI: /system_stats (VRAM), /queue (대기열 길이)
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import config
+
+logger = logging.getLogger("HealthMonitor")
+
+OPENROUTER_API_URL = "https://openrouter.ai/api/v1"
+
+
+def _key_fingerprint(api_key: str) -> str:
+    """API 키를 그대로 보관하지 않기 위한 식별자"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _new_status() -> Dict[str, Any]:
+    return {
+        "up": None,               # None: 아직 확인 전
+        "latency": None,          # 마지막 확인 지연 (초)
+        "latency_ewma": None,
+        "queue_depth": None,      # ComfyUI 실행 중 + 대기 중 작업 수
+        "models": None,           # 사용 가능한 모델 목록
+        "loaded_models": None,    # Ollama 메모리에 올라간 모델
+        "error": "",
+        "failures": 0,            # 연속 실패 횟수
+        "checked_at": 0.0,
+        "extra": {},
+    }
+
+
+class HealthMonitor:
+    """백엔드 상태 표 (TTL) + 백그라운드 갱신 스레드 (모든 세션 공유)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.HEALTH_MONITOR_CONFIG
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # target_id -> {"kind", "label", "params", "status"}
+        self._targets: Dict[str, Dict[str, Any]] = {}
+        # OpenRouter 모델 목록은 키와 무관하므로 한 번만 받아서 공유
+        self._openrouter_models: Optional[set] = None
+        self._openrouter_models_at = 0.0
+    
+    # ------------------------------------------------------------------
+    # 대상 등록 / 상태 조회
+    # ------------------------------------------------------------------
+    def _watch(self, target_id: str, kind: str, label: str, params: Dict[str, Any]):
+        """백그라운드 확인 대상 등록 (즉시 반환, 처음 등록이면 바로 한 번 확인)"""
+        with self._lock:
+            if target_id in self._targets:
+                return
+            self._targets[target_id] = {"kind": kind, "label": label, "params": params, "status": _new_status()}
+        self.start()
+        self._wake.set()
+    
+    def watch_openrouter(self, api_key: str, model_name: str):
+        if api_key:
+            self._watch(f"openrouter:{_key_fingerprint(api_key)}:{model_name}", "openrouter", model_name,
+                        {"api_key": api_key, "model_name": model_name})
+    
+    def watch_ollama(self, api_url: str):
+        self._watch(f"ollama:{api_url}", "ollama", api_url, {"api_url": api_url})
+    
+    def watch_comfyui(self, server_address: str):
+        self._watch(f"comfyui:{server_address}", "comfyui", server_address, {"server_address": server_address})
+    
+    def _ttl(self, kind: str) -> float:
+        return self.settings["openrouter_ttl"] if kind == "openrouter" else self.settings["stale_after"]
+    
+    def _cached(self, target_id: str) -> Optional[Dict[str, Any]]:
+        """캐시된 상태 사본 (아직 확인 전이거나 TTL이 지났으면 None, 절대 블로킹하지 않음)"""
+        with self._lock:
+            target = self._targets.get(target_id)
+            if target is None or not target["status"]["checked_at"]:
+                return None
+            if time.time() - target["status"]["checked_at"] > self._ttl(target["kind"]):
+                return None
+            return dict(target["status"])
+    
+    def openrouter_status(self, api_key: str, model_name: str) -> Optional[Dict[str, Any]]:
+        return self._cached(f"openrouter:{_key_fingerprint(api_key)}:{model_name}")
+    
+    def ollama_status(self, api_url: str) -> Optional[Dict[str, Any]]:
+        return self._cached(f"ollama:{api_url}")
+    
+    def comfyui_status(self, server_address: str) -> Optional[Dict[str, Any]]:
+        return self._cached(f"comfyui:{server_address}")
+    
+    def check_now(self, kind: str, **params) -> Dict[str, Any]:
+        """캐시가 비어 있을 때 요청 경로에서 한 번만 직접 확인 (결과는 표에 반영)"""
+        if kind == "ollama":
+            target_id = f"ollama:{params['api_url']}"
+            self.watch_ollama(params["api_url"])
+        elif kind == "comfyui":
+            target_id = f"comfyui:{params['server_address']}"
+            self.watch_comfyui(params["server_address"])
+        else:
+            target_id = f"openrouter:{_key_fingerprint(params['api_key'])}:{params['model_name']}"
+            self.watch_openrouter(params["api_key"], params["model_name"])
+        self._refresh_target(target_id)
+        with self._lock:
+            return dict(self._targets[target_id]["status"])
+    
+    def status_table(self) -> List[Dict[str, Any]]:
+        """UI 표시용 전체 상태 표"""
+        with self._lock:
+            return [
+                {"kind": target["kind"], "label": target["label"], **target["status"]}
+                for target in self._targets.values()
+            ]
+    
+    # ------------------------------------------------------------------
+    # 대상별 확인
+    # ------------------------------------------------------------------
+    def _fetch_openrouter_models(self) -> Optional[set]:
+        """모델 ID 목록 (TTL 캐시)"""
+        now = time.time()
+        if self._openrouter_models is not None and now - self._openrouter_models_at < self.settings["openrouter_models_ttl"]:
+            return self._openrouter_models
+        response = requests.get(f"{OPENROUTER_API_URL}/models", timeout=self.settings["probe_timeout"])
+        if response.status_code != 200:
+            logger.warning(f"OpenRouter /models probe failed: HTTP {response.status_code}")
+            return self._openrouter_models
+        self._openrouter_models = {model.get("id") for model in response.json().get("data", [])}
+        self._openrouter_models_at = now
+        return self._openrouter_models
+    
+    def _probe_openrouter(self, status: Dict[str, Any], api_key: str, model_name: str):
+        """OpenRouter 키/모델 확인 (401이면 키 무효, 모델 목록에 없으면 모델 없음)"""
+        timeout = self.settings["probe_timeout"]
+        response = requests.get(f"{OPENROUTER_API_URL}/key", headers={"Authorization": f"Bearer {api_key}"}, timeout=timeout)
+        status["extra"]["key_valid"] = None
+        if response.status_code == 401:
+            status["extra"]["key_valid"] = False
+            status["error"] = "invalid API key"
+        elif response.status_code != 200:
+            status["error"] = f"HTTP {response.status_code}"
+        else:
+            status["extra"]["key_valid"] = True
+            data = response.json().get("data", {}) or {}
+            status["extra"]["key_info"] = {key: data.get(key) for key in ("label", "limit", "usage", "is_free_tier", "rate_limit")}
+        
+        models = self._fetch_openrouter_models()
+        status["extra"]["model_available"] = None if models is None else model_name in models
+        if status["extra"]["model_available"] is False:
+            status["error"] = status["error"] or f"model '{model_name}' not found"
+        status["models"] = [model_name] if status["extra"]["model_available"] else []
+        status["up"] = bool(status["extra"]["key_valid"]) and status["extra"]["model_available"] is not False
+    
+    def _probe_ollama(self, status: Dict[str, Any], api_url: str):
+        timeout = self.settings["probe_timeout"]
+        response = requests.get(f"{api_url}/api/tags", timeout=timeout)
+        if response.status_code != 200:
+            status["error"] = f"HTTP {response.status_code}"
+            status["up"] = False
+            return
+        status["models"] = [m.get("name") for m in response.json().get("models", [])]
+        try:
+            response = requests.get(f"{api_url}/api/ps", timeout=timeout)
+            if response.status_code == 200:
+                status["loaded_models"] = [m.get("name") for m in response.json().get("models", [])]
+        except requests.exceptions.RequestException:
+            # /api/ps가 없는 구버전 Ollama
+            status["loaded_models"] = None
+        status["up"] = True
+    
+    def _probe_comfyui(self, status: Dict[str, Any], server_address: str):
+        timeout = self.settings["probe_timeout"]
+        response = requests.get(f"http://{server_address}/system_stats", timeout=timeout)
+        if response.status_code != 200:
+            status["error"] = f"HTTP {response.status_code}"
+            status["up"] = False
+            return
+        devices = response.json().get("devices", [])
+        if devices:
+            status["extra"]["vram_free"] = devices[0].get("vram_free")
+            status["extra"]["vram_total"] = devices[0].get("vram_total")
+        response = requests.get(f"http://{server_address}/queue", timeout=timeout)
+        if response.status_code == 200:
+            queue = response.json()
+            status["queue_depth"] = len(queue.get("queue_running", [])) + len(queue.get("queue_pending", []))
+        status["up"] = True
+    
+    def _refresh_target(self, target_id: str):
+        """대상 하나 확인 후 상태 표 갱신 (지연 EWMA, 연속 실패 횟수 포함)"""
+        with self._lock:
+            target = self._targets.get(target_id)
+            if target is None:
+                return
+            kind, label, params = target["kind"], target["label"], dict(target["params"])
+            previous = target["status"]
+        status = _new_status()
+        status["latency_ewma"] = previous["latency_ewma"]
+        start = time.perf_counter()
+        try:
+            if kind == "openrouter":
+                self._probe_openrouter(status, params["api_key"], params["model_name"])
+            elif kind == "ollama":
+                self._probe_ollama(status, params["api_url"])
+            else:
+                self._probe_comfyui(status, params["server_address"])
+            status["latency"] = time.perf_counter() - start
+            alpha = self.settings["latency_alpha"]
+            status["latency_ewma"] = status["latency"] if previous["latency_ewma"] is None else (
+                alpha * status["latency"] + (1 - alpha) * previous["latency_ewma"])
+        except requests.exceptions.RequestException as e:
+            status["up"] = False
+            status["error"] = f"unreachable: {e}"
+        except Exception as e:
+            status["up"] = False
+            status["error"] = str(e)
+            import traceback
+            logger.error(traceback.format_exc())
+        status["failures"] = 0 if status["up"] else previous["failures"] + 1
+        status["checked_at"] = time.time()
+        with self._lock:
+            if target_id in self._targets:
+                self._targets[target_id]["status"] = status
+        
+        # 상태가 바뀔 때만 로그
+        if status["up"] != previous["up"]:
+            if status["up"]:
+                logger.info(f"✅ {kind} up: {label} ({status['latency'] or 0:.2f}s)")
+            else:
+                logger.warning(f"⚠️ {kind} down: {label} - {status['error']}")
+    
+    # ------------------------------------------------------------------
+    # 백그라운드 스레드
+    # ------------------------------------------------------------------
+    def refresh(self, force: bool = False):
+        """갱신 시점이 된 대상 확인 (force면 전부)"""
+        with self._lock:
+            targets = [(target_id, target["kind"], target["status"]["checked_at"]) for target_id, target in self._targets.items()]
+        now = time.time()
+        for target_id, kind, checked_at in targets:
+            # OpenRouter는 TTL이 만료되기 전에 미리 갱신, 로컬 백엔드는 매 주기 갱신
+            refresh_after = self.settings["openrouter_ttl"] * 0.8 if kind == "openrouter" else 0.0
+            if force or not checked_at or now - checked_at >= refresh_after:
+                try:
+                    self._refresh_target(target_id)
+                except Exception as e:
+                    logger.error(f"Health refresh failed for {target_id}: {e}")
+    
+    def _run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.settings["interval"])
+            self._wake.clear()
+    
+    def start(self):
+        """백그라운드 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="HealthMonitor", daemon=True)
+            self._thread.start()
+
+
+# 전역 인스턴스
+_global_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """전역 HealthMonitor 인스턴스 가져오기"""
+    global _global_health_monitor
+    if _global_health_monitor is None:
+        _global_health_monitor = HealthMonitor()
+    return _global_health_monitor
@@ -78,6 +78,10 @@ TRANSLATIONS = {
                 "en": "💾 Save ComfyUI Settings",
                 "kr": "💾 ComfyUI 설정 저장",
             },
+            "btn_refresh_comfyui_catalog": {
+                "en": "🔄 Refresh Model List",
+                "kr": "🔄 모델 목록 새로고침",
+            },
             "btn_save_scenario": {
                 "en": "💾 Save Scenario",
                 "kr": "💾 시나리오 저장",
@@ -86,6 +90,10 @@ TRANSLATIONS = {
                 "en": "💾 Save Settings",
                 "kr": "💾 설정 저장",
             },
+            "btn_search": {
+                "en": "🔍 Search",
+                "kr": "🔍 검색",
+            },
             "btn_send": {
                 "en": "Send",
                 "kr": "전송",
@@ -510,10 +518,34 @@ TRANSLATIONS = {
                 "en": "✅ ComfyUI settings saved, but client reconnection failed: {error}",
                 "kr": "✅ ComfyUI 설정 저장 완료, 하지만 클라이언트 재연결 실패: {error}",
             },
+            "msg_comfyui_unknown_names": {
+                "en": "⚠️ Not found on the ComfyUI server: {names}",
+                "kr": "⚠️ ComfyUI 서버에 없는 이름: {names}",
+            },
+            "msg_comfyui_catalog_loaded": {
+                "en": "✅ Loaded {count} options from {server}",
+                "kr": "✅ {server}에서 선택 항목 {count}개를 불러왔습니다",
+            },
+            "msg_comfyui_catalog_failed": {
+                "en": "❌ Could not load the model list from {server}. Check that ComfyUI is running.",
+                "kr": "❌ {server}에서 모델 목록을 불러올 수 없습니다. ComfyUI가 실행 중인지 확인하세요.",
+            },
             "msg_comfyui_settings_save_failed": {
                 "en": "❌ ComfyUI settings save failed{error}",
                 "kr": "❌ ComfyUI 설정 저장 실패{error}",
             },
+            "backend_status_title": {
+                "en": "Backend Status",
+                "kr": "백엔드 상태",
+            },
+            "backend_status_empty": {
+                "en": "No backends are being monitored yet. Start a game or save settings to begin.",
+                "kr": "아직 확인 중인 백엔드가 없습니다. 게임을 시작하거나 설정을 저장하면 표시됩니다.",
+            },
+            "backend_status_header": {
+                "en": "| Backend | Target | Status | Latency (avg) | Queue | Models |",
+                "kr": "| 백엔드 | 대상 | 상태 | 지연 (평균) | 대기열 | 모델 |",
+            },
             "msg_setup_complete": {
                 "en": "✅ Setup saved and first dialogue generated!",
                 "kr": "✅ 설정 저장 및 첫 대화 생성 완료!",
@@ -646,6 +678,30 @@ TRANSLATIONS = {
                 "en": "e.g., my_scenario",
                 "kr": "예: my_scenario",
             },
+            "scenario_search_label": {
+                "en": "Search conversations",
+                "kr": "대화 검색",
+            },
+            "scenario_search_no_results": {
+                "en": "No matching conversations found.",
+                "kr": "일치하는 대화가 없습니다.",
+            },
+            "scenario_search_placeholder": {
+                "en": "Words or phrases said in a saved scenario",
+                "kr": "저장된 시나리오에서 나온 단어나 문장",
+            },
+            "scenario_search_results": {
+                "en": "**{count}** hits in **{scenarios}** scenarios",
+                "kr": "**{scenarios}**개 시나리오에서 **{count}**건 검색됨",
+            },
+            "scenario_search_select": {
+                "en": "Scenario to open",
+                "kr": "불러올 시나리오",
+            },
+            "scenario_search_title": {
+                "en": "🔍 Conversation Search",
+                "kr": "🔍 대화 검색",
+            },
             "scenario_title": {
                 "en": "Scenario Selection",
                 "kr": "시나리오 선택",
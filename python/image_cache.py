@@ -0,0 +1,129 @@
+"""
+Zeniji Emotion Simul - Image Cache
+완성된 워크플로우(프롬프트, 시드, 모델, 샘플러 설정 포함) 해시를 키로 PNG를 디스크에 저장하는 내용 주소 기반 캐시
+- 같은 요청(재시도, 리로드, 고정 시드)은 디퓨전을 다시 돌리지 않고 바로 반환
+- 전체 용량이 max_bytes를 넘으면 가장 오래 사용하지 않은 파일부터 삭제 (LRU)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import config
+
+logger = logging.getLogger("ImageCache")
+
+
+def workflow_key(workflow: Dict[str, Any]) -> str:
+    """완성된 워크플로우 → 캐시 키 (키 순서와 무관한 정규화 JSON의 SHA-256)"""
+    canonical = json.dumps(workflow, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """디스크 LRU 이미지 캐시 (스레드 안전)"""
+    
+    def __init__(self, directory: Path = None, max_bytes: int = None):
+        settings = config.IMAGE_CACHE_CONFIG
+        self.directory = Path(directory or settings["directory"])
+        self.max_bytes = max_bytes if max_bytes is not None else settings["max_bytes"]
+        self._lock = threading.Lock()
+        # key -> 파일 크기 (순서가 LRU 순서, 마지막이 최근 사용)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.png"
+    
+    def _load_index(self):
+        """기존 캐시 파일을 마지막 접근 시각 순으로 인덱싱"""
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        logger.info(f"Image cache loaded: {len(self._index)} files, {self._total / 1024 / 1024:.1f} MB")
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # 파일 mtime을 LRU 순서로 사용 (재시작 후에도 유지)
+            os.utime(path, None)
+        except OSError:
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+    
+    def put(self, key: str, data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 다른 스레드가 같은 키를 읽는 중에도 깨진 파일이 보이지 않도록 임시 파일 후 교체
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Image cache write failed: {e}")
+            return
+        with self._lock:
+            self._total += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            evicted = []
+            while self._total > self.max_bytes and self._index:
+                old_key, size = self._index.popitem(last=False)
+                self._total -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+        if evicted:
+            logger.debug(f"Image cache evicted {len(evicted)} files")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"files": len(self._index), "bytes": self._total, "hits": self.hits, "misses": self.misses}
+
+
+# 전역 인스턴스
+_global_image_cache: Optional[ImageCache] = None
+
+
+def get_image_cache() -> ImageCache:
+    """전역 ImageCache 인스턴스 가져오기"""
+    global _global_image_cache
+    if _global_image_cache is None:
+        _global_image_cache = ImageCache()
+    return _global_image_cache
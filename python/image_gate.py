@@ -0,0 +1,116 @@
+"""
+Zeniji Emotion Simul - Image Gate
+이미지 생성 트리거(배경 변경, visual_change_detected, 가챠, 관계 전환, 강제 갱신)가 걸린 턴에서
+새 visual_prompt/감정을 마지막으로 렌더링한 이미지와 비교해 실제로 생성할지 판단 (세션별)
+- 태그 집합 Jaccard 유사도가 높고 감정도 같으면 생략, 중간이면 이전 이미지에서 img2img로 가볍게 생성
+  (img2img는 연속 모드가 켜져 있고 장면 키/연속 횟수 조건을 통과할 때만, 아니면 그대로 생성)
+  RENDER는 연속 모드가 켜져 있어도 txt2img로 새로 생성 → downgraded 지표는 실제로 img2img로 생성한 턴 수
+- 최근 N턴 동안 생성할 수 있는 이미지 수 예산
+"""
+
+import logging
+from collections import deque
+from typing import Any, Dict, Optional, Set
+
+import config
+
+logger = logging.getLogger("ImageGate")
+
+RENDER = "render"
+DOWNGRADE = "downgrade"
+SKIP = "skip"
+
+
+def prompt_tags(visual_prompt: str) -> Set[str]:
+    """visual_prompt → 정규화된 태그 집합 (배경 태그는 따로 비교하므로 제외)"""
+    if isinstance(visual_prompt, list):
+        visual_prompt = ", ".join(str(item) for item in visual_prompt)
+    tags = set()
+    for tag in (visual_prompt or "").split(","):
+        tag = " ".join(tag.lower().split())
+        if tag and not tag.startswith("background:"):
+            tags.add(tag)
+    return tags
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ImageGate:
+    """이미지 필요성 판단 + 세션 이미지 예산 + 지표"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.IMAGE_GATE_CONFIG
+        self._last_tags: Optional[Set[str]] = None
+        self._last_emotion: Optional[str] = None
+        self._last_background: Optional[str] = None
+        self._rendered_turns: deque = deque()
+        self.counts = {RENDER: 0, DOWNGRADE: 0, SKIP: 0, "budget_skips": 0}
+    
+    def _budget_left(self, turn: int) -> Optional[int]:
+        max_images = self.settings["budget_max_images"]
+        if not max_images:
+            return None
+        window = self.settings["budget_window_turns"]
+        while self._rendered_turns and self._rendered_turns[0] <= turn - window:
+            self._rendered_turns.popleft()
+        return max_images - len(self._rendered_turns)
+    
+    def decide(self, visual_prompt: str, emotion: str, background: str, turn: int) -> str:
+        """
+        트리거가 걸린 턴에서 생성 여부 결정
+        Returns: RENDER (그대로 생성) / DOWNGRADE (이전 이미지에서 img2img) / SKIP (생략, 이전 이미지 유지)
+        """
+        if not self.settings["enabled"] or self._last_tags is None:
+            decision, reason = RENDER, "첫 이미지"
+        elif " ".join((background or "").lower().split()) != self._last_background:
+            # 배경이 바뀌면 유사도와 무관하게 생성
+            decision, reason = RENDER, "배경 변경"
+        else:
+            similarity = jaccard(prompt_tags(visual_prompt), self._last_tags)
+            same_emotion = (emotion or "").lower() == self._last_emotion
+            reason = f"유사도 {similarity:.2f}, 감정 {'동일' if same_emotion else '변경'}"
+            if similarity >= self.settings["skip_threshold"] and same_emotion:
+                decision = SKIP
+            elif similarity >= self.settings["downgrade_threshold"] and config.IMAGE_CONTINUITY_CONFIG["enabled"]:
+                # 감정만 바뀐 경우 포함: 이전 이미지에서 표정/포즈만 바꿈 (연속 모드 조건은 app에서 다시 확인)
+                decision = DOWNGRADE
+            else:
+                decision = RENDER
+        
+        budget_left = self._budget_left(turn)
+        if decision != SKIP and budget_left is not None and budget_left <= 0 and reason != "배경 변경":
+            decision = SKIP
+            reason += f", 예산 소진 ({self.settings['budget_max_images']}장/{self.settings['budget_window_turns']}턴)"
+            self.counts["budget_skips"] += 1
+        
+        self.counts[decision] += 1
+        logger.info(f"Image gate: {decision} ({reason})")
+        return decision
+    
+    def reclassify(self, old: str, new: str):
+        """판단을 실제로 적용한 결과로 정정 (예: DOWNGRADE였지만 연속 모드 조건 불충족으로 그대로 생성)"""
+        self.counts[old] -= 1
+        self.counts[new] += 1
+    
+    def record(self, visual_prompt: str, emotion: str, background: str, turn: int):
+        """이미지가 실제로 생성됐을 때 비교 기준 갱신"""
+        self._last_tags = prompt_tags(visual_prompt)
+        self._last_emotion = (emotion or "").lower()
+        self._last_background = " ".join((background or "").lower().split())
+        self._rendered_turns.append(turn)
+    
+    def stats(self) -> Dict[str, Any]:
+        """판단 지표 (avoided: 생략된 작업 수, downgraded: img2img로 가볍게 생성한 작업 수)"""
+        total = sum(self.counts[key] for key in (RENDER, DOWNGRADE, SKIP))
+        return {
+            "decisions": total,
+            "rendered": self.counts[RENDER],
+            "downgraded": self.counts[DOWNGRADE],
+            "avoided": self.counts[SKIP],
+            "budget_skips": self.counts["budget_skips"],
+            "avoided_ratio": self.counts[SKIP] / total if total else 0.0,
+        }
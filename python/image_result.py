@@ -0,0 +1,27 @@
+"""
+Zeniji Emotion Simul - Image Result
+ComfyClient.generate_* 호출 1건의 결과 (이미지, 실제 사용한 시드, ComfyUI 소요 시간)
+- 클라이언트 인스턴스 속성(_last_seed 등)으로 돌려주지 않으므로 배경 플레이트/고품질 스레드와 턴 요청이 한 클라이언트를 함께 써도 결과가 섞이지 않음
+"""
+
+from typing import List, Optional
+
+
+class ImageResult:
+    """이미지 생성 결과 (이미지가 없으면 거짓)"""
+    
+    __slots__ = ("images", "seed", "refine_seed", "elapsed")
+    
+    def __init__(self, images: Optional[List[bytes]] = None, seed: Optional[int] = None, refine_seed: Optional[int] = None, elapsed: float = 0.0):
+        self.images: List[bytes] = images or []
+        self.seed = seed                # 첫 KSampler 시드 (재현/카세트용)
+        self.refine_seed = refine_seed  # 두 번째 KSampler 시드 (없으면 None)
+        self.elapsed = elapsed          # ComfyUI 응답 시간 (초, 캐시 적중 포함)
+    
+    @property
+    def image(self) -> Optional[bytes]:
+        """첫 번째 이미지 (없으면 None)"""
+        return self.images[0] if self.images else None
+    
+    def __bool__(self) -> bool:
+        return bool(self.images)
@@ -0,0 +1,208 @@
+"""
+Zeniji Emotion Simul - Image Scheduler
+여러 세션의 이미지 작업을 GPU(ComfyUI)에 공정하게 배분하는 스케줄러 (모든 세션 공유)
+- 세션별 가중 공정 큐 (start-time fair queuing): 한 세션이 작업을 몰아 넣어도 다른 세션 작업이 사이사이 실행됨
+- 우선순위 클래스: 첫 이미지 > 관계 전환/재시도 > 일반 트리거 > 고품질 교체(미리보기 모드) > 주기적 갱신/배경 플레이트
+- 전체 분당 이미지 상한
+- 예상 대기 시간이 지연 SLO를 넘으면 낮은 우선순위 작업은 큐에 넣지 않고 거절
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger("ImageScheduler")
+
+# 우선순위 클래스 (숫자가 작을수록 먼저 실행)
+PRIORITY_FIRST = 0       # 세션의 첫 이미지
+PRIORITY_TRANSITION = 1  # 관계 전환, 사용자 재시도
+PRIORITY_NORMAL = 2      # 배경 변경, LLM 요청, 가챠
+PRIORITY_REFINE = 3      # 미리보기를 이미 보여준 이미지의 고품질 패스
+PRIORITY_REFRESH = 4     # 주기적 강제 갱신, 배경 플레이트
+
+PRIORITY_NAMES = {
+    PRIORITY_FIRST: "first",
+    PRIORITY_TRANSITION: "transition",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_REFINE: "refine",
+    PRIORITY_REFRESH: "refresh",
+}
+
+# brain의 image_generation_triggers → 우선순위 클래스
+TRIGGER_PRIORITIES = {
+    "transition": PRIORITY_TRANSITION,
+    "background": PRIORITY_NORMAL,
+    "llm": PRIORITY_NORMAL,
+    "gacha": PRIORITY_NORMAL,
+    "refresh": PRIORITY_REFRESH,
+}
+
+
+def priority_for_triggers(triggers: List[str]) -> int:
+    """트리거 목록 중 가장 높은 우선순위 (트리거가 없으면 일반)"""
+    priorities = [TRIGGER_PRIORITIES.get(trigger, PRIORITY_NORMAL) for trigger in triggers or []]
+    return min(priorities) if priorities else PRIORITY_NORMAL
+
+
+class _Ticket:
+    """큐에서 대기 중인 작업 하나"""
+    
+    __slots__ = ("session_id", "priority", "start_tag", "seq", "enqueued_at")
+    
+    def __init__(self, session_id: str, priority: int, start_tag: float, seq: int):
+        self.session_id = session_id
+        self.priority = priority
+        self.start_tag = start_tag
+        self.seq = seq
+        self.enqueued_at = time.time()
+    
+    def sort_key(self):
+        return self.priority, self.start_tag, self.seq
+
+
+class ImageScheduler:
+    """세션 간 공정 분배 + 우선순위 + 분당 상한 + 승인 제어"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.IMAGE_SCHEDULER_CONFIG
+        self._cond = threading.Condition()
+        self._queue: List[_Ticket] = []
+        self._running = 0
+        self._seq = itertools.count()
+        # 가상 시간: 마지막으로 실행을 시작한 작업의 start tag
+        self._virtual_time = 0.0
+        # 세션별 마지막 작업의 finish tag
+        self._session_finish: Dict[str, float] = {}
+        # 최근 60초 동안 실행을 시작한 시각 (분당 상한용)
+        self._dispatch_times: deque = deque()
+        # 작업 1개 평균 소요 시간 (EWMA, 예상 대기 시간 계산용)
+        self._avg_job_seconds = float(self.settings["initial_job_seconds"])
+        self.counts = {"completed": 0, "dropped": 0, "rate_limited": 0}
+        self._wait_seconds: deque = deque(maxlen=100)
+    
+    def run(self, session_id: str, priority: int, job: Callable[[], Any], weight: float = 1.0) -> Any:
+        """
+        작업을 큐에 넣고 차례가 오면 호출한 스레드에서 실행 (블로킹)
+        Returns: job()의 반환값, 승인 제어로 거절되면 None
+        """
+        if not self.settings["enabled"]:
+            return job()
+        
+        ticket = self._admit(session_id, priority, weight)
+        if ticket is None:
+            return None
+        self._wait_turn(ticket)
+        
+        start = time.perf_counter()
+        try:
+            return job()
+        finally:
+            self._finish(time.perf_counter() - start)
+    
+    def _admit(self, session_id: str, priority: int, weight: float) -> Optional[_Ticket]:
+        with self._cond:
+            start_tag = max(self._virtual_time, self._session_finish.get(session_id, 0.0))
+            ticket = _Ticket(session_id, priority, start_tag, next(self._seq))
+            
+            # 이 작업보다 먼저 실행될 작업 수로 예상 대기 시간 계산
+            ahead = sum(1 for queued in self._queue if queued.sort_key() < ticket.sort_key())
+            max_concurrent = max(1, self.settings["max_concurrent"])
+            busy = max(0, self._running + ahead - max_concurrent + 1)
+            estimated_wait = busy * self._avg_job_seconds / max_concurrent
+            if priority >= self.settings["droppable_priority"] and estimated_wait > self.settings["latency_slo"]:
+                self.counts["dropped"] += 1
+                logger.warning(
+                    f"⚠️ 이미지 작업 거절 (세션 {session_id}, {PRIORITY_NAMES.get(priority, priority)}): "
+                    f"예상 대기 {estimated_wait:.1f}s > SLO {self.settings['latency_slo']:.1f}s"
+                )
+                return None
+            
+            self._session_finish[session_id] = start_tag + 1.0 / max(weight, 1e-6)
+            self._queue.append(ticket)
+            if ahead or self._running >= max_concurrent:
+                logger.info(f"⏱️ 이미지 작업 대기 (세션 {session_id}, {PRIORITY_NAMES.get(priority, priority)}, 앞선 작업 {ahead + self._running}개, 예상 {estimated_wait:.1f}s)")
+            return ticket
+    
+    def _rate_wait(self) -> float:
+        """분당 상한에 걸리면 다음 실행 가능 시각까지 남은 초, 아니면 0"""
+        limit = self.settings["images_per_minute"]
+        if not limit:
+            return 0.0
+        now = time.time()
+        while self._dispatch_times and self._dispatch_times[0] <= now - 60.0:
+            self._dispatch_times.popleft()
+        if len(self._dispatch_times) < limit:
+            return 0.0
+        return self._dispatch_times[0] + 60.0 - now
+    
+    def _wait_turn(self, ticket: _Ticket):
+        with self._cond:
+            rate_limited = False
+            while True:
+                head = min(self._queue, key=_Ticket.sort_key)
+                if head is ticket and self._running < max(1, self.settings["max_concurrent"]):
+                    rate_wait = self._rate_wait()
+                    if rate_wait <= 0:
+                        break
+                    if not rate_limited:
+                        rate_limited = True
+                        self.counts["rate_limited"] += 1
+                        logger.info(f"⏱️ 분당 이미지 상한 도달 ({self.settings['images_per_minute']}장) - {rate_wait:.1f}s 대기")
+                    self._cond.wait(timeout=rate_wait)
+                else:
+                    self._cond.wait(timeout=1.0)
+            
+            self._queue.remove(ticket)
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._dispatch_times.append(time.time())
+            self._wait_seconds.append(time.time() - ticket.enqueued_at)
+            if not self._queue:
+                # 큐가 비면 이미 지난 세션 기록 정리 (가상 시간보다 이전 finish tag는 더 이상 영향 없음)
+                self._session_finish = {
+                    session_id: finish for session_id, finish in self._session_finish.items()
+                    if finish > self._virtual_time
+                }
+            # 다음 작업이 빈 슬롯을 쓸 수 있도록 깨움
+            self._cond.notify_all()
+    
+    def _finish(self, elapsed: float):
+        with self._cond:
+            self._running -= 1
+            self.counts["completed"] += 1
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = list(self._wait_seconds)
+            return {
+                "queued": len(self._queue),
+                "running": self._running,
+                "completed": self.counts["completed"],
+                "dropped": self.counts["dropped"],
+                "rate_limited": self.counts["rate_limited"],
+                "avg_job_seconds": self._avg_job_seconds,
+                "avg_wait_seconds": sum(waits) / len(waits) if waits else 0.0,
+                "queued_by_session": {
+                    session_id: sum(1 for ticket in self._queue if ticket.session_id == session_id)
+                    for session_id in {ticket.session_id for ticket in self._queue}
+                },
+            }
+
+
+# 전역 인스턴스
+_global_image_scheduler: Optional[ImageScheduler] = None
+
+
+def get_image_scheduler() -> ImageScheduler:
+    """전역 ImageScheduler 인스턴스 가져오기"""
+    global _global_image_scheduler
+    if _global_image_scheduler is None:
+        _global_image_scheduler = ImageScheduler()
+    return _global_image_scheduler
@@ -0,0 +1,211 @@
+"""
+Zeniji Emotion Simul - Image Writer
+생성 이미지/순간 캡처 저장을 요청 스레드 밖에서 처리 (리사이즈 + 인코딩 + 파일 쓰기)
+- 인코딩은 CPU를 많이 쓰므로 프로세스 풀에서 실행 (프로세스를 띄울 수 없으면 스레드 풀)
+- 저장 형식: PNG / WebP(무손실) / JPEG(고품질) / AVIF (pillow-avif-plugin이 없으면 WebP 무손실로 대체)
+- 파일 이름은 이미지 내용 해시 → 같은 이미지를 여러 번 저장해도 파일은 하나
+- 대기 작업 수 제한: 가득 차면 요청 스레드가 잠시 기다림 (backpressure), 그래도 안 비면 저장 실패
+- 저장 버튼처럼 결과를 사용자에게 보여줘야 하면 wait=True로 파일이 실제로 써질 때까지 기다림
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+import config
+
+logger = logging.getLogger("ImageWriter")
+
+# 형식 → (확장자, Pillow 형식 이름)
+FORMATS = {
+    "png": (".png", "PNG"),
+    "webp": (".webp", "WEBP"),
+    "jpeg": (".jpg", "JPEG"),
+    "avif": (".avif", "AVIF"),
+}
+
+
+def _avif_available() -> bool:
+    """AVIF 인코더 사용 가능 여부 (Pillow 10에는 없으므로 pillow-avif-plugin 필요)"""
+    try:
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    return ".avif" in Image.registered_extensions()
+
+
+def _encode_to_file(image: Image.Image, path: str, image_format: str, scale: float, quality: int) -> str:
+    """
+    워커에서 실행: 리사이즈 → 인코딩 → 임시 파일에 쓴 뒤 이름 변경 (저장 중인 파일이 최종 이름으로 보이지 않도록)
+    프로세스 풀에서 pickle로 전달되므로 모듈 최상위 함수
+    """
+    if scale != 1.0:
+        image = image.resize((max(1, int(round(image.width * scale))), max(1, int(round(image.height * scale)))), Image.LANCZOS)
+    
+    if image_format == "webp":
+        options = {"lossless": True, "quality": 100, "method": 4}
+    elif image_format == "jpeg":
+        options = {"quality": quality, "subsampling": 0, "optimize": True}
+    elif image_format == "avif":
+        _avif_available()
+        options = {"quality": quality}
+    else:
+        options = {"compress_level": 6}
+    if image_format in ("jpeg", "avif") and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        image.save(tmp_path, FORMATS[image_format][1], **options)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class ImageWriter:
+    """백그라운드 이미지 저장 (모든 세션 공유)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.IMAGE_SAVE_CONFIG
+        self.image_format = self._resolve_format(self.settings["format"])
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max(1, self.settings["max_pending"]))
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.counts = {"written": 0, "deduplicated": 0, "failed": 0, "rejected": 0}
+    
+    def _resolve_format(self, image_format: str) -> str:
+        image_format = (image_format or "png").lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+        if image_format not in FORMATS:
+            logger.warning(f"⚠️ 알 수 없는 이미지 저장 형식 '{image_format}' - PNG로 저장")
+            return "png"
+        if image_format == "avif" and not _avif_available():
+            logger.warning("⚠️ AVIF 인코더 없음 (pip install pillow-avif-plugin) - WebP 무손실로 저장")
+            return "webp"
+        return image_format
+    
+    def _get_executor(self):
+        """처음 저장할 때 워커 풀 생성 (프로세스 풀을 만들 수 없는 환경이면 스레드 풀)"""
+        if self._executor is None:
+            workers = max(1, self.settings["workers"])
+            if self.settings["use_processes"]:
+                try:
+                    # fork는 gradio/웹소켓/백그라운드 스레드가 잡고 있던 락을 그대로 복사하므로 항상 spawn
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                except (OSError, NotImplementedError, ImportError) as e:
+                    logger.warning(f"⚠️ 프로세스 풀 생성 실패, 스레드 풀로 저장: {e}")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ImageWriter")
+        return self._executor
+    
+    def content_path(self, image: Image.Image, prefix: str, scale: float = 1.0) -> Path:
+        """이미지 픽셀 + 리사이즈 비율 + 형식 해시 → 저장 경로 (예: images/image_turn0005_3fa2c1d09b7e5a41.webp)"""
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}|{image.size}|{scale}|{self.image_format}".encode("utf-8"))
+        digest.update(image.tobytes())
+        return config.IMAGE_DIR / f"{prefix}_{digest.hexdigest()[:16]}{FORMATS[self.image_format][0]}"
+    
+    def save(self, image: Image.Image, prefix: str, scale: float = 1.0, wait: bool = False) -> Optional[str]:
+        """
+        이미지 저장 예약 (대기 작업이 가득 찼을 때만 submit_timeout까지 대기)
+        wait: True면 파일이 실제로 써질 때까지 최대 wait_timeout초 대기 (사용자에게 저장 결과를 보여줄 때)
+        Returns: 저장 경로 (같은 내용이 이미 저장됐거나 저장 중이면 그 경로), 실패 시 None
+                 wait=False면 예약만 된 상태의 경로 (인코딩 실패는 로그로만 확인)
+        """
+        try:
+            config.IMAGE_DIR.mkdir(exist_ok=True)
+            path = self.content_path(image, prefix, scale)
+            key = str(path)
+            
+            with self._lock:
+                pending = self._in_flight.get(key)
+                if pending is None and path.exists():
+                    self.counts["deduplicated"] += 1
+                    logger.info(f"Image already saved: {path}")
+                    return key
+            if pending is not None:
+                with self._lock:
+                    self.counts["deduplicated"] += 1
+                return self._wait(pending, key) if wait else key
+            
+            if not self._slots.acquire(timeout=self.settings["submit_timeout"]):
+                with self._lock:
+                    self.counts["rejected"] += 1
+                logger.error(f"❌ 이미지 저장 대기열이 가득 참 ({self.settings['max_pending']}개) - 저장하지 않음")
+                return None
+            
+            with self._lock:
+                pending = self._in_flight.get(key)
+                if pending is not None:
+                    # 대기하는 동안 같은 이미지가 먼저 예약됨
+                    self._slots.release()
+                    self.counts["deduplicated"] += 1
+                    return self._wait(pending, key) if wait else key
+                try:
+                    future = self._get_executor().submit(_encode_to_file, image.copy(), key, self.image_format, scale, self.settings["quality"])
+                except Exception:
+                    self._slots.release()
+                    raise
+                self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._on_done(key, done))
+            logger.info(f"Image save queued ({self.image_format}): {path}")
+            return self._wait(future, key) if wait else key
+        except Exception as e:
+            logger.error(f"❌ 이미지 저장 예약 실패: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return None
+    
+    def _wait(self, future: Future, key: str) -> Optional[str]:
+        """저장 작업이 끝날 때까지 대기 (성공하면 경로, 실패/시간 초과면 None)"""
+        try:
+            future.result(timeout=self.settings["wait_timeout"])
+            return key
+        except FutureTimeoutError:
+            logger.error(f"❌ 이미지 저장이 {self.settings['wait_timeout']:.0f}초 안에 끝나지 않음: {key}")
+            return None
+        except Exception:
+            # 실패 로그는 _on_done에서 남김
+            return None
+    
+    def _on_done(self, key: str, future: Future):
+        self._slots.release()
+        with self._lock:
+            self._in_flight.pop(key, None)
+            error = future.exception()
+            if error is None:
+                self.counts["written"] += 1
+            else:
+                self.counts["failed"] += 1
+        if error is None:
+            logger.info(f"✅ Image saved to: {key}")
+        else:
+            logger.error(f"❌ 이미지 저장 실패: {key} ({error})")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"format": self.image_format, "pending": len(self._in_flight), **self.counts}
+
+
+# 전역 인스턴스
+_global_image_writer: Optional[ImageWriter] = None
+
+
+def get_image_writer() -> ImageWriter:
+    """전역 ImageWriter 인스턴스 가져오기"""
+    global _global_image_writer
+    if _global_image_writer is None:
+        _global_image_writer = ImageWriter()
+    return _global_image_writer
@@ -0,0 +1,140 @@
+"""
+Zeniji Emotion Simul - Job Table
+ComfyClient의 prompt_id별 작업 상태 (완료 여부, 오류, 출력 이미지 정보, 웹소켓으로 받은 이미지, 진행 상황)
+- 웹소켓 스레드가 쓰고 요청 스레드가 읽으므로 모든 접근은 락으로 보호, 조회는 복사본 반환
+- 오래된 항목은 TTL로 만료, 최대 개수를 넘으면 가장 오래된 항목부터 제거 (장시간 실행해도 메모리 일정)
+- 다른 클라이언트가 넣은 작업이나 등록 전에 도착한 이벤트도 같은 한도 안에서만 보관
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger("JobTable")
+
+
+class JobTable:
+    """prompt_id → 작업 상태 (한 ComfyClient를 여러 요청 스레드가 함께 사용)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.COMFYUI_JOB_TABLE_CONFIG
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+    
+    def _entry(self, prompt_id: str) -> Dict[str, Any]:
+        """항목 가져오기 (없으면 미등록 항목 생성, 락을 잡은 상태에서 호출)"""
+        job = self._jobs.get(prompt_id)
+        if job is None:
+            job = {
+                "created": time.time(),
+                "registered": False,   # 이 클라이언트가 큐에 넣고 결과를 기다리는 작업인지
+                "server": None,
+                "ws_node": None,       # 최종 이미지를 바이너리 프레임으로 보내는 노드 ID
+                "progress": None,      # comfy_client.JobProgress
+                "completed": False,
+                "error": None,
+                "output": None,        # SaveImage 출력 {filename, subfolder, type, images}
+                "ws_images": [],
+            }
+            self._jobs[prompt_id] = job
+            self._prune()
+        return job
+    
+    def _prune(self):
+        """TTL 만료 + 최대 개수 유지 (락을 잡은 상태에서 호출)"""
+        cutoff = time.time() - self.settings["ttl"]
+        for prompt_id in [pid for pid, job in self._jobs.items() if job["created"] < cutoff]:
+            job = self._jobs.pop(prompt_id)
+            self.expired += 1
+            if job["registered"]:
+                logger.warning(f"⚠️ 작업 기록 만료 (TTL {self.settings['ttl']:.0f}s): {prompt_id}")
+        while len(self._jobs) > self.settings["max_size"]:
+            # 결과를 기다리는 작업보다 미등록 항목(다른 클라이언트 작업 등)을 먼저 제거
+            victim = next((pid for pid, job in self._jobs.items() if not job["registered"]), None)
+            if victim is None:
+                victim = next(iter(self._jobs))
+                logger.warning(f"⚠️ 작업 기록 최대 개수({self.settings['max_size']}) 초과로 제거: {victim}")
+            self._jobs.pop(victim)
+            self.evicted += 1
+    
+    def register(self, prompt_id: str, server: str, ws_node: Optional[str] = None, progress=None):
+        """큐에 넣은 작업 등록 (등록 전에 도착한 완료/오류 이벤트는 그대로 유지)"""
+        with self._lock:
+            job = self._entry(prompt_id)
+            job.update({"created": time.time(), "registered": True, "server": server, "ws_node": ws_node, "progress": progress})
+            self._jobs.move_to_end(prompt_id)
+    
+    def mark_completed(self, prompt_id: str):
+        with self._lock:
+            self._entry(prompt_id)["completed"] = True
+    
+    def set_error(self, prompt_id: str, message: str):
+        with self._lock:
+            self._entry(prompt_id)["error"] = message
+    
+    def set_output(self, prompt_id: str, output: Dict[str, Any]):
+        with self._lock:
+            self._entry(prompt_id)["output"] = output
+    
+    def add_ws_image(self, prompt_id: str, node: Optional[str], image_data: bytes) -> bool:
+        """웹소켓 저장 노드 실행 중에 온 프레임이면 최종 이미지로 보관 (등록된 작업만)"""
+        with self._lock:
+            job = self._jobs.get(prompt_id)
+            if job is None or not job["registered"] or node is None or node != job["ws_node"]:
+                return False
+            job["ws_images"].append(image_data)
+            return True
+    
+    def progress(self, prompt_id: Optional[str]):
+        """작업의 진행 상황 스트림 (없으면 None)"""
+        if not prompt_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(prompt_id)
+            return job["progress"] if job is not None else None
+    
+    def get(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """작업 상태 복사본 (없거나 만료됐으면 None)"""
+        with self._lock:
+            job = self._jobs.get(prompt_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot["ws_images"] = list(job["ws_images"])
+            return snapshot
+    
+    def remove(self, prompt_id: str):
+        with self._lock:
+            self._jobs.pop(prompt_id, None)
+    
+    def active(self) -> List[Dict[str, Any]]:
+        """결과를 기다리는 작업 목록 (prompt_id, 서버, 경과 시간, 완료/오류 여부)"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "prompt_id": prompt_id,
+                    "server": job["server"],
+                    "age": now - job["created"],
+                    "completed": job["completed"],
+                    "error": job["error"],
+                }
+                for prompt_id, job in self._jobs.items() if job["registered"]
+            ]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            registered = sum(1 for job in self._jobs.values() if job["registered"])
+            return {
+                "size": len(self._jobs),
+                "active": registered,
+                "unregistered": len(self._jobs) - registered,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
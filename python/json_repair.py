@@ -0,0 +1,178 @@
+"""
+Zeniji Emotion Simul - JSON Repair
+LLM 출력의 깨진 JSON을 로컬에서 복구하는 관대한 파서와 복구 단계별 지표
+- 닫히지 않은 중괄호/대괄호, 끝 쉼표, 따옴표 없는 키, 잘린 문자열, Python 리터럴(True/False/None)
+"""
+
+import json
+import logging
+import re
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger("JsonRepair")
+
+# 복구 단계 (순서대로 시도)
+RECOVERY_TIERS = ("direct", "local_repair", "llm_repair", "regenerated", "fallback")
+
+_CODE_FENCE = re.compile(r'```(?:json)?', re.IGNORECASE)
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?')
+# 따옴표 없는 단어 (한글 등 비ASCII 문자 포함)
+_WORD = re.compile(r'[^\W\d][\w\-]*')
+_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+
+
+def _close_value(out: list):
+    """잘린 위치에서 값이 비어 있으면 정리 (끝 쉼표 제거, 값 없는 키에 null 채우기)"""
+    while out and out[-1] in " \t\r\n":
+        out.pop()
+    if not out:
+        return
+    if out[-1] == ",":
+        out.pop()
+    elif out[-1] == ":":
+        out.append("null")
+
+
+def repair_json(text: str) -> Optional[Dict]:
+    """
+    깨진 JSON 객체를 최대한 복구해서 파싱 (실패 시 None)
+    첫 '{'부터 최상위 객체가 닫힐 때까지 한 번 훑으며 문법 오류를 고친 뒤 json.loads로 검증
+    """
+    if not text:
+        return None
+    text = _CODE_FENCE.sub('', text).lstrip('\ufeff')
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    out = []
+    stack = []
+    in_string = False
+    quote = '"'
+    i = start
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if ch == '\\' and i + 1 < n:
+                out.append(ch + text[i + 1])
+                i += 2
+                continue
+            if ch == quote:
+                in_string = False
+                out.append('"')
+            elif ch == '"':
+                # 작은따옴표 문자열 안의 큰따옴표
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            elif ch in '\r\t':
+                out.append('\\r' if ch == '\r' else '\\t')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+        
+        if ch in '"\'':
+            in_string = True
+            quote = ch
+            out.append('"')
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            # 끝 쉼표 제거 후 닫기 (짝이 안 맞는 닫힘은 스택 기준으로 교정)
+            _close_value(out)
+            if not stack:
+                break
+            out.append(stack.pop())
+            if not stack:
+                break
+        elif ch == '+' and out and out[-1] in ':[, ':
+            # "+5" 같은 양수 부호
+            pass
+        elif ch == '-' or ch.isdigit():
+            match = _NUMBER.match(text, i)
+            if match:
+                out.append(match.group(0))
+                i = match.end()
+                continue
+            out.append(ch)
+        elif ch.isalpha() or ch == '_':
+            match = _WORD.match(text, i)
+            if not match:
+                out.append(ch)
+                i += 1
+                continue
+            word = match.group(0)
+            i = match.end()
+            rest = text[i:].lstrip()
+            if rest.startswith(':'):
+                # 따옴표 없는 키
+                out.append(f'"{word}"')
+            else:
+                out.append(_LITERALS.get(word, json.dumps(word)))
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    
+    # 잘린 출력: 열린 문자열/컨테이너 닫기
+    if in_string:
+        out.append('"')
+    _close_value(out)
+    while stack:
+        out.append(stack.pop())
+    
+    candidate = "".join(out)
+    try:
+        parsed = json.loads(candidate)
+    except json.JSONDecodeError as e:
+        logger.debug(f"Local JSON repair failed: {e}")
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class RecoveryMetrics:
+    """JSON 파싱 실패율 및 복구 단계별 횟수 (스레드 안전)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {tier: 0 for tier in RECOVERY_TIERS}
+    
+    def record(self, tier: str):
+        with self._lock:
+            self.counts[tier] = self.counts.get(tier, 0) + 1
+    
+    def snapshot(self) -> Dict:
+        """누적 지표 (total, 단계별 횟수, 파싱 실패율, 복구율)"""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        failures = total - counts.get("direct", 0)
+        recovered = failures - counts.get("fallback", 0)
+        return {
+            "total": total,
+            "counts": counts,
+            "parse_failure_rate": failures / total if total else 0.0,
+            "recovery_rate": recovered / failures if failures else 1.0,
+        }
+    
+    def summary(self) -> str:
+        data = self.snapshot()
+        tiers = ", ".join(f"{tier}={count}" for tier, count in data["counts"].items())
+        return (f"JSON recovery: {tiers} "
+                f"(failure rate {data['parse_failure_rate']:.1%}, recovered {data['recovery_rate']:.1%})")
+
+
+# 전역 인스턴스
+_global_recovery_metrics: Optional[RecoveryMetrics] = None
+
+
+def get_recovery_metrics() -> RecoveryMetrics:
+    """전역 RecoveryMetrics 인스턴스 가져오기"""
+    global _global_recovery_metrics
+    if _global_recovery_metrics is None:
+        _global_recovery_metrics = RecoveryMetrics()
+    return _global_recovery_metrics
@@ -8,14 +8,16 @@ from typing import Dict, Tuple, Optional
 from state_manager import CharacterState
 import config
 from i18n import get_i18n
+from rules_engine import get_rules
 
 
-def roll_gacha_v3() -> Tuple[str, float]:
+def roll_gacha_v3(rng: Optional[random.Random] = None) -> Tuple[str, float]:
     """
     가챠 V3: 1000분위 주사위로 배율 결정
+    rng: 세션 전용 난수 생성기 (None이면 전역 random 사용)
     Returns: (tier_name, multiplier)
     """
-    roll = random.randint(1, 1000)
+    roll = (rng or random).randint(1, 1000)
     
     cumulative = 0
     for tier_name, tier_data in config.GACHA_TIERS.items():
@@ -27,12 +29,12 @@ def roll_gacha_v3() -> Tuple[str, float]:
     return "normal", 1.0
 
 
-def apply_gacha_to_delta(proposed_delta: Dict[str, float]) -> Tuple[Dict[str, float], str, float]:
+def apply_gacha_to_delta(proposed_delta: Dict[str, float], rng: Optional[random.Random] = None) -> Tuple[Dict[str, float], str, float]:
     """
     proposed_delta에 가챠 배율 적용
     Returns: (final_delta, tier_name, multiplier)
     """
-    tier_name, multiplier = roll_gacha_v3()
+    tier_name, multiplier = roll_gacha_v3(rng)
     
     final_delta = {}
     for key, value in proposed_delta.items():
@@ -41,87 +43,24 @@ def apply_gacha_to_delta(proposed_delta: Dict[str, float]) -> Tuple[Dict[str, fl
     return final_delta, tier_name, multiplier
 
 
+def _state_values(state: CharacterState) -> Tuple[float, float, float, float, float, float]:
+    """규칙 평가용 수치 튜플 (rules_engine.AXES 순서)"""
+    return state.P, state.A, state.D, state.I, state.T, state.Dep
+
+
 def interpret_mood(state: CharacterState) -> str:
     """
-    PAD 조합으로 Mood 해석
+    PAD 조합으로 Mood 해석 (config.MOOD_RULES)
     """
-    P, A, D = state.P, state.A, state.D
-    
-    # Exuberant: P+, A+, D+
-    if P >= 70 and A >= 60 and D >= 50:
-        return "Exuberant"
-    
-    # Relaxed: P+, A-, D+
-    if P >= 60 and A < 40 and D >= 60:
-        return "Relaxed"
-    
-    # Docile: P+, A-, D-
-    if P >= 60 and A < 40 and D < 40:
-        return "Docile"
-    
-    # Amazed: P+, A+, D-
-    if P >= 60 and A >= 60 and D < 50:
-        return "Amazed"
-    
-    # Hostile: P-, A+, D+
-    if P < 30 and A >= 60 and D >= 50:
-        return "Hostile"
-    
-    # Anxious: P-, A+, D-
-    if P < 30 and A >= 60 and D < 50:
-        return "Anxious"
-    
-    # Bored: P-, A-, D+
-    if P < 30 and A < 40 and D >= 60:
-        return "Bored"
-    
-    # Depressed: P-, A-, D-
-    if P < 30 and A < 40 and D < 40:
-        return "Depressed"
-    
-    return "Neutral"
+    return get_rules().moods.first_match(_state_values(state))
 
 
 def check_badge_conditions(state: CharacterState) -> Optional[str]:
     """
-    현재 수치로 획득 가능한 뱃지 검사
+    현재 수치로 획득 가능한 뱃지 검사 (config.BADGE_RULES)
     Returns: 뱃지 이름 또는 None
     """
-    P, A, D, I, T, Dep = state.P, state.A, state.D, state.I, state.T, state.Dep
-    
-    # 카테고리 1: 지배와 소유
-    if D > 80 and I > 70 and T < 30:
-        return "The Warden"
-    if P > 80 and D > 90 and I < 50:
-        return "Sadistic Ruler"
-    if I > 90 and D > 60 and Dep < 20:
-        return "The Savior"
-    
-    # 카테고리 2: 의존과 복종
-    if D <= 5 and Dep > 95 and A < 20:
-        return "Broken Doll"
-    if T >= 100 and I > 80:
-        return "The Cultist"
-    if Dep > 90 and A > 80 and P < 30:
-        return "Separation Anxiety"
-    
-    # 카테고리 3: 불안과 애증
-    if I > 95 and Dep > 95 and T < 20:
-        return "Classic Yandere"
-    if I > 80 and P < 10 and A > 90:
-        return "The Avenger"
-    if 45 <= T <= 55 and 45 <= I <= 55 and A > 80:
-        return "Ambivalence"
-    
-    # 카테고리 4: 왜곡된 특수 상태
-    if P < 30 and I > 80 and D < 10:
-        return "Stockholm"
-    if 45 <= P <= 55 and A < 5 and 45 <= D <= 55 and I < 5 and T < 5:
-        return "Void"
-    if P > 95 and A > 95:
-        return "Euphoric Ruin"
-    
-    return None
+    return get_rules().badges.first_match(_state_values(state))
 
 
 def validate_status_transition_condition(state: CharacterState, current_status: str, target_status: str) -> bool:
@@ -129,67 +68,33 @@ def validate_status_transition_condition(state: CharacterState, current_status:
     상태 전환이 수치 조건을 만족하는지 검증
     Returns: 조건 만족 여부
     """
-    transitions = config.STATUS_TRANSITIONS.get(current_status, {})
+    rules = get_rules()
+    transitions = rules.status_transitions.get(current_status, {})
     possible_next = transitions.get("to", [])
     
     # 전환 가능한 상태 목록에 있는지 확인
     if target_status not in possible_next:
         return False
     
-    # Slave는 특수 처리 (D <= 5, Dep >= 100)
-    if target_status == "Slave":
-        return state.D <= 5 and state.Dep >= 100
-    
-    # Master는 특수 처리 (D >= 95, Dep >= 90)
-    if target_status == "Master":
-        return state.D >= 95 and state.Dep >= 90
-    
-    # 다른 상태들은 목적지 상태로 가기 위한 조건 확인
-    # Lover: I >= 80, T >= 60
-    if target_status == "Lover":
-        return state.I >= 80 and state.T >= 60
-    
-    # Fiancée: I >= 90, T >= 85
-    if target_status == "Fiancée":
-        return state.I >= 90 and state.T >= 85
-    
-    # Partner: 조건 없음 (항상 가능)
-    if target_status == "Partner":
-        return True
+    # LLM 보고 대상 상태만 검증 (나머지는 Python 자동 전환 전용)
+    if target_status not in rules.llm_reported_statuses:
+        return False
     
-    return False
+    # 목적지 상태의 진입 조건 확인 (STATUS_TRANSITIONS[target]["condition"])
+    return rules.status_entry.check(target_status, _state_values(state))
 
 
 def check_status_transition(state: CharacterState) -> Tuple[bool, Optional[str]]:
     """
-    관계 상태 전환 검사 (Python 기반)
+    관계 상태 전환 검사 (Python 기반, config.AUTO_STATUS_TRANSITIONS)
     Returns: (전환 여부, 새 상태명)
     Note: Master/Slave는 LLM 판단으로 이동
     """
-    # 1순위: 이탈 검사 (Breakup/Divorce)
-    # Partner/Fiancée/Lover 상태에서만 breakup 조건 체크
-    if state.relationship_status in ["Partner", "Fiancée", "Lover"]:
-        if state.I <= 30 or state.T <= 30:
-            # Partner/Fiancée는 Divorce, Lover는 Breakup
-            if state.relationship_status in ["Partner", "Fiancée"]:
-                return True, "Divorce"
-            else:  # Lover
-                return True, "Breakup"
-    
-    # 3순위: Tempted 검사
-    if state.relationship_status == "Acquaintance":
-        if state.P >= 80 and state.A >= 80 and state.D <= 40:
-            return True, "Tempted"
-    
-    # 기초 상태 전환
-    if state.relationship_status == "Stranger" and state.I >= 40:
-        return True, "Acquaintance"
-    
-    if state.relationship_status == "Acquaintance" and state.I >= 60:
-        # Tempted는 위에서 이미 검사했으므로 여기서는 그냥 Acquaintance 유지
-        pass
-    
-    return False, None
+    rules = get_rules()
+    idx = rules.auto_transitions.first_index(_state_values(state), state.relationship_status)
+    if idx < 0:
+        return False, None
+    return True, rules.auto_targets[idx]
 
 
 def apply_trauma_on_breakup(state: CharacterState):
@@ -3,12 +3,15 @@ Zeniji Emotion Simul - Memory Manager
 Ollama API 및 OpenRouter API를 통한 LLM 호출 관리
 """
 
+import json
 import logging
 import time
 import requests
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import config
+from health_monitor import get_health_monitor
+from rate_limiter import get_rate_limiter, parse_retry_after
 
 logger = logging.getLogger("MemoryManager")
 
@@ -16,7 +19,7 @@ logger = logging.getLogger("MemoryManager")
 class MemoryManager:
     """Ollama API 및 OpenRouter API를 통한 LLM 관리"""
     
-    def __init__(self, dev_mode: bool = False, provider: str = None, model_name: str = None, api_key: str = None):
+    def __init__(self, dev_mode: bool = False, provider: str = None, model_name: str = None, api_key: str = None, roles: Optional[Dict[str, Dict]] = None):
         self.provider = provider or config.LLM_PROVIDER
         self.dev_mode = dev_mode
         
@@ -30,6 +33,13 @@ class MemoryManager:
             self.api_key = None
         
         self.is_loaded = False
+        # 모델 역할별 설정 (None이면 첫 보조 호출 시 settings.json에서 로드)
+        self.roles: Optional[Dict[str, Dict]] = roles
+        self._disabled_roles: set = set()
+        # 카세트 녹화기 (replay.CassetteRecorder, 녹화 중일 때만 설정)
+        self.recorder = None
+        # 현재 턴의 마감 시각 (time.monotonic 기준, Brain이 턴 시작 시 설정하고 턴이 끝나면 None)
+        self.turn_deadline: Optional[float] = None
     
     def load_model(self, force_reload: bool = False) -> Optional[Tuple[str, str]]:
         """
@@ -52,29 +62,18 @@ class MemoryManager:
                 if not self.api_key:
                     raise ValueError("OpenRouter API 키가 설정되지 않았습니다.")
                 
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # 간단한 테스트 요청으로 연결 확인
-                test_payload = {
-                    "model": self.model_name,
-                    "messages": [{"role": "user", "content": "test"}],
-                    "max_tokens": 1
-                }
-                
-                response = requests.post(
-                    f"{self.api_url}/chat/completions",
-                    json=test_payload,
-                    headers=headers,
-                    timeout=10
-                )
-                
-                if response.status_code == 401:
+                # 과금되는 테스트 요청 대신 헬스 모니터의 캐시된 키/모델 확인 결과 사용 (블로킹 없음)
+                monitor = get_health_monitor()
+                monitor.watch_openrouter(self.api_key, self.model_name)
+                status = monitor.openrouter_status(self.api_key, self.model_name)
+                if status is None:
+                    logger.info("⏱️ OpenRouter 확인 결과가 아직 없습니다. 백그라운드에서 확인합니다.")
+                elif status["extra"].get("key_valid") is False:
                     raise ValueError("OpenRouter API 키가 유효하지 않습니다.")
-                elif response.status_code != 200:
-                    raise RuntimeError(f"OpenRouter API 연결 실패: HTTP {response.status_code}")
+                elif status["extra"].get("model_available") is False:
+                    logger.warning(f"⚠️ OpenRouter 모델 목록에 '{self.model_name}'이 없습니다. 호출 시 오류가 발생할 수 있습니다.")
+                elif not status["up"]:
+                    logger.warning(f"⚠️ 최근 OpenRouter 확인 실패: {status['error']}")
                 
                 logger.info(f"✅ OpenRouter API 연결 확인 완료")
                 self.is_loaded = True
@@ -83,14 +82,16 @@ class MemoryManager:
                 return self.model_name, self.api_url
                 
             else:  # ollama
-                # Ollama API 연결 확인
-                response = requests.get(f"{self.api_url}/api/tags", timeout=5)
-                if response.status_code != 200:
-                    raise RuntimeError(f"Ollama API 연결 실패: HTTP {response.status_code}")
+                # Ollama API 연결 확인 (헬스 모니터 캐시, 비어 있을 때만 직접 확인)
+                monitor = get_health_monitor()
+                status = monitor.ollama_status(self.api_url) or monitor.check_now("ollama", api_url=self.api_url)
+                if not status["up"]:
+                    if status["error"].startswith("unreachable"):
+                        raise requests.exceptions.ConnectionError(status["error"])
+                    raise RuntimeError(f"Ollama API 연결 실패: {status['error']}")
                 
                 # 모델 존재 확인 (정확한 일치 사용)
-                models = response.json().get("models", [])
-                available_names = [m.get("name") for m in models]
+                available_names = status["models"] or []
                 
                 # 정확한 일치 확인 (태그 포함한 전체 이름 비교)
                 model_exists = self.model_name in available_names
@@ -111,6 +112,9 @@ class MemoryManager:
                 else:
                     logger.info(f"✅ 모델 '{self.model_name}' 확인됨")
                 
+                # 보조 역할 모델이 설치되어 있지 않으면 dialogue 모델로 대체
+                self._check_role_models(available_names)
+                
                 self.is_loaded = True
                 duration = time.time() - start
                 logger.info(f"[VRAM MANAGER] Ollama API 연결 확인 완료. ({duration:.2f} s)")
@@ -139,6 +143,21 @@ class MemoryManager:
             logger.error(traceback.format_exc())
             return None
     
+    def _check_role_models(self, available_names: list):
+        """Ollama에 없는 보조 역할 모델 비활성화 (호출 시 404 왕복 방지)"""
+        if self.roles is None:
+            self.roles = self._load_role_settings()
+        for role, settings in self.roles.items():
+            provider = settings.get("provider") or self.provider
+            model_name = settings.get("ollama_model") or ""
+            if provider != "ollama" or not model_name or model_name == self.model_name:
+                continue
+            if model_name in available_names:
+                logger.info(f"✅ Role '{role}' model '{model_name}' 확인됨")
+            else:
+                self._disabled_roles.add(role)
+                logger.warning(f"⚠️ Role '{role}' model '{model_name}' is not installed, using dialogue model (ollama pull {model_name})")
+    
     def _log_dev_info(self, duration: float, available_models: Optional[list] = None):
         """Dev Mode: 상세 로드 정보 출력"""
         logger.info("[DEV] Provider: %s", self.provider.upper())
@@ -152,46 +171,157 @@ class MemoryManager:
         elif self.provider == "openrouter":
             logger.info("[DEV] Note: OpenRouter는 클라우드 기반 API입니다.")
     
-    def generate(self, prompt: str, **kwargs) -> Optional[str]:
+    def generate(self, prompt: str, role: str = "dialogue", **kwargs) -> Optional[str]:
         """
         LLM API를 통한 텍스트 생성 (Ollama 또는 OpenRouter)
         Args:
             prompt: 입력 프롬프트
-            **kwargs: 추가 파라미터 (temperature, top_p, max_tokens 등)
+            role: 모델 역할 ("dialogue", "summarizer", "repair") - 보조 역할은 별도 소형 모델 사용
+            **kwargs: 추가 파라미터 (temperature, top_p, max_tokens 등, 역할 기본값보다 우선)
         Returns:
             생성된 텍스트
         """
+        return self._request(prompt, None, role, kwargs)
+    
+    def chat(self, messages: List[Dict[str, Any]], role: str = "dialogue", **kwargs) -> Optional[str]:
+        """
+        chat 형식 텍스트 생성 (Ollama /api/chat, OpenRouter messages)
+        system → 과거 턴 → 현재 상태 순서의 메시지를 그대로 보내 서버가 변하지 않은 접두부를 재사용하도록 함
+        Args:
+            messages: [{"role": "system"|"user"|"assistant", "content": str}, ...]
+        """
+        return self._request(None, messages, role, kwargs)
+    
+    def _request(self, prompt: Optional[str], messages: Optional[List[Dict[str, Any]]], role: str, kwargs: Dict) -> Optional[str]:
+        """generate/chat 공통 처리 (역할 라우팅, 보조 모델 실패 시 대체, 카세트 녹화)"""
         if not self.is_loaded:
             logger.warning("Model not loaded. Attempting to load...")
             if self.load_model() is None:
                 return None
         
+        def call(route):
+            if messages is not None:
+                return self._chat(messages, route, **kwargs)
+            return self._generate(prompt, route, **kwargs)
+        
+        start = time.perf_counter()
+        route = self._resolve_route(role)
+        generated_text = call(route)
+        if generated_text is None and route["model_name"] != self.model_name:
+            # 보조 모델 실패 (미설치 등) → 이후 호출은 dialogue 모델로 처리
+            logger.warning(f"⚠️ Role '{role}' model '{route['model_name']}' failed, falling back to dialogue model")
+            self._disabled_roles.add(role)
+            route = self._resolve_route(role)
+            generated_text = call(route)
+        
+        if self.recorder is not None:
+            record_prompt = prompt if messages is None else json.dumps(messages, ensure_ascii=False)
+            self.recorder.record_llm(record_prompt, dict(kwargs, role=role), generated_text, time.perf_counter() - start)
+        return generated_text
+    
+    def prefill(self, prompt: Optional[str] = None, messages: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        프롬프트 접두부만 처리하는 예열 요청 (토큰 1개만 생성하고 결과는 버림)
+        서버가 처리한 접두부를 KV 캐시에 남겨 두어, 실제 요청 시 플레이어 입력 부분만 새로 계산됨
+        """
+        if not self.is_loaded:
+            return False
+        route = self._resolve_route("dialogue")
+        start = time.perf_counter()
+        if messages is not None:
+            self._chat(messages, route, max_tokens=1, temperature=0.0)
+        else:
+            self._generate(prompt, route, max_tokens=1, temperature=0.0)
+        logger.info(f"🔥 Prompt prefix prewarmed ({route['model_name']}) in {time.perf_counter() - start:.2f}s")
+        return True
+    
+    def _load_role_settings(self) -> Dict[str, Dict]:
+        """settings.json의 llm_settings.roles 로드 (없는 항목은 config 기본값)"""
+        roles = {role: dict(values) for role, values in config.LLM_ROLE_DEFAULTS.items()}
+        try:
+            from config_manager import ConfigManager
+            env_roles = ConfigManager().load_env_config().get("llm_settings", {}).get("roles", {}) or {}
+            for role, values in env_roles.items():
+                if isinstance(values, dict):
+                    roles.setdefault(role, {}).update(values)
+        except Exception as e:
+            logger.warning(f"Failed to load LLM role settings, using defaults: {e}")
+        return roles
+    
+    def _resolve_route(self, role: str) -> Dict[str, Any]:
+        """역할 → 호출 대상 (provider, model_name, api_url, api_key, params)"""
+        params = {key: config.LLM_CONFIG[key] for key in ("temperature", "top_p", "max_tokens")}
+        dialogue_route = {
+            "provider": self.provider,
+            "model_name": self.model_name,
+            "api_url": self.api_url,
+            "api_key": self.api_key,
+            "params": params,
+        }
+        if role == "dialogue":
+            return dialogue_route
+        
+        if self.roles is None:
+            self.roles = self._load_role_settings()
+        settings = self.roles.get(role) or {}
+        for key in params:
+            if settings.get(key) is not None:
+                params[key] = settings[key]
+        if role in self._disabled_roles:
+            return dialogue_route
+        
+        provider = settings.get("provider") or self.provider
+        model_name = settings.get(f"{provider}_model") or ""
+        if not model_name:
+            return dialogue_route
+        if provider == self.provider:
+            api_url, api_key = self.api_url, self.api_key
+        elif provider == "openrouter":
+            from encryption import EncryptionManager
+            api_url, api_key = "https://openrouter.ai/api/v1", EncryptionManager().load_openrouter_api_key()
+            if not api_key:
+                logger.warning(f"Role '{role}' uses OpenRouter but no API key is saved, using dialogue model")
+                self._disabled_roles.add(role)
+                return dialogue_route
+        else:
+            api_url, api_key = config.OLLAMA_API_URL, None
+        return {"provider": provider, "model_name": model_name, "api_url": api_url, "api_key": api_key, "params": params}
+    
+    def _generate(self, prompt: str, route: Dict[str, Any], **kwargs) -> Optional[str]:
+        """provider별 API 호출 (generate 본체, route: _resolve_route 결과)"""
+        provider = route["provider"]
+        model_name = route["model_name"]
+        api_url = route["api_url"]
+        params = dict(route["params"])
+        params.update(kwargs)
+        # JSON 형식 강제 (Ollama format=json, OpenRouter response_format)
+        json_mode = params.pop("json_mode", False)
+        
         try:
-            if self.provider == "openrouter":
+            if provider == "openrouter":
                 # OpenRouter API 호출
                 headers = {
-                    "Authorization": f"Bearer {self.api_key}",
+                    "Authorization": f"Bearer {route['api_key']}",
                     "Content-Type": "application/json",
                     "HTTP-Referer": "https://github.com/zeniji/emotion-simul",
                     "X-Title": "Zeniji Emotion Simul"
                 }
                 
                 payload = {
-                    "model": self.model_name,
+                    "model": model_name,
                     "messages": [
                         {"role": "user", "content": prompt}
                     ],
-                    "temperature": kwargs.get("temperature", config.LLM_CONFIG["temperature"]),
-                    "top_p": kwargs.get("top_p", config.LLM_CONFIG["top_p"]),
-                    "max_tokens": kwargs.get("max_tokens", config.LLM_CONFIG["max_tokens"]),
+                    "temperature": params["temperature"],
+                    "top_p": params["top_p"],
+                    "max_tokens": params["max_tokens"],
                 }
+                if json_mode:
+                    payload["response_format"] = {"type": "json_object"}
                 
-                response = requests.post(
-                    f"{self.api_url}/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=300  # 5분 타임아웃
-                )
+                response = self._post_openrouter(f"{api_url}/chat/completions", payload, headers, len(prompt))
+                if response is None:
+                    return None
                 
                 if response.status_code != 200:
                     logger.error(f"❌ OpenRouter API 호출 실패: HTTP {response.status_code}")
@@ -210,18 +340,20 @@ class MemoryManager:
             else:  # ollama
                 # Ollama API 호출
                 payload = {
-                    "model": self.model_name,
+                    "model": model_name,
                     "prompt": prompt,
                     "stream": False,
                     "options": {
-                        "temperature": kwargs.get("temperature", config.LLM_CONFIG["temperature"]),
-                        "top_p": kwargs.get("top_p", config.LLM_CONFIG["top_p"]),
-                        "num_predict": kwargs.get("max_tokens", config.LLM_CONFIG["max_tokens"]),
+                        "temperature": params["temperature"],
+                        "top_p": params["top_p"],
+                        "num_predict": params["max_tokens"],
                     }
                 }
+                if json_mode:
+                    payload["format"] = "json"
                 
                 response = requests.post(
-                    f"{self.api_url}/api/generate",
+                    f"{api_url}/api/generate",
                     json=payload,
                     timeout=300  # 5분 타임아웃
                 )
@@ -234,7 +366,7 @@ class MemoryManager:
                     if response.status_code == 404:
                         logger.error("")
                         logger.error("🔍 모델을 찾을 수 없습니다. 가능한 원인:")
-                        logger.error(f"   1. 모델 이름 불일치: '{self.model_name}'이 Ollama에 없습니다.")
+                        logger.error(f"   1. 모델 이름 불일치: '{model_name}'이 Ollama에 없습니다.")
                         logger.error("   2. 'ollama list' 명령으로 정확한 모델 이름을 확인하세요.")
                         logger.error(f"   3. config.py의 OLLAMA_MODEL_NAME을 수정하세요.")
                         logger.error("")
@@ -251,7 +383,155 @@ class MemoryManager:
                 return generated_text
                 
         except Exception as e:
-            logger.error(f"{self.provider.upper()} generation failed: {e}")
+            logger.error(f"{provider.upper()} generation failed ({model_name}): {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return None
+    
+    def _post_openrouter(self, url: str, payload: Dict[str, Any], headers: Dict[str, str], prompt_chars: int) -> Optional[requests.Response]:
+        """
+        속도 제한기를 거친 OpenRouter 요청 (429/5xx는 Retry-After 또는 지터 백오프로 재시도)
+        턴 마감 시각(turn_deadline)을 넘기게 되면 마지막 응답(또는 None)을 반환
+        """
+        settings = config.RATE_LIMIT_CONFIG
+        limiter = get_rate_limiter()
+        model = payload["model"]
+        now = time.monotonic()
+        if self.turn_deadline is not None:
+            # 턴 안의 호출(복구/재생성/요약 포함)은 모두 같은 마감 시각을 공유, 이미 지났으면 요청하지 않음
+            if self.turn_deadline <= now:
+                logger.error(f"⏱️ Turn deadline already passed, skipping OpenRouter request ({model})")
+                return None
+            deadline = self.turn_deadline
+        else:
+            # 턴 밖의 호출만 자체 마감 시각 사용
+            deadline = now + settings["turn_deadline"]
+        # 토큰 추정: 프롬프트 약 4자당 1토큰 + 최대 생성 토큰 (응답 후 실제 사용량으로 보정)
+        # 재시도해도 논리적 요청은 하나이므로 토큰은 첫 시도에서만 차감 (재시도는 요청 수만 차감)
+        charged = prompt_chars / 4 + payload.get("max_tokens", 0)
+        response = None
+        
+        for attempt in range(settings["max_retries"] + 1):
+            if not limiter.acquire(model, charged if attempt == 0 else 0, id(self), deadline):
+                logger.error(f"⏱️ OpenRouter rate limit wait would exceed the turn deadline ({model})")
+                return response
+            retry_after = None
+            try:
+                response = requests.post(url, json=payload, headers=headers, timeout=max(1.0, min(300.0, deadline - time.monotonic())))
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                logger.warning(f"OpenRouter request failed (attempt {attempt + 1}): {e}")
+                response = None
+            else:
+                if response.status_code == 200:
+                    try:
+                        usage = response.json().get("usage") or {}
+                        if usage.get("total_tokens"):
+                            limiter.reconcile(model, charged, usage["total_tokens"])
+                    except ValueError:
+                        pass
+                    return response
+                if response.status_code not in settings["retry_status"]:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    limiter.penalize(model, retry_after if retry_after is not None else limiter.backoff_delay(attempt))
+            
+            delay = retry_after if retry_after is not None else limiter.backoff_delay(attempt)
+            if attempt >= settings["max_retries"] or time.monotonic() + delay > deadline:
+                break
+            status = response.status_code if response is not None else "error"
+            logger.warning(f"⏱️ OpenRouter {status}, retrying in {delay:.1f}s (attempt {attempt + 1}/{settings['max_retries']})")
+            time.sleep(delay)
+        return response
+    
+    def _chat(self, messages: List[Dict[str, Any]], route: Dict[str, Any], **kwargs) -> Optional[str]:
+        """chat API 호출 (_chat 본체, 응답의 프롬프트 캐시 적중량을 로그로 남김)"""
+        provider = route["provider"]
+        model_name = route["model_name"]
+        api_url = route["api_url"]
+        params = dict(route["params"])
+        params.update(kwargs)
+        json_mode = params.pop("json_mode", False)
+        chat_config = config.LLM_CHAT_CONFIG
+        
+        try:
+            if provider == "openrouter":
+                headers = {
+                    "Authorization": f"Bearer {route['api_key']}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://github.com/zeniji/emotion-simul",
+                    "X-Title": "Zeniji Emotion Simul"
+                }
+                payload_messages = list(messages)
+                if chat_config["openrouter_cache_control"] and payload_messages and payload_messages[0]["role"] == "system":
+                    # 불변 system 메시지에 캐시 지점 표시 (명시적 캐시가 필요한 provider용, 나머지는 무시)
+                    payload_messages[0] = {
+                        "role": "system",
+                        "content": [{"type": "text", "text": payload_messages[0]["content"], "cache_control": {"type": "ephemeral"}}]
+                    }
+                payload = {
+                    "model": model_name,
+                    "messages": payload_messages,
+                    "temperature": params["temperature"],
+                    "top_p": params["top_p"],
+                    "max_tokens": params["max_tokens"],
+                    "usage": {"include": True},
+                }
+                if json_mode:
+                    payload["response_format"] = {"type": "json_object"}
+                
+                prompt_chars = sum(len(message["content"]) if isinstance(message["content"], str) else 0 for message in messages)
+                response = self._post_openrouter(f"{api_url}/chat/completions", payload, headers, prompt_chars)
+                if response is None:
+                    return None
+                if response.status_code != 200:
+                    logger.error(f"❌ OpenRouter API 호출 실패: HTTP {response.status_code}")
+                    logger.error(f"Response: {response.text}")
+                    return None
+                
+                result = response.json()
+                usage = result.get("usage") or {}
+                cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+                logger.info(f"⏱️ OpenRouter prompt tokens: {usage.get('prompt_tokens', '?')} (cached: {cached})")
+                generated_text = (result.get("choices", [{}])[0].get("message", {}).get("content") or "").strip()
+                
+            else:  # ollama
+                payload = {
+                    "model": model_name,
+                    "messages": messages,
+                    "stream": False,
+                    # 모델과 KV 캐시를 메모리에 유지해 다음 턴에서 같은 접두부 재계산을 건너뜀
+                    "keep_alive": chat_config["keep_alive"],
+                    "options": {
+                        "temperature": params["temperature"],
+                        "top_p": params["top_p"],
+                        "num_predict": params["max_tokens"],
+                    }
+                }
+                if json_mode:
+                    payload["format"] = "json"
+                
+                response = requests.post(f"{api_url}/api/chat", json=payload, timeout=300)
+                if response.status_code != 200:
+                    logger.error(f"❌ Ollama API 호출 실패: HTTP {response.status_code}")
+                    logger.error(f"Response: {response.text}")
+                    if response.status_code == 404:
+                        logger.error(f"🔍 모델 '{model_name}'을 찾을 수 없거나 Ollama가 /api/chat을 지원하지 않습니다. (prompt_mode를 generate로 바꿔보세요)")
+                    return None
+                
+                result = response.json()
+                # prompt_eval_count: 이번에 새로 계산한 프롬프트 토큰 수 (캐시 적중 시 작아짐)
+                eval_ms = result.get("prompt_eval_duration", 0) / 1e6
+                logger.info(f"⏱️ Ollama prompt eval: {result.get('prompt_eval_count', '?')} tokens in {eval_ms:.0f} ms")
+                generated_text = (result.get("message", {}).get("content") or "").strip()
+            
+            if not generated_text:
+                logger.warning(f"{provider.upper()} returned empty chat response")
+                return None
+            return generated_text
+        
+        except Exception as e:
+            logger.error(f"{provider.upper()} chat failed ({model_name}): {e}")
             import traceback
             logger.error(traceback.format_exc())
             return None
@@ -0,0 +1,177 @@
+"""
+Zeniji Emotion Simul - ComfyUI Object Info Catalog
+ComfyUI /object_info 카탈로그(노드별 입력 허용값) 캐시
+- 큐에 넣기 전에 워크플로우의 모델/VAE/CLIP/LoRA/업스케일/샘플러 이름을 로컬에서 검증
+- 환경설정 탭 자동완성 목록 제공
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger("ObjectInfo")
+
+# 자동완성 항목 -> [(노드 class_type, 입력 이름), ...]
+CHOICE_FIELDS = {
+    "model": [("UNETLoader", "unet_name"), ("CheckpointLoaderSimple", "ckpt_name")],
+    "vae": [("VAELoader", "vae_name")],
+    "clip": [("CLIPLoader", "clip_name")],
+    "lora": [("LoraLoader", "lora_name"), ("LoraLoaderModelOnly", "lora_name")],
+    "upscale": [("UpscaleModelLoader", "model_name")],
+    "sampler": [("KSampler", "sampler_name")],
+    "scheduler": [("KSampler", "scheduler")],
+}
+
+# 큐에 넣기 직전에 업로드하는 입력 (카탈로그의 파일 목록은 항상 이전 상태이므로 검증 제외)
+UPLOAD_FIELDS = {("LoadImage", "image")}
+
+
+def _enum_values(spec: Any) -> Optional[List[str]]:
+    """입력 스펙에서 허용값 목록 추출 (선택형 입력이 아니면 None)
+    구버전: [["a", "b"], {...}] / 신버전: ["COMBO", {"options": ["a", "b"]}]
+    """
+    if not isinstance(spec, (list, tuple)) or not spec:
+        return None
+    if isinstance(spec[0], list):
+        return [str(value) for value in spec[0]]
+    if spec[0] == "COMBO" and len(spec) > 1 and isinstance(spec[1], dict):
+        return [str(value) for value in spec[1].get("options", [])]
+    return None
+
+
+class ObjectInfoCatalog:
+    """서버별 /object_info 캐시 (TTL이 지나면 기존 값을 쓰면서 백그라운드에서 갱신)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.COMFYUI_OBJECT_INFO_CONFIG
+        self._lock = threading.Lock()
+        # server_address -> {"data": {...}, "fetched_at": float}
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._refreshing: set = set()
+    
+    def _fetch(self, server_address: str) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            req = urllib.request.Request(f"http://{server_address}/object_info")
+            response = urllib.request.urlopen(req, timeout=self.settings["timeout"])
+            data = json.loads(response.read())
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ /object_info 조회 실패 ({server_address}): {e}")
+            return None
+        with self._lock:
+            self._cache[server_address] = {"data": data, "fetched_at": time.time()}
+        logger.info(f"✅ /object_info 캐시 갱신: {server_address} ({len(data)} nodes, {time.perf_counter() - start:.2f}s)")
+        return data
+    
+    def _refresh_async(self, server_address: str):
+        with self._lock:
+            if server_address in self._refreshing:
+                return
+            self._refreshing.add(server_address)
+        
+        def run():
+            try:
+                self._fetch(server_address)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(server_address)
+        
+        threading.Thread(target=run, name="ObjectInfoRefresh", daemon=True).start()
+    
+    def get(self, server_address: str, block: bool = True, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        카탈로그 가져오기
+        - 캐시가 없으면 block=True일 때만 직접 조회
+        - TTL이 지났으면 기존 값을 반환하고 백그라운드에서 갱신
+        """
+        if force:
+            return self._fetch(server_address)
+        with self._lock:
+            entry = self._cache.get(server_address)
+        if entry is None:
+            if block:
+                return self._fetch(server_address)
+            self._refresh_async(server_address)
+            return None
+        if time.time() - entry["fetched_at"] > self.settings["ttl"]:
+            self._refresh_async(server_address)
+        return entry["data"]
+    
+    def age(self, server_address: str) -> Optional[float]:
+        with self._lock:
+            entry = self._cache.get(server_address)
+        return time.time() - entry["fetched_at"] if entry else None
+    
+    def choices(self, server_address: str, block: bool = False) -> Dict[str, List[str]]:
+        """자동완성 목록 (CHOICE_FIELDS 항목별, 카탈로그가 없으면 빈 목록)"""
+        data = self.get(server_address, block=block) or {}
+        result = {}
+        for field, sources in CHOICE_FIELDS.items():
+            values = []
+            for class_type, input_name in sources:
+                inputs = data.get(class_type, {}).get("input", {})
+                spec = inputs.get("required", {}).get(input_name) or inputs.get("optional", {}).get(input_name)
+                for value in _enum_values(spec) or []:
+                    if value not in values:
+                        values.append(value)
+            result[field] = values
+        return result
+    
+    def _validate(self, data: Dict[str, Any], workflow: Dict[str, Any]) -> List[str]:
+        errors = []
+        for node_id, node in workflow.items():
+            if not isinstance(node, dict):
+                continue
+            class_type = node.get("class_type")
+            node_info = data.get(class_type)
+            if node_info is None:
+                errors.append(f"Node {node_id}: unknown node type '{class_type}' (custom node not installed?)")
+                continue
+            specs = dict(node_info.get("input", {}).get("optional", {}))
+            specs.update(node_info.get("input", {}).get("required", {}))
+            for input_name, value in node.get("inputs", {}).items():
+                # 다른 노드 출력 연결([node_id, index])은 검증 대상 아님
+                if isinstance(value, list) or (class_type, input_name) in UPLOAD_FIELDS:
+                    continue
+                allowed = _enum_values(specs.get(input_name))
+                if allowed is not None and str(value) not in allowed:
+                    preview = ", ".join(allowed[:5]) + (", ..." if len(allowed) > 5 else "")
+                    errors.append(f"Node {node_id} ({class_type}).{input_name}: '{value}' not available (options: {preview or 'none'})")
+        return errors
+    
+    def validate_workflow(self, server_address: str, workflow: Dict[str, Any]) -> List[str]:
+        """
+        패치된 워크플로우의 선택형 입력 검증
+        Returns: 오류 메시지 목록 (카탈로그를 가져올 수 없으면 검증을 건너뛰고 빈 목록)
+        """
+        if not self.settings["enabled"]:
+            return []
+        data = self.get(server_address, block=True)
+        if data is None:
+            return []
+        errors = self._validate(data, workflow)
+        # 방금 추가된 모델일 수 있으므로 캐시가 오래됐으면 한 번 다시 조회 후 재검증
+        age = self.age(server_address)
+        if errors and age is not None and age > self.settings["min_refresh_interval"]:
+            data = self.get(server_address, force=True)
+            if data is not None:
+                errors = self._validate(data, workflow)
+        return errors
+
+
+# 전역 인스턴스
+_global_object_info_catalog: Optional[ObjectInfoCatalog] = None
+
+
+def get_object_info_catalog() -> ObjectInfoCatalog:
+    """전역 ObjectInfoCatalog 인스턴스 가져오기"""
+    global _global_object_info_catalog
+    if _global_object_info_catalog is None:
+        _global_object_info_catalog = ObjectInfoCatalog()
+    return _global_object_info_catalog
@@ -0,0 +1,199 @@
+"""
+Zeniji Emotion Simul - Rate Limiter
+OpenRouter 호출용 클라이언트 측 속도 제한 (모델별 요청/토큰 버킷, 세션 간 라운드 로빈 대기열)
+- 429 응답의 Retry-After를 모델 단위 차단 시간으로 반영
+- 대기는 호출자가 넘긴 마감 시각(턴 deadline)을 넘기지 않음
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Hashable, Optional
+
+import config
+
+logger = logging.getLogger("RateLimiter")
+
+
+class TokenBucket:
+    """초당 rate만큼 채워지는 용량 capacity의 버킷 (capacity <= 0이면 무제한)"""
+    
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+    
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0 or self.rate <= 0
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def time_until(self, amount: float, now: float) -> float:
+        """amount를 꺼낼 수 있을 때까지 남은 시간 (초)"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+    
+    def refund(self, amount: float):
+        """추정치로 미리 차감한 양 보정 (음수면 추가 차감)"""
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _ModelLimits:
+    """모델 하나의 버킷, 차단 시각, 세션별 대기열"""
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.blocked_until = 0.0
+        # session -> 대기 티켓 (OrderedDict 순서가 라운드 로빈 순서)
+        self.queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self.granted = 0
+        self.throttled = 0
+    
+    def head(self):
+        for session, tickets in self.queues.items():
+            if tickets:
+                return session, tickets[0]
+        return None, None
+
+
+class RateLimiter:
+    """모델별 요청/토큰 속도 제한기 (여러 세션이 공유)"""
+    
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or config.RATE_LIMIT_CONFIG
+        self._cond = threading.Condition()
+        self._models: Dict[str, _ModelLimits] = {}
+    
+    def _limits(self, model: str) -> _ModelLimits:
+        limits = self._models.get(model)
+        if limits is None:
+            override = self.settings.get("model_overrides", {}).get(model, {})
+            # 무료 모델(":free")은 OpenRouter 제한이 더 낮음
+            default_rpm = self.settings["free_requests_per_minute"] if model.endswith(":free") else self.settings["requests_per_minute"]
+            limits = _ModelLimits(
+                override.get("requests_per_minute", default_rpm),
+                override.get("tokens_per_minute", self.settings["tokens_per_minute"]),
+            )
+            self._models[model] = limits
+        return limits
+    
+    def acquire(self, model: str, tokens: float, session: Hashable, deadline: float) -> bool:
+        """
+        요청 1건 + 토큰 tokens개 사용 허가 대기 (세션 간 라운드 로빈)
+        Returns: 허가되면 True, deadline(time.monotonic 기준)까지 허가되지 않으면 False
+        """
+        ticket = object()
+        with self._cond:
+            limits = self._limits(model)
+            limits.queues.setdefault(session, deque()).append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    head_session, head_ticket = limits.head()
+                    wait = None
+                    if head_ticket is ticket:
+                        wait = max(
+                            limits.blocked_until - now,
+                            limits.requests.time_until(1, now),
+                            limits.tokens.time_until(tokens, now),
+                        )
+                        if wait <= 0:
+                            limits.requests.consume(1)
+                            limits.tokens.consume(tokens)
+                            limits.granted += 1
+                            # 허가받은 세션은 대기열 맨 뒤로 (다른 세션에 차례 양보)
+                            limits.queues[session].popleft()
+                            limits.queues.move_to_end(session)
+                            return True
+                    remaining = deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        limits.throttled += 1
+                        return False
+                    self._cond.wait(min(wait, remaining) if wait is not None else remaining)
+            finally:
+                tickets = limits.queues.get(session)
+                if tickets is not None:
+                    if ticket in tickets:
+                        tickets.remove(ticket)
+                    if not tickets:
+                        del limits.queues[session]
+                self._cond.notify_all()
+    
+    def penalize(self, model: str, retry_after: float):
+        """429 응답: 해당 모델 전체를 retry_after초 동안 차단"""
+        with self._cond:
+            limits = self._limits(model)
+            limits.blocked_until = max(limits.blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+        logger.warning(f"⏱️ Rate limited on {model}, pausing {retry_after:.1f}s")
+    
+    def reconcile(self, model: str, charged: float, actual: float):
+        """추정 토큰과 실제 사용량 차이 보정"""
+        with self._cond:
+            self._limits(model).tokens.refund(charged - actual)
+            self._cond.notify_all()
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """지터가 적용된 지수 백오프 (full jitter)"""
+        cap = min(self.settings["backoff_max"], self.settings["backoff_base"] * (2 ** attempt))
+        return random.uniform(0, cap)
+    
+    def stats(self) -> Dict[str, Dict]:
+        """모델별 상태 (허가/제한 횟수, 대기 중인 요청 수, 남은 차단 시간)"""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                model: {
+                    "granted": limits.granted,
+                    "throttled": limits.throttled,
+                    "waiting": sum(len(tickets) for tickets in limits.queues.values()),
+                    "blocked_for": max(0.0, limits.blocked_until - now),
+                }
+                for model, limits in self._models.items()
+            }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더 (초 또는 HTTP 날짜) → 대기 초"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+# 전역 인스턴스
+_global_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """전역 RateLimiter 인스턴스 가져오기"""
+    global _global_rate_limiter
+    if _global_rate_limiter is None:
+        _global_rate_limiter = RateLimiter()
+    return _global_rate_limiter
@@ -0,0 +1,494 @@
+"""
+Zeniji Emotion Simul - Replay
+LLM/ComfyUI 응답을 카세트 파일로 녹화하고, 백엔드 지연 없이 그대로 재생하는 성능 측정 도구
+- 녹화: MemoryManager.generate / ComfyClient.generate_image 요청·응답을 턴 단위로 저장
+  배경 플레이트(ComfyClient.generate_plate)는 턴과 무관하게 백그라운드에서 렌더링되므로 세션별로 배경 이름에 묶어 저장
+- 재생: Brain.generate_response (brain 모드) 또는 GameApp.process_turn (turn 모드)을 카세트로 구동
+
+사용법 (python 폴더에서):
+    python replay.py cassette.json
+    python replay.py cassette.json --mode turn --repeat 5 --profile
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+from background_plates import normalize_background
+from image_result import ImageResult
+
+logger = logging.getLogger("Replay")
+
+CASSETTE_VERSION = 1
+# ComfyClient.generate_image와 같은 시드 범위
+MAX_SEED = 4294967295
+
+
+def prompt_digest(prompt: str) -> str:
+    """프롬프트 비교용 해시 (재생 시 분기 감지)"""
+    return hashlib.sha1((prompt or "").encode("utf-8")).hexdigest()
+
+
+class CassetteRecorder:
+    """게임 세션의 LLM/ComfyUI 호출을 카세트 파일로 녹화"""
+    
+    def __init__(self, path: Path, store_images: bool = True):
+        self.path = Path(path)
+        self.store_images = store_images
+        self.cassette = {"version": CASSETTE_VERSION, "created_at": datetime.now().isoformat(), "sessions": []}
+        self._session: Optional[Dict] = None
+        self._turn: Optional[Dict] = None
+        self._turn_start = 0.0
+        # 플레이어 스레드(저장)와 배경 플레이트 스레드(기록)가 함께 접근
+        self._lock = threading.Lock()
+    
+    def _start_session(self, app_instance):
+        """세션 헤더 기록 (재생 시 Brain 초기 상태 복원용)"""
+        brain = app_instance.brain
+        state = brain.state
+        state_data = state.to_dict()
+        state_data.update({
+            "trauma_level": state.trauma_level,
+            "current_background": state.current_background,
+            "long_memory": state.long_memory,
+        })
+        header = {
+            "recorded_at": datetime.now().isoformat(),
+            "language": brain.language,
+            "provider": brain.memory_manager.provider,
+            "model_name": brain.memory_manager.model_name,
+            "image_mode": config.IMAGE_MODE_ENABLED,
+            "background_plates": config.BACKGROUND_PLATE_CONFIG["enabled"],
+            "initial_config": brain.initial_config,
+            "character_config": app_instance.load_config(),
+            "env_config": app_instance.load_env_config(),
+            "state": state_data,
+            "history": [asdict(turn) for turn in brain.history.turns],
+            "turns_since_image": brain.turns_since_image,
+            "has_current_image": app_instance.current_image is not None,
+            "rng": brain.get_rng_state(),
+        }
+        # API 키 등 비밀 값은 저장하지 않음
+        header["env_config"].get("llm_settings", {}).pop("openrouter_api_key", None)
+        with self._lock:
+            self._session = {"header": header, "turns": [], "plates": {}}
+            self.cassette["sessions"].append(self._session)
+        logger.info(f"🎬 Cassette session #{len(self.cassette['sessions'])} started: {self.path}")
+    
+    def begin_turn(self, app_instance, player_input: str):
+        """process_turn 시작 시 호출 (새 게임이면 세션 시작, 백엔드에 녹화기 연결)"""
+        brain = app_instance.brain
+        if self._turn is not None:
+            logger.warning("Previous cassette turn was not finished, dropping it")
+            self._turn = None
+        if self._session is None or brain.state.total_turns == 0:
+            self._start_session(app_instance)
+        
+        brain.memory_manager.recorder = self
+        if app_instance.comfy_client is not None:
+            app_instance.comfy_client.recorder = self
+        
+        self._turn = {"player_input": player_input, "llm": [], "images": []}
+        self._turn_start = time.perf_counter()
+    
+    def record_llm(self, prompt: str, kwargs: Dict, response: Optional[str], elapsed: float):
+        """MemoryManager.generate 호출 1건 기록"""
+        if self._turn is None:
+            return
+        self._turn["llm"].append({
+            "prompt_sha1": prompt_digest(prompt),
+            "prompt_chars": len(prompt or ""),
+            "kwargs": {key: value for key, value in kwargs.items() if isinstance(value, (str, int, float, bool, type(None)))},
+            "response": response,
+            "elapsed": round(elapsed, 4),
+        })
+    
+    def record_image(self, visual_prompt: str, appearance: Optional[str], seed: Optional[int], refine_seed: Optional[int], image_bytes: Optional[bytes], elapsed: float):
+        """ComfyClient.generate_image 호출 1건 기록"""
+        if self._turn is None:
+            return
+        self._turn["images"].append({
+            "visual_prompt": visual_prompt,
+            "appearance": appearance,
+            "seed": seed,
+            "refine_seed": refine_seed,
+            "image_b64": base64.b64encode(image_bytes).decode("ascii") if image_bytes and self.store_images else None,
+            "ok": image_bytes is not None,
+            "elapsed": round(elapsed, 4),
+        })
+    
+    def record_plate(self, background: str, image_bytes: Optional[bytes], elapsed: float):
+        """ComfyClient.generate_plate 호출 1건 기록 (백그라운드 스레드에서 호출, 실패한 렌더링은 기록하지 않음)"""
+        if not image_bytes:
+            return
+        with self._lock:
+            if self._session is None:
+                return
+            self._session["plates"][normalize_background(background)] = {
+                "image_b64": base64.b64encode(image_bytes).decode("ascii") if self.store_images else None,
+                "elapsed": round(elapsed, 4),
+            }
+    
+    def end_turn(self, brain):
+        """process_turn 종료 시 호출 (결과 상태 기록 후 파일 저장)"""
+        if self._turn is None or self._session is None:
+            return
+        self._turn["elapsed"] = round(time.perf_counter() - self._turn_start, 4)
+        self._turn["result"] = _state_snapshot(brain)
+        self._session["turns"].append(self._turn)
+        self._turn = None
+        self.save()
+    
+    def save(self) -> bool:
+        """카세트 파일 저장 (임시 파일에 쓴 뒤 교체)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with self._lock, open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cassette, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to save cassette {self.path}: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return False
+
+
+def _state_snapshot(brain) -> Dict:
+    """턴 종료 시점 상태 (재생 결과 비교용)"""
+    state = brain.state
+    return {
+        "stats": {axis: round(value, 4) for axis, value in state.get_stats_dict().items()},
+        "relationship_status": state.relationship_status,
+        "badges": list(state.badges),
+        "total_turns": state.total_turns,
+        "trauma_level": round(state.trauma_level, 4),
+    }
+
+
+class ReplayMemoryManager:
+    """카세트에 녹화된 응답을 순서대로 돌려주는 MemoryManager 대체 (네트워크 호출 없음)"""
+    
+    def __init__(self, model_name: str = "replay"):
+        self.provider = "replay"
+        self.model_name = model_name
+        self.api_url = "cassette"
+        self.api_key = None
+        self.dev_mode = False
+        self.is_loaded = True
+        self.recorder = None
+        self._queue: List[Dict] = []
+        self.mismatches = 0
+        self.missing = 0
+    
+    def load_turn(self, llm_calls: List[Dict]):
+        """다음 턴에서 소비할 응답 목록 설정"""
+        self._queue = list(llm_calls)
+    
+    def generate(self, prompt: str, **kwargs) -> Optional[str]:
+        """녹화된 다음 응답 반환 (프롬프트가 다르면 분기로 집계)"""
+        if not self._queue:
+            self.missing += 1
+            logger.warning("⚠️ Cassette has no more LLM responses for this turn")
+            return None
+        entry = self._queue.pop(0)
+        if entry.get("prompt_sha1") != prompt_digest(prompt):
+            self.mismatches += 1
+            logger.debug("Replay prompt differs from recording (state diverged or prompt template changed)")
+        return entry.get("response")
+    
+    def chat(self, messages: List[Dict], **kwargs) -> Optional[str]:
+        """chat 모드 호출 (녹화 시와 같은 방식으로 메시지를 직렬화해 비교)"""
+        return self.generate(json.dumps(messages, ensure_ascii=False), **kwargs)
+    
+    def load_model(self, force_reload: bool = False):
+        return self.model_name, self.api_url
+    
+    def get_model(self):
+        return self.model_name, self.api_url
+    
+    def ensure_loaded(self) -> bool:
+        return True
+    
+    def offload_model(self):
+        pass
+    
+    def reload_model(self):
+        pass
+    
+    def unload_model(self):
+        pass
+
+
+class ReplayComfyClient:
+    """카세트에 녹화된 이미지를 돌려주는 ComfyClient 대체 (세션 RNG 소비량은 실제와 동일)"""
+    
+    def __init__(self, plates: Optional[Dict[str, Dict]] = None):
+        self.recorder = None
+        # 배경 플레이트 캐시 키에 쓰이는 값 (실제 클라이언트의 플레이트와 섞이지 않도록 고정)
+        self.style = "replay"
+        self.model_name = "replay"
+        self.workflow_path = None
+        self.lora_name = None
+        self._plates = plates or {}
+        self._queue: List[Dict] = []
+        self.seed_mismatches = 0
+        self.missing = 0
+    
+    def load_turn(self, images: List[Dict]):
+        """다음 턴에서 소비할 이미지 목록 설정"""
+        self._queue = list(images)
+    
+    def generate_image(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng=None, progress=None, init_image=None, init_denoise=None) -> ImageResult:
+        if not self._queue:
+            self.missing += 1
+            logger.warning("⚠️ Cassette has no more images for this turn")
+            return ImageResult()
+        entry = self._queue.pop(0)
+        
+        # 실제 클라이언트와 같은 순서로 시드를 뽑아야 이후 가챠 결과가 녹화와 일치함
+        if rng is not None:
+            drawn = seed if seed is not None and seed >= 0 else rng.randint(1, MAX_SEED)
+            if entry.get("refine_seed") is not None:
+                rng.randint(1, MAX_SEED)
+            if drawn != entry.get("seed"):
+                self.seed_mismatches += 1
+        
+        image_b64 = entry.get("image_b64")
+        if image_b64:
+            images = [base64.b64decode(image_b64)]
+        elif entry.get("ok"):
+            images = [_placeholder_png()]
+        else:
+            images = []
+        return ImageResult(images, entry.get("seed"), entry.get("refine_seed"))
+    
+    def generate_image_staged(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng=None, on_final=None, progress=None, init_image=None, init_denoise=None, schedule_refine=None) -> ImageResult:
+        # 카세트에는 표시된 이미지만 녹화되므로 고품질 교체는 재생하지 않음
+        return self.generate_image(visual_prompt, appearance, negative_prompt, seed, rng)
+    
+    def generate_plate(self, background: str) -> ImageResult:
+        # 녹화 중 렌더링된 배경만 플레이트가 있음 (없으면 실제와 같이 렌더링 실패로 처리)
+        entry = self._plates.get(normalize_background(background))
+        if entry is None:
+            return ImageResult()
+        image_b64 = entry.get("image_b64")
+        return ImageResult([base64.b64decode(image_b64) if image_b64 else _placeholder_png()])
+    
+    def generate_images(self, visual_prompt: str, appearance: str = None, negative_prompt: str = "", seed: int = -1, rng=None, batch_size: int = 1, progress=None, init_image=None, init_denoise=None) -> ImageResult:
+        # 카세트에는 배치의 첫 장만 녹화됨
+        return self.generate_image(visual_prompt, appearance, negative_prompt, seed, rng)
+
+
+_PLACEHOLDER_PNG: Optional[bytes] = None
+
+
+def _placeholder_png() -> bytes:
+    """이미지 바이트 없이 녹화된 카세트용 1x1 PNG"""
+    global _PLACEHOLDER_PNG
+    if _PLACEHOLDER_PNG is None:
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (1, 1)).save(buffer, format="PNG")
+        _PLACEHOLDER_PNG = buffer.getvalue()
+    return _PLACEHOLDER_PNG
+
+
+def load_cassette(path: Path) -> Dict:
+    """카세트 파일 로드"""
+    with open(path, 'r', encoding='utf-8') as f:
+        cassette = json.load(f)
+    if cassette.get("version") != CASSETTE_VERSION:
+        raise ValueError(f"Unsupported cassette version: {cassette.get('version')}")
+    return cassette
+
+
+def _build_brain(header: Dict):
+    """세션 헤더로부터 재생용 Brain 구성"""
+    from brain import Brain
+    from state_manager import DialogueTurn
+    from i18n import get_i18n
+    
+    language = header.get("language", "en")
+    get_i18n().set_language(language)
+    brain = Brain(provider="ollama", model_name=header.get("model_name"), language=language)
+    brain.memory_manager = ReplayMemoryManager(model_name=header.get("model_name") or "replay")
+    brain.set_prompt_mode((header.get("env_config") or {}).get("llm_settings", {}).get("prompt_mode"))
+    if header.get("initial_config"):
+        brain.set_initial_config(header["initial_config"])
+    brain.state.from_dict(header.get("state", {}))
+    for turn_data in header.get("history", []):
+        brain.history.add(DialogueTurn(**turn_data))
+    brain.turns_since_image = header.get("turns_since_image", 0)
+    brain.set_rng_state(header.get("rng", {}))
+    return brain
+
+
+def _build_app(header: Dict, brain, comfy: ReplayComfyClient):
+    """turn 모드용 GameApp (설정 파일 대신 녹화된 설정 사용, gradio 필요)"""
+    from app import GameApp
+    
+    class ReplayGameApp(GameApp):
+        def load_config(self) -> Dict:
+            return header.get("character_config") or super().load_config()
+        
+        def load_env_config(self) -> Dict:
+            return header.get("env_config") or super().load_env_config()
+    
+    app_instance = ReplayGameApp()
+    app_instance.brain = brain
+    app_instance.model_loaded = True
+    app_instance.comfy_client = comfy
+    app_instance.previous_relationship = brain.state.relationship_status
+    app_instance.previous_badges = set(brain.state.badges)
+    if header.get("has_current_image"):
+        from PIL import Image
+        app_instance.current_image = Image.new("RGB", (1, 1))
+    return app_instance
+
+
+def replay_cassette(path: Path, mode: str = "brain", repeat: int = 1) -> Dict:
+    """
+    카세트 재생 및 턴별 CPU 비용 측정
+    Args:
+        mode: "brain" (Brain.generate_response만) 또는 "turn" (GameApp.process_turn 전체)
+        repeat: 반복 횟수 (측정 안정화)
+    Returns: 측정 결과 딕셔너리
+    """
+    cassette = load_cassette(path)
+    image_mode = config.IMAGE_MODE_ENABLED
+    plates_enabled = config.BACKGROUND_PLATE_CONFIG["enabled"]
+    wall_times: List[float] = []
+    cpu_times: List[float] = []
+    recorded_times: List[float] = []
+    diverged_turns = 0
+    mismatches = missing = seed_mismatches = 0
+    
+    try:
+        for _ in range(repeat):
+            for session in cassette.get("sessions", []):
+                header = session["header"]
+                config.IMAGE_MODE_ENABLED = header.get("image_mode", image_mode)
+                config.BACKGROUND_PLATE_CONFIG["enabled"] = header.get("background_plates", plates_enabled)
+                brain = _build_brain(header)
+                comfy = ReplayComfyClient(session.get("plates"))
+                app_instance = _build_app(header, brain, comfy) if mode == "turn" else None
+                history: list = []
+                
+                for turn in session.get("turns", []):
+                    brain.memory_manager.load_turn(turn.get("llm", []))
+                    comfy.load_turn(turn.get("images", []))
+                    
+                    wall_start = time.perf_counter()
+                    cpu_start = time.process_time()
+                    if app_instance is not None:
+                        result = app_instance.process_turn(turn["player_input"], history)
+                        history = result[0]
+                    else:
+                        brain.generate_response(turn["player_input"])
+                    cpu_times.append(time.process_time() - cpu_start)
+                    wall_times.append(time.perf_counter() - wall_start)
+                    recorded_times.append(turn.get("elapsed", 0.0))
+                    
+                    # brain 모드에서는 이미지 단계가 없으므로 세션 RNG 소비만 맞춰줌
+                    if app_instance is None:
+                        for image in list(comfy._queue):
+                            comfy.generate_image(image.get("visual_prompt", ""), rng=brain.rng)
+                    
+                    if _state_snapshot(brain) != turn.get("result"):
+                        diverged_turns += 1
+                
+                mismatches += brain.memory_manager.mismatches
+                missing += brain.memory_manager.missing + comfy.missing
+                seed_mismatches += comfy.seed_mismatches
+    finally:
+        config.IMAGE_MODE_ENABLED = image_mode
+        config.BACKGROUND_PLATE_CONFIG["enabled"] = plates_enabled
+    
+    def ms(values: List[float], q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    
+    return {
+        "cassette": str(path),
+        "mode": mode,
+        "turns": len(wall_times),
+        "wall_ms": {
+            "total": sum(wall_times) * 1000,
+            "mean": statistics.fmean(wall_times) * 1000 if wall_times else 0.0,
+            "p50": ms(wall_times, 0.5),
+            "p95": ms(wall_times, 0.95),
+            "max": max(wall_times) * 1000 if wall_times else 0.0,
+        },
+        "cpu_ms": {
+            "total": sum(cpu_times) * 1000,
+            "mean": statistics.fmean(cpu_times) * 1000 if cpu_times else 0.0,
+            "p95": ms(cpu_times, 0.95),
+        },
+        "recorded_ms_mean": statistics.fmean(recorded_times) * 1000 if recorded_times else 0.0,
+        "diverged_turns": diverged_turns,
+        "prompt_mismatches": mismatches,
+        "seed_mismatches": seed_mismatches,
+        "missing_responses": missing,
+    }
+
+
+def format_report(result: Dict) -> str:
+    """재생 결과를 사람이 읽기 쉬운 문자열로 변환"""
+    wall = result["wall_ms"]
+    cpu = result["cpu_ms"]
+    lines = [
+        "=" * 60,
+        f"⏱️ Replay: {result['cassette']} (mode={result['mode']}, turns={result['turns']})",
+        "=" * 60,
+        f"  Wall  ms/turn: mean {wall['mean']:.2f}, p50 {wall['p50']:.2f}, p95 {wall['p95']:.2f}, max {wall['max']:.2f}",
+        f"  CPU   ms/turn: mean {cpu['mean']:.2f}, p95 {cpu['p95']:.2f} (total {cpu['total']:.1f})",
+        f"  Recorded (with backend latency) ms/turn: {result['recorded_ms_mean']:.1f}",
+        f"  Diverged turns: {result['diverged_turns']}, prompt mismatches: {result['prompt_mismatches']}, "
+        f"seed mismatches: {result['seed_mismatches']}, missing responses: {result['missing_responses']}",
+    ]
+    if result["diverged_turns"] or result["missing_responses"]:
+        lines.append("  ⚠️ 재생이 녹화와 달라졌습니다 (프롬프트/규칙 변경 여부를 확인하세요)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zeniji Emotion Simul - cassette replay")
+    parser.add_argument("cassette", type=Path, help="녹화된 카세트 파일 (app.py --record-cassette)")
+    parser.add_argument("--mode", choices=["brain", "turn"], default="brain", help="brain: Brain만 / turn: process_turn 전체 (gradio 필요)")
+    parser.add_argument("--repeat", type=int, default=1, help="반복 재생 횟수")
+    parser.add_argument("--profile", action="store_true", help="cProfile 상위 함수 출력")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    parser.add_argument("--log-level", default="WARNING", help="로깅 레벨 설정")
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        result = profiler.runcall(replay_cassette, args.cassette, args.mode, args.repeat)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        result = replay_cassette(args.cassette, args.mode, args.repeat)
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2) if args.json else format_report(result))
+
+
+if __name__ == "__main__":
+    main()
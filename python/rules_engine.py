@@ -0,0 +1,222 @@
+"""
+Zeniji Emotion Simul - Rules Engine
+선언형 규칙 테이블(Badge, Mood, 관계 상태 전환)을 로드 시 컴파일하는 평가기
+- 단일 상태: 규칙 테이블로부터 생성한 파이썬 함수로 평가
+- 배치 모드: numpy 배열 (N, 6)을 한 번에 평가 (시뮬레이션용)
+"""
+
+import json
+import logging
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+
+logger = logging.getLogger("RulesEngine")
+
+# 수치 축 순서 (배치 배열의 열 순서와 동일)
+AXES = ("P", "A", "D", "I", "T", "Dep")
+AXIS_INDEX = {axis: idx for idx, axis in enumerate(AXES)}
+
+# 구간 연산자 → 파이썬 비교 연산자
+OPERATORS = {"gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+
+
+class RuleSet:
+    """
+    순서가 있는 규칙 목록을 컴파일한 평가기 (첫 번째로 일치한 규칙 반환)
+    rules: [{"name": str, "when": {축: {연산자: 값}}, "from": [상태, ...] (선택)}, ...]
+    """
+    
+    def __init__(self, kind: str, rules: List[Dict], default: Optional[str] = None):
+        self.kind = kind
+        self.default = default
+        self.names: List[str] = []
+        self.from_statuses: List[Optional[frozenset]] = []
+        self.conditions: List[List[Tuple[int, str, float]]] = []
+        
+        for idx, rule in enumerate(rules):
+            name = rule.get("name")
+            if not name:
+                raise ValueError(f"{kind} rule #{idx} has no name")
+            when = rule.get("when", {}) or {}
+            checks = []
+            for axis, bounds in when.items():
+                if axis not in AXIS_INDEX:
+                    raise ValueError(f"{kind} rule '{name}': unknown axis '{axis}'")
+                if not isinstance(bounds, dict) or not bounds:
+                    raise ValueError(f"{kind} rule '{name}': axis '{axis}' needs an interval like {{\"ge\": 40}}")
+                for op, value in bounds.items():
+                    if op not in OPERATORS:
+                        raise ValueError(f"{kind} rule '{name}': unknown operator '{op}'")
+                    value = float(value)
+                    if math.isnan(value):
+                        raise ValueError(f"{kind} rule '{name}': NaN threshold on '{axis}'")
+                    checks.append((AXIS_INDEX[axis], op, value))
+            from_list = rule.get("from")
+            self.names.append(name)
+            self.from_statuses.append(frozenset(from_list) if from_list else None)
+            self.conditions.append(checks)
+        
+        self._index = {name: idx for idx, name in enumerate(self.names)}
+        self._first, self._predicates = self._compile()
+    
+    def _compile(self):
+        """규칙 테이블을 파이썬 소스로 변환 후 compile() (if-체인과 동일한 속도)"""
+        namespace = {}
+        lines = []
+        first_body = []
+        for idx, checks in enumerate(self.conditions):
+            terms = [f"{AXES[axis]} {OPERATORS[op]} {value!r}" for axis, op, value in checks]
+            if self.from_statuses[idx] is not None:
+                namespace[f"_from_{idx}"] = self.from_statuses[idx]
+                terms.insert(0, f"status in _from_{idx}")
+            expr = " and ".join(terms) if terms else "True"
+            lines.append(f"def _rule_{idx}(P, A, D, I, T, Dep, status):\n    return {expr}\n")
+            first_body.append(f"    if {expr}:\n        return {idx}\n")
+        
+        source = "".join(lines)
+        source += "def _first(P, A, D, I, T, Dep, status):\n" + "".join(first_body) + "    return -1\n"
+        exec(compile(source, f"<rules:{self.kind}>", "exec"), namespace)
+        predicates = [namespace[f"_rule_{idx}"] for idx in range(len(self.names))]
+        return namespace["_first"], predicates
+    
+    def first_index(self, values: Sequence[float], status: Optional[str] = None) -> int:
+        """처음 일치한 규칙 인덱스 (없으면 -1)"""
+        return self._first(*values, status)
+    
+    def first_match(self, values: Sequence[float], status: Optional[str] = None) -> Optional[str]:
+        """처음 일치한 규칙 이름 (없으면 default)"""
+        idx = self._first(*values, status)
+        return self.names[idx] if idx >= 0 else self.default
+    
+    def check(self, name: str, values: Sequence[float], status: Optional[str] = None) -> bool:
+        """이름으로 지정한 규칙 하나만 평가 (규칙이 없으면 False)"""
+        idx = self._index.get(name)
+        if idx is None:
+            return False
+        return self._predicates[idx](*values, status)
+    
+    def _batch_mask(self, idx: int, stats, status_codes):
+        """배치 모드에서 규칙 하나의 일치 여부 (N,) bool 배열"""
+        import numpy as np
+        
+        compare = {"gt": np.greater, "ge": np.greater_equal, "lt": np.less, "le": np.less_equal}
+        mask = np.ones(stats.shape[0], dtype=bool)
+        for axis, op, value in self.conditions[idx]:
+            mask &= compare[op](stats[:, axis], value)
+        from_set = self.from_statuses[idx]
+        if from_set is not None:
+            if status_codes is None:
+                raise ValueError(f"{self.kind} rule '{self.names[idx]}' needs status_codes for batch evaluation")
+            from_mask = np.zeros(stats.shape[0], dtype=bool)
+            for status in from_set:
+                if status in STATUS_CODES:
+                    from_mask |= status_codes == STATUS_CODES[status]
+            mask &= from_mask
+        return mask
+    
+    def evaluate_batch(self, stats, status_codes=None):
+        """
+        배치 평가 (numpy)
+        Args:
+            stats: (N, 6) 배열, 열 순서는 AXES
+            status_codes: (N,) 정수 배열 (STATUS_CODES 기준), from 조건이 있는 규칙에 필요
+        Returns: (N,) int 배열, 처음 일치한 규칙 인덱스 (없으면 -1)
+        """
+        import numpy as np
+        
+        stats = np.asarray(stats)
+        first = np.full(stats.shape[0], -1, dtype=np.int32)
+        # 뒤에서부터 덮어써서 앞선 규칙이 우선하도록 함
+        for idx in range(len(self.names) - 1, -1, -1):
+            first[self._batch_mask(idx, stats, status_codes)] = idx
+        return first
+    
+    def evaluate_mask(self, name: str, stats, status_codes=None):
+        """배치 모드에서 이름으로 지정한 규칙 하나의 일치 여부 (N,) bool 배열"""
+        import numpy as np
+        
+        stats = np.asarray(stats)
+        idx = self._index.get(name)
+        if idx is None:
+            return np.zeros(stats.shape[0], dtype=bool)
+        return self._batch_mask(idx, stats, status_codes)
+
+
+class RuleBook:
+    """게임 규칙 전체 (Mood, Badge, 자동 상태 전환, 상태 진입 조건)"""
+    
+    def __init__(self, tables: Dict):
+        transitions = tables["status_transitions"]
+        self.status_transitions = transitions
+        self.moods = RuleSet("mood", tables["mood_rules"], default=tables.get("mood_default", "Neutral"))
+        self.badges = RuleSet("badge", tables["badge_rules"])
+        
+        auto_rules = []
+        self.auto_targets: List[str] = []
+        for idx, rule in enumerate(tables["auto_status_transitions"]):
+            target = rule.get("to")
+            if target not in transitions:
+                raise ValueError(f"auto transition target '{target}' is not in STATUS_TRANSITIONS")
+            name = f"#{idx} {'/'.join(rule.get('from') or ['*'])} -> {target}"
+            auto_rules.append({"name": name, "from": rule.get("from"), "when": rule.get("when", {})})
+            self.auto_targets.append(target)
+        self.auto_transitions = RuleSet("auto_transition", auto_rules)
+        
+        self.status_entry = RuleSet(
+            "status_entry",
+            [{"name": name, "when": data.get("condition", {})} for name, data in transitions.items()]
+        )
+        self.llm_reported_statuses = [name for name, data in transitions.items() if data.get("llm_reported")]
+
+
+def _default_tables() -> Dict:
+    """config.py에 정의된 기본 규칙 테이블"""
+    return {
+        "status_transitions": config.STATUS_TRANSITIONS,
+        "auto_status_transitions": config.AUTO_STATUS_TRANSITIONS,
+        "mood_rules": config.MOOD_RULES,
+        "mood_default": config.MOOD_DEFAULT,
+        "badge_rules": config.BADGE_RULES,
+    }
+
+
+def load_rules() -> RuleBook:
+    """기본 규칙 + RULES_FILE 덮어쓰기를 로드해 컴파일 (덮어쓰기가 잘못되면 기본 규칙 사용)"""
+    tables = _default_tables()
+    if config.RULES_FILE.exists():
+        try:
+            with open(config.RULES_FILE, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+            merged = dict(tables)
+            merged.update({key: value for key, value in overrides.items() if key in tables})
+            rule_book = RuleBook(merged)
+            logger.info(f"✅ Rules loaded from {config.RULES_FILE}")
+            return rule_book
+        except Exception as e:
+            logger.error(f"❌ Invalid rules file {config.RULES_FILE}: {e} (기본 규칙 사용)")
+    return RuleBook(tables)
+
+
+# 상태 코드 (배치 모드용, STATUS_TRANSITIONS 순서)
+STATUS_NAMES: Tuple[str, ...] = tuple(config.STATUS_TRANSITIONS.keys())
+STATUS_CODES: Dict[str, int] = {name: idx for idx, name in enumerate(STATUS_NAMES)}
+
+# 전역 인스턴스
+_global_rules: Optional[RuleBook] = None
+
+
+def get_rules() -> RuleBook:
+    """전역 RuleBook 인스턴스 가져오기 (최초 호출 시 컴파일)"""
+    global _global_rules
+    if _global_rules is None:
+        _global_rules = load_rules()
+    return _global_rules
+
+
+def reload_rules() -> RuleBook:
+    """규칙 파일 수정 후 다시 컴파일"""
+    global _global_rules
+    _global_rules = load_rules()
+    return _global_rules
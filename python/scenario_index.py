@@ -0,0 +1,234 @@
+"""
+Zeniji Emotion Simul - Scenario Index
+저장된 시나리오 대화 전문 검색 (SQLite FTS5 인덱스)
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+
+logger = logging.getLogger("ScenarioIndex")
+
+
+class ScenarioIndex:
+    """시나리오 대화 내용(conversation, context.recent_turns)에 대한 FTS5 전문 검색 인덱스"""
+    
+    def __init__(self, db_path: Path = None, scenarios_dir: Path = None):
+        self.db_path = Path(db_path or config.SCENARIO_INDEX_FILE)
+        self.scenarios_dir = Path(scenarios_dir or config.SCENARIOS_DIR)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._synced = False
+    
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """DB 연결 및 스키마 생성 (최초 1회)"""
+        if self._conn is not None:
+            return self._conn
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # 파일별 메타데이터 (증분 동기화용 mtime)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenario_files ("
+                "name TEXT PRIMARY KEY, mtime REAL NOT NULL)"
+            )
+            # 메시지 단위 전문 검색 테이블 (scenario/role/turn은 검색 대상에서 제외)
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS scenario_fts USING fts5("
+                "scenario UNINDEXED, role UNINDEXED, turn UNINDEXED, content, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            conn.commit()
+            self._conn = conn
+            return conn
+        except sqlite3.OperationalError as e:
+            # FTS5가 빠진 SQLite 빌드
+            logger.error(f"❌ 시나리오 검색 인덱스를 만들 수 없습니다 (FTS5 필요): {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to open scenario index: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return None
+    
+    @staticmethod
+    def _extract_messages(scenario_data: dict) -> List[tuple]:
+        """시나리오 데이터에서 (role, turn, content) 목록 추출"""
+        messages = []
+        if isinstance(scenario_data, list):
+            scenario_data = {"conversation": scenario_data}
+        
+        for idx, item in enumerate(scenario_data.get("conversation", []) or []):
+            if not isinstance(item, dict):
+                continue
+            content = item.get("content", "")
+            if isinstance(content, list):
+                content = ''.join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+            if isinstance(content, str) and content.strip():
+                messages.append((item.get("role", ""), idx // 2 + 1, content.strip()))
+        
+        context = scenario_data.get("context") or {}
+        for turn_data in context.get("recent_turns", []) or []:
+            if not isinstance(turn_data, dict):
+                continue
+            turn = turn_data.get("turn_number", 0)
+            for role, key in (("user", "player_input"), ("assistant", "character_speech"), ("thought", "character_thought")):
+                text = turn_data.get(key, "")
+                if isinstance(text, str) and text.strip():
+                    messages.append((role, turn, text.strip()))
+        return messages
+    
+    def _index_locked(self, conn: sqlite3.Connection, scenario_name: str, scenario_data: dict, mtime: float):
+        """단일 시나리오 재색인 (락 보유 상태에서 호출)"""
+        conn.execute("DELETE FROM scenario_fts WHERE scenario = ?", (scenario_name,))
+        conn.executemany(
+            "INSERT INTO scenario_fts (scenario, role, turn, content) VALUES (?, ?, ?, ?)",
+            [(scenario_name, role, turn, content) for role, turn, content in self._extract_messages(scenario_data)]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO scenario_files (name, mtime) VALUES (?, ?)",
+            (scenario_name, mtime)
+        )
+    
+    def index_scenario(self, scenario_name: str, scenario_data: dict) -> bool:
+        """save_scenario 직후 호출되는 증분 색인"""
+        if scenario_name.endswith('.json'):
+            scenario_name = scenario_name[:-5]
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return False
+                file_path = self.scenarios_dir / f"{scenario_name}.json"
+                mtime = file_path.stat().st_mtime if file_path.exists() else time.time()
+                self._index_locked(conn, scenario_name, scenario_data, mtime)
+                conn.commit()
+            logger.info(f"Scenario indexed: {scenario_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index scenario '{scenario_name}': {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return False
+    
+    def sync(self) -> int:
+        """디스크의 시나리오 파일과 인덱스 동기화 (변경/추가/삭제분만 처리). 처리한 파일 수 반환"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return 0
+                indexed = dict(conn.execute("SELECT name, mtime FROM scenario_files").fetchall())
+                on_disk = {}
+                if self.scenarios_dir.exists():
+                    for path in self.scenarios_dir.glob("*.json"):
+                        on_disk[path.stem] = path
+                
+                changed = 0
+                for name, path in on_disk.items():
+                    mtime = path.stat().st_mtime
+                    if indexed.get(name) == mtime:
+                        continue
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            scenario_data = json.load(f)
+                    except Exception as e:
+                        logger.warning(f"Skipping unreadable scenario {path.name}: {e}")
+                        continue
+                    self._index_locked(conn, name, scenario_data, mtime)
+                    changed += 1
+                
+                for name in set(indexed) - set(on_disk):
+                    conn.execute("DELETE FROM scenario_fts WHERE scenario = ?", (name,))
+                    conn.execute("DELETE FROM scenario_files WHERE name = ?", (name,))
+                    changed += 1
+                
+                conn.commit()
+                self._synced = True
+            if changed:
+                logger.info(f"Scenario index synced: {changed} file(s) updated")
+            return changed
+        except Exception as e:
+            logger.error(f"Failed to sync scenario index: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return 0
+    
+    @staticmethod
+    def _build_match_query(query: str) -> str:
+        """사용자 입력을 FTS5 MATCH 식으로 변환 (각 단어 접두어 검색, 특수문자 이스케이프)"""
+        terms = []
+        for raw in query.split():
+            term = raw.replace('"', '""').strip()
+            if term:
+                terms.append(f'"{term}"*')
+        return " ".join(terms)
+    
+    def search(self, query: str, limit: int = None) -> List[Dict]:
+        """
+        전문 검색 (bm25 순위)
+        Returns: [{"scenario", "role", "turn", "snippet", "score"}, ...]
+        """
+        if not query or not query.strip():
+            return []
+        limit = limit or config.SCENARIO_SEARCH_LIMIT
+        if not self._synced:
+            self.sync()
+        
+        match = self._build_match_query(query)
+        if not match:
+            return []
+        
+        start = time.perf_counter()
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return []
+                rows = conn.execute(
+                    "SELECT scenario, role, turn, "
+                    "snippet(scenario_fts, 3, '**', '**', '…', 12), bm25(scenario_fts) AS score "
+                    "FROM scenario_fts WHERE scenario_fts MATCH ? ORDER BY score LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Invalid search query '{query}': {e}")
+            return []
+        except Exception as e:
+            logger.error(f"Scenario search failed: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return []
+        
+        logger.debug(f"⏱️ Scenario search '{query}': {len(rows)} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return [
+            {"scenario": scenario, "role": role, "turn": turn, "snippet": snippet, "score": score}
+            for scenario, role, turn, snippet, score in rows
+        ]
+    
+    def close(self):
+        """DB 연결 종료"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 전역 인스턴스
+_global_scenario_index: Optional[ScenarioIndex] = None
+
+
+def get_scenario_index() -> ScenarioIndex:
+    """전역 ScenarioIndex 인스턴스 가져오기"""
+    global _global_scenario_index
+    if _global_scenario_index is None:
+        _global_scenario_index = ScenarioIndex()
+    return _global_scenario_index
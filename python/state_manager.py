@@ -135,6 +135,8 @@ class DialogueTurn:
     emotion: str
     visual_prompt: str = ""
     background: str = ""
+    # 모델이 출력한 응답 JSON 전체 (검증 후, chat 모드에서 assistant 메시지로 그대로 재사용)
+    response: Dict = field(default_factory=dict)
 
 
 class DialogueHistory:
@@ -8,6 +8,8 @@ from pathlib import Path
 import config
 from comfy_client import ComfyClient
 from memory_manager import MemoryManager
+from health_monitor import get_health_monitor
+from object_info import get_object_info_catalog
 from i18n import get_i18n, set_global_language, TRANSLATIONS
 
 logger = logging.getLogger("UIBuilder")
@@ -439,6 +441,9 @@ class UIBuilder:
                             if not scenario_data:
                                 return f"⚠️ 시나리오 '{selected_scenario}'를 불러올 수 없습니다.", gr.Tabs(selected=None), [], "", "", None, "", "", "", None
                             
+                            # 이전 게임의 이미지 상태 초기화 (변형 버퍼, 고품질 이미지, img2img 기준, 이미지 판단, 스케줄러 세션)
+                            app_instance.reset_image_state()
+                            
                             # conversation 필드 확인 (전체 대화)
                             # 기존 시나리오 호환: conversation이 없으면 context.recent_turns에서 복원
                             if "conversation" in scenario_data:
@@ -545,6 +550,9 @@ class UIBuilder:
                                 else:
                                     logger.warning("시나리오에 장기 기억 데이터가 없습니다")
                                 
+                                # 세션 RNG 복원 (시드가 없는 예전 시나리오는 새 시드로 시작)
+                                app_instance.brain.set_rng_state(state_data)
+                                
                                 # mood는 interpret_mood로 계산되는 값
                                 from logic_engine import interpret_mood
                                 calculated_mood = interpret_mood(state)
@@ -573,7 +581,8 @@ class UIBuilder:
                                             character_thought=turn_data.get("character_thought", ""),
                                             emotion=turn_data.get("emotion", "neutral"),
                                             visual_prompt=turn_data.get("visual_prompt", ""),
-                                            background=turn_data.get("background", "")
+                                            background=turn_data.get("background", ""),
+                                            response=turn_data.get("response") or {}
                                         )
                                         app_instance.brain.history.add(turn)
                                     logger.info(f"Context restored: {len(recent_turns)} turns")
@@ -845,6 +854,70 @@ class UIBuilder:
                         outputs=[scenario_gallery]
                     )
                     
+                    # 대화 내용 전문 검색
+                    gr.Markdown("---")
+                    gr.Markdown(f"### {i18n.get_text('scenario_search_title')}")
+                    with gr.Row():
+                        scenario_search_input = gr.Textbox(
+                            label=i18n.get_text("scenario_search_label"),
+                            placeholder=i18n.get_text("scenario_search_placeholder"),
+                            scale=4
+                        )
+                        scenario_search_btn = gr.Button(i18n.get_text("btn_search"), variant="secondary", scale=1)
+                    scenario_search_results = gr.Markdown(value="")
+                    with gr.Row():
+                        scenario_search_select = gr.Dropdown(
+                            label=i18n.get_text("scenario_search_select"),
+                            choices=[],
+                            value=None,
+                            interactive=True,
+                            scale=4
+                        )
+                        scenario_search_open_btn = gr.Button(i18n.get_text("btn_load"), variant="primary", scale=1)
+                    
+                    def search_scenarios(query):
+                        """저장된 시나리오 대화 검색 (FTS5 인덱스)"""
+                        from scenario_index import get_scenario_index
+                        
+                        if not query or not query.strip():
+                            return "", gr.Dropdown(choices=[], value=None)
+                        
+                        hits = get_scenario_index().search(query)
+                        if not hits:
+                            return i18n.get_text("scenario_search_no_results"), gr.Dropdown(choices=[], value=None)
+                        
+                        role_labels = {
+                            "user": "🙋",
+                            "assistant": "💬",
+                            "thought": "💭"
+                        }
+                        lines = []
+                        matched_scenarios = []
+                        for hit in hits:
+                            scenario_name = hit["scenario"]
+                            if scenario_name not in matched_scenarios:
+                                matched_scenarios.append(scenario_name)
+                            icon = role_labels.get(hit["role"], "•")
+                            snippet = hit["snippet"].replace("\n", " ")
+                            lines.append(f"- **{scenario_name}** (turn {hit['turn']}) {icon} {snippet}")
+                        
+                        header = i18n.get_text("scenario_search_results", count=len(hits), scenarios=len(matched_scenarios))
+                        return (
+                            header + "\n\n" + "\n".join(lines),
+                            gr.Dropdown(choices=matched_scenarios, value=matched_scenarios[0])
+                        )
+                    
+                    scenario_search_btn.click(
+                        fn=search_scenarios,
+                        inputs=[scenario_search_input],
+                        outputs=[scenario_search_results, scenario_search_select]
+                    )
+                    scenario_search_input.submit(
+                        fn=search_scenarios,
+                        inputs=[scenario_search_input],
+                        outputs=[scenario_search_results, scenario_search_select]
+                    )
+                    
                     # 카드 클릭 이벤트는 대화 탭 컴포넌트가 정의된 후에 연결됨 (아래에서 처리)
                 
                 # ========== 탭 3: 대화 ==========
@@ -869,6 +942,7 @@ class UIBuilder:
                             stats_display = gr.Markdown(label=i18n.get_text("stats_detail_label"), show_label=True)
                             # 이미지와 재시도/저장 버튼을 함께 표시하기 위한 컨테이너
                             image_display = gr.Image(label=i18n.get_text("character_image_label"), height=400, show_label=False)
+                            image_progress_display = gr.Markdown("", visible=False)
                             retry_image_btn = gr.Button(i18n.get_text("btn_retry_image"), variant="secondary", size="sm", visible=False)
                             save_image_btn = gr.Button(i18n.get_text("btn_save_image"), variant="secondary", size="sm", visible=True)
                             save_moment_btn = gr.Button(i18n.get_text("btn_save_moment"), variant="secondary", size="sm", visible=True)
@@ -1032,6 +1106,9 @@ class UIBuilder:
                                     "long_memory": state.long_memory if hasattr(state, 'long_memory') else ""  # 장기 기억 저장
                                 }
                                 
+                                # 세션 RNG 시드 및 스트림 위치 (가챠/이미지 시드 재현용)
+                                scenario_data["state"].update(app_instance.brain.get_rng_state())
+                                
                                 # 초기 설정 정보 (프롬프트에 필수)
                                 if hasattr(app_instance.brain, 'initial_config') and app_instance.brain.initial_config:
                                     scenario_data["initial_config"] = app_instance.brain.initial_config
@@ -1083,7 +1160,8 @@ class UIBuilder:
                                                     "emotion": getattr(turn, 'emotion', 'neutral'),
                                                     "visual_prompt": turn_visual,
                                                     "background": turn_bg,
-                                                    "stats_delta": getattr(turn, 'stats_delta', {})
+                                                    "stats_delta": getattr(turn, 'stats_delta', {}),
+                                                    "response": getattr(turn, 'response', {})
                                                 })
                                     
                                     # context에 recent_turns 저장 (최근 10턴)
@@ -1203,7 +1281,8 @@ class UIBuilder:
                             else:
                                 turn_number = None
 
-                            saved_path = app_instance._save_generated_image(app_instance.current_image, turn_number)
+                            # 파일이 실제로 써진 뒤에만 성공 메시지 표시
+                            saved_path = app_instance._save_generated_image(app_instance.current_image, turn_number, wait=True)
                             if saved_path:
                                 msg = i18n.get_text("save_image_success", category="ui", path=saved_path)
                                 return gr.Markdown(value=msg, visible=True)
@@ -1223,7 +1302,7 @@ class UIBuilder:
                             msg = i18n.get_text("save_image_no_image", category="ui")
                             return gr.Markdown(value=msg, visible=True)
                         try:
-                            saved_path = app_instance.save_moment_image()
+                            saved_path = app_instance.save_moment_image(wait=True)
                             if saved_path:
                                 msg = i18n.get_text("save_moment_success", category="ui", path=saved_path)
                                 return gr.Markdown(value=msg, visible=True)
@@ -1265,6 +1344,14 @@ class UIBuilder:
                         outputs=[stats_chart]
                     )
 
+                    def prewarm_handler():
+                        """입력 중 다음 턴 프롬프트 접두부 예열 (백그라운드, UI 갱신 없음)"""
+                        if app_instance.brain is not None:
+                            app_instance.brain.prewarm()
+                    
+                    user_input.focus(prewarm_handler, inputs=None, outputs=None, queue=False, show_progress="hidden")
+                    user_input.change(prewarm_handler, inputs=None, outputs=None, queue=False, show_progress="hidden")
+                    
                     # 재시도 버튼 클릭 핸들러
                     retry_image_btn.click(
                         retry_image_handler,
@@ -1272,6 +1359,30 @@ class UIBuilder:
                         outputs=[image_display, retry_image_status, retry_image_btn]
                     )
 
+                    # 생성 중 진행률/저해상도 미리보기 표시, 미리보기 모드면 고품질 이미지가 완성될 때 교체
+                    def live_image_handler():
+                        image = app_instance.take_refined_image()
+                        update = app_instance.poll_image_progress()
+                        if update is None:
+                            progress_out = gr.skip()
+                        else:
+                            progress_out = gr.Markdown(value=update[1], visible=bool(update[1]))
+                            if image is None:
+                                image = update[0]
+                        return (image if image is not None else gr.skip()), progress_out
+
+                    live_image_timer = gr.Timer(
+                        value=min(config.IMAGE_PROGRESS_CONFIG["poll_interval"], config.IMAGE_PREVIEW_CONFIG["poll_interval"]),
+                        active=config.IMAGE_PROGRESS_CONFIG["enabled"] or config.IMAGE_PREVIEW_CONFIG["enabled"]
+                    )
+                    live_image_timer.tick(
+                        live_image_handler,
+                        inputs=None,
+                        outputs=[image_display, image_progress_display],
+                        queue=False,
+                        show_progress="hidden"
+                    )
+
                     # 이미지 저장 버튼 클릭 핸들러
                     save_image_btn.click(
                         save_current_image_handler,
@@ -1320,6 +1431,17 @@ class UIBuilder:
                         ]
                     )
                     
+                    # 검색 결과에서 선택한 시나리오 불러오기
+                    scenario_search_open_btn.click(
+                        fn=continue_chat,
+                        inputs=[scenario_search_select],
+                        outputs=[
+                            setup_status, tabs,
+                            chatbot, gr.Textbox(visible=False), stats_display, image_display,
+                            gr.Textbox(visible=False), thought_display, action_display, stats_chart
+                        ]
+                    )
+                    
                     # 모델 로드 완료 시 UI 활성화
                     def enable_chat_ui():
                         if app_instance.model_loaded:
@@ -1513,6 +1635,9 @@ class UIBuilder:
                                 "max_tokens": to_int(max_tokens_val, config.LLM_CONFIG["max_tokens"]),
                                 "presence_penalty": to_float(presence_penalty_val, config.LLM_CONFIG["presence_penalty"]),
                                 "frequency_penalty": to_float(frequency_penalty_val, config.LLM_CONFIG["frequency_penalty"]),
+                                # 프롬프트 모드와 역할별 모델 설정은 UI에 없으므로 기존 값 유지
+                                "prompt_mode": env_config.get("llm_settings", {}).get("prompt_mode", config.LLM_CHAT_CONFIG["prompt_mode"]),
+                                "roles": env_config.get("llm_settings", {}).get("roles", config.LLM_ROLE_DEFAULTS),
                             }
                             
                             # 환경설정 저장
@@ -1530,6 +1655,7 @@ class UIBuilder:
                                             model_name=llm_settings["ollama_model"] if llm_settings["provider"] == "ollama" else llm_settings["openrouter_model"],
                                             api_key=api_key
                                         )
+                                        app_instance.brain.set_prompt_mode(llm_settings.get("prompt_mode"))
                                         
                                         # 모델 로드 시도 (OpenRouter 실패 시 Ollama로 폴백)
                                         result = app_instance.brain.memory_manager.load_model()
@@ -1642,6 +1768,8 @@ class UIBuilder:
                     comfyui_quality_tag = comfyui_settings.get("quality_tag", "masterpiece, best quality, very awa")
                     comfyui_negative_prompt = comfyui_settings.get("negative_prompt", "(bad quality, worst quality, low quality), 3d, 3d rendering, manga, cartoon, 2d, fatty, thick body, big body, huge breasts, muscular, mole, watermark, text")
                     comfyui_upscale_model = comfyui_settings.get("upscale_model_name", "4x-UltraSharp.pth")
+                    # 자동완성 목록 (object_info 캐시가 있을 때만, UI 생성은 블로킹하지 않음)
+                    comfyui_choices = get_object_info_catalog().choices(f"127.0.0.1:{comfyui_port}")
                     
                     with gr.Row():
                         with gr.Column():
@@ -1677,36 +1805,41 @@ class UIBuilder:
                                     info=i18n.get_text("comfyui_negative_prompt_info"),
                                     lines=3
                                 )
-                                comfyui_upscale_model_input = gr.Textbox(
+                                comfyui_upscale_model_input = gr.Dropdown(
                                     label=i18n.get_text("comfyui_upscale_model"),
                                     value=comfyui_upscale_model,
-                                    placeholder=i18n.get_text("comfyui_upscale_model_placeholder"),
+                                    choices=comfyui_choices["upscale"] or [comfyui_upscale_model],
+                                    allow_custom_value=True,
                                     info=i18n.get_text("comfyui_upscale_model_info")
                                 )
-                            comfyui_model_input = gr.Textbox(
+                            comfyui_model_input = gr.Dropdown(
                                 label=i18n.get_text("comfyui_model"),
                                 value=comfyui_model,
-                                placeholder=i18n.get_text("comfyui_model_placeholder"),
+                                choices=comfyui_choices["model"] or [comfyui_model],
+                                allow_custom_value=True,
                                 info=i18n.get_text("comfyui_model_info")
                             )
-                            comfyui_vae_input = gr.Textbox(
+                            comfyui_vae_input = gr.Dropdown(
                                 label=i18n.get_text("comfyui_vae"),
                                 value=comfyui_vae,
-                                placeholder=i18n.get_text("comfyui_vae_placeholder"),
+                                choices=comfyui_choices["vae"] or [comfyui_vae],
+                                allow_custom_value=True,
                                 info=i18n.get_text("comfyui_vae_info")
                             )
-                            comfyui_clip_input = gr.Textbox(
+                            comfyui_clip_input = gr.Dropdown(
                                 label=i18n.get_text("comfyui_clip"),
                                 value=comfyui_clip,
-                                placeholder=i18n.get_text("comfyui_clip_placeholder"),
+                                choices=comfyui_choices["clip"] or [comfyui_clip],
+                                allow_custom_value=True,
                                 info=i18n.get_text("comfyui_clip_info"),
                                 visible=(comfyui_style != "SDXL")
                             )
                             with gr.Group(visible=comfyui_use_lora) as comfyui_lora_group:
-                                comfyui_lora_name_input = gr.Textbox(
+                                comfyui_lora_name_input = gr.Dropdown(
                                     label=i18n.get_text("comfyui_lora_name"),
                                     value=comfyui_lora_name,
-                                    placeholder=i18n.get_text("comfyui_lora_name_placeholder"),
+                                    choices=comfyui_choices["lora"] or ([comfyui_lora_name] if comfyui_lora_name else []),
+                                    allow_custom_value=True,
                                     info=i18n.get_text("comfyui_lora_name_info")
                                 )
                         with gr.Column():
@@ -1726,16 +1859,18 @@ class UIBuilder:
                                 step=0.1,
                                 info=i18n.get_text("comfyui_cfg_info")
                             )
-                            comfyui_sampler_input = gr.Textbox(
+                            comfyui_sampler_input = gr.Dropdown(
                                 label=i18n.get_text("comfyui_sampler"),
                                 value=comfyui_sampler,
-                                placeholder=i18n.get_text("comfyui_sampler_placeholder"),
+                                choices=comfyui_choices["sampler"] or [comfyui_sampler],
+                                allow_custom_value=True,
                                 info=i18n.get_text("comfyui_sampler_info")
                             )
-                            comfyui_scheduler_input = gr.Textbox(
+                            comfyui_scheduler_input = gr.Dropdown(
                                 label=i18n.get_text("comfyui_scheduler"),
                                 value=comfyui_scheduler,
-                                placeholder=i18n.get_text("comfyui_scheduler_placeholder"),
+                                choices=comfyui_choices["scheduler"] or [comfyui_scheduler],
+                                allow_custom_value=True,
                                 info=i18n.get_text("comfyui_scheduler_info")
                             )
                             with comfyui_lora_group:
@@ -1773,14 +1908,14 @@ class UIBuilder:
                         cfg_val = comfyui_settings.get(f"cfg_{style_key}") or style_defaults["cfg"]
                         
                         return (
-                            gr.Textbox(value=model_val),  # 모델
-                            gr.Textbox(value=vae_val),  # VAE
-                            gr.Textbox(value=clip_val, visible=(selected_style != "SDXL")),  # CLIP (SDXL일 때 숨김)
-                            gr.Textbox(value=lora_val),  # LoRA 이름
+                            gr.Dropdown(value=model_val),  # 모델
+                            gr.Dropdown(value=vae_val),  # VAE
+                            gr.Dropdown(value=clip_val, visible=(selected_style != "SDXL")),  # CLIP (SDXL일 때 숨김)
+                            gr.Dropdown(value=lora_val),  # LoRA 이름
                             gr.Number(value=steps_val),  # Steps
                             gr.Number(value=cfg_val),  # CFG
-                            gr.Textbox(value=sampler_val),  # Sampler
-                            gr.Textbox(value=scheduler_val),  # Scheduler
+                            gr.Dropdown(value=sampler_val),  # Sampler
+                            gr.Dropdown(value=scheduler_val),  # Scheduler
                             gr.Number(value=lora_strength_val),  # LoRA 강도
                             gr.Group(visible=(selected_style == "SDXL")),  # 2D 설정 그룹
                         )
@@ -1802,7 +1937,27 @@ class UIBuilder:
                     )
                     
                     comfyui_status = gr.Markdown("")
-                    save_comfyui_btn = gr.Button(i18n.get_text("btn_save_comfyui"), variant="primary")
+                    with gr.Row():
+                        refresh_catalog_btn = gr.Button(i18n.get_text("btn_refresh_comfyui_catalog"), variant="secondary")
+                        save_comfyui_btn = gr.Button(i18n.get_text("btn_save_comfyui"), variant="primary")
+                    
+                    def refresh_comfyui_catalog(port_val):
+                        """ComfyUI /object_info 다시 조회 후 자동완성 목록 갱신"""
+                        server_address = f"127.0.0.1:{int(port_val) if port_val else 8000}"
+                        catalog = get_object_info_catalog()
+                        if catalog.get(server_address, force=True) is None:
+                            return (*[gr.skip()] * 7, i18n.get_text("msg_comfyui_catalog_failed", server=server_address))
+                        choices = catalog.choices(server_address)
+                        fields = ["model", "vae", "clip", "lora", "sampler", "scheduler", "upscale"]
+                        counts = sum(len(choices[field]) for field in fields)
+                        return (*[gr.Dropdown(choices=choices[field]) for field in fields],
+                                i18n.get_text("msg_comfyui_catalog_loaded", server=server_address, count=counts))
+                    
+                    refresh_catalog_btn.click(
+                        refresh_comfyui_catalog,
+                        inputs=[comfyui_port_input],
+                        outputs=[comfyui_model_input, comfyui_vae_input, comfyui_clip_input, comfyui_lora_name_input, comfyui_sampler_input, comfyui_scheduler_input, comfyui_upscale_model_input, comfyui_status]
+                    )
                     
                     def save_comfyui_settings(port_val, style_val, use_lora_val, model_val, vae_val, clip_val, lora_name_val, lora_strength_val, steps_val, cfg_val, sampler_val, scheduler_val, quality_tag_val, negative_prompt_val, upscale_model_val):
                         """ComfyUI 설정 저장"""
@@ -1934,7 +2089,8 @@ class UIBuilder:
                                             negative_prompt=negative_prompt,
                                             upscale_model_name=upscale_model_name,
                                             lora_name=lora_name,
-                                            lora_strength_model=lora_strength_model
+                                            lora_strength_model=lora_strength_model,
+                                            extra_servers=env_config['comfyui_settings'].get('extra_servers', [])
                                         )
                                         # LoRA 사용 여부에 따라 로그 메시지 분리
                                         if lora_name is not None:
@@ -1950,6 +2106,10 @@ class UIBuilder:
                                                 f"workflow: {workflow_path}, model: {model_name}, vae: {vae_name}, clip: {clip_name}, "
                                                 f"LoRA disabled, steps: {steps}, cfg: {cfg}, sampler: {sampler_name}, scheduler: {scheduler}"
                                             )
+                                    # 캐시된 object_info 카탈로그에 없는 이름이면 경고 (이미지 생성 시 바로 실패하므로)
+                                    unknown = app_instance.comfy_client.check_settings()
+                                    if unknown:
+                                        return i18n.get_text("msg_comfyui_settings_saved") + "\n\n" + i18n.get_text("msg_comfyui_unknown_names", names=", ".join(unknown))
                                     return i18n.get_text("msg_comfyui_settings_saved")
                                 except Exception as e:
                                     logger.error(f"Failed to reinitialize ComfyClient: {e}")
@@ -1965,6 +2125,42 @@ class UIBuilder:
                         inputs=[comfyui_port_input, comfyui_style_input, comfyui_use_lora_input, comfyui_model_input, comfyui_vae_input, comfyui_clip_input, comfyui_lora_name_input, comfyui_lora_strength_model_input, comfyui_steps_input, comfyui_cfg_input, comfyui_sampler_input, comfyui_scheduler_input, comfyui_quality_tag_input, comfyui_negative_prompt_input, comfyui_upscale_model_input],
                         outputs=[comfyui_status]
                     )
+                    
+                    # 백엔드 상태 패널 (헬스 모니터 상태 표를 주기적으로 표시, 요청 경로와 같은 캐시 사용)
+                    gr.Markdown("---")
+                    gr.Markdown(f"## {i18n.get_text('backend_status_title')}")
+                    backend_status_display = gr.Markdown(i18n.get_text("backend_status_empty"))
+                    backend_status_timer = gr.Timer(value=config.HEALTH_MONITOR_CONFIG["ui_refresh"])
+                    
+                    def render_backend_status():
+                        """헬스 모니터 상태 표 → Markdown 표"""
+                        rows = get_health_monitor().status_table()
+                        if not rows:
+                            return i18n.get_text("backend_status_empty")
+                        lines = [
+                            i18n.get_text("backend_status_header"),
+                            "|---|---|---|---|---|---|",
+                        ]
+                        for row in rows:
+                            if row["up"] is None:
+                                state = "⏳"
+                            elif row["up"]:
+                                state = "🟢"
+                            else:
+                                state = f"🔴 {row['error']}"[:80]
+                            latency = f"{row['latency_ewma'] * 1000:.0f} ms" if row["latency_ewma"] is not None else "-"
+                            queue = row["queue_depth"] if row["queue_depth"] is not None else "-"
+                            models = ", ".join(row["loaded_models"] or row["models"] or []) or "-"
+                            lines.append(f"| {row['kind']} | {row['label']} | {state} | {latency} | {queue} | {models[:80]} |")
+                        return "\n".join(lines)
+                    
+                    backend_status_timer.tick(
+                        render_backend_status,
+                        inputs=[],
+                        outputs=[backend_status_display],
+                        queue=False,
+                        show_progress="hidden"
+                    )
             
             # 첫 탭의 버튼 클릭 시 대화 탭 컴포넌트 업데이트 (탭 밖에서 정의)
             start_btn.click(